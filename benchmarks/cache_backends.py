@@ -0,0 +1,143 @@
+"""Compares the cache backends against a local fake Redis server.
+
+Runs batches of reads with a skewed key distribution on the in-process backend,
+the Redis backend read key by key and pipelined, and the near cache in front of
+it. A second near cache on the same server stands in for another bot process,
+showing how many of its reads are served warm by the data the first one wrote.
+Reports the throughput, the batch latency percentiles and the round trips made.
+
+Usage:
+    python benchmarks/cache_backends.py [--batches 500] [--batch-size 50]
+        [--keys 2000] [--redis-latency 0.001]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from fakes import SRC_PATH, FakeRedisServer
+
+
+def percentile(values, fraction):
+    """Returns a percentile of a list of values."""
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def read_batches(read, fill, key_batches, misses):
+    """Runs batches of reads, filling the missing keys, returning their timings."""
+    timings = []
+    for keys in key_batches:
+        start = time.perf_counter()
+        values = await read(keys)
+        missing = {key: key for key, value in zip(keys, values) if value is None}
+        if missing:
+            misses.append(len(missing))
+            await fill(missing)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(name, args, timings, server, requests_before, misses):
+    """Creates the result of a backend run."""
+    elapsed = sum(timings)
+    return {
+        "backend": name,
+        "batches": len(timings),
+        "batch_size": args.batch_size,
+        "reads_per_second": round(len(timings) * args.batch_size / elapsed, 2),
+        "batch_latency_p50_ms": round(percentile(timings, 0.5) * 1000, 3),
+        "batch_latency_p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+        "misses": sum(misses),
+        "round_trips": None if server is None else server.requests - requests_before,
+    }
+
+
+async def run(args, server):
+    """Runs the backends one after the other, returning their results."""
+    # pylint: disable=import-outside-toplevel
+    from util import MemoryBackend, NearCache, RedisBackend
+
+    rng = random.Random(0)
+    key_batches = [
+        [
+            f"key:{min(int(rng.paretovariate(1.2)), args.keys)}"
+            for _ in range(args.batch_size)
+        ]
+        for _ in range(args.batches)
+    ]
+
+    async def sequential_get_many(backend, keys):
+        return [await backend.get(key) for key in keys]
+
+    memory = MemoryBackend()
+    redis = RedisBackend(server.url, prefix="sequential:")
+    pipelined = RedisBackend(server.url, prefix="pipelined:")
+    near = NearCache(RedisBackend(server.url, prefix="near:"), ttl=args.near_ttl)
+    other_process = NearCache(RedisBackend(server.url, prefix="near:"))
+
+    runs = [
+        ("memory", memory.get_many, memory.set_many, None),
+        (
+            "redis_sequential",
+            lambda keys: sequential_get_many(redis, keys),
+            redis.set_many,
+            server,
+        ),
+        ("redis_pipelined", pipelined.get_many, pipelined.set_many, server),
+        ("near_cache", near.get_many, near.set_many, server),
+        (
+            "near_cache_other_process",
+            other_process.get_many,
+            other_process.set_many,
+            server,
+        ),
+    ]
+
+    results = []
+    for name, read, fill, counted in runs:
+        misses = []
+        requests_before = server.requests
+        timings = await read_batches(read, fill, key_batches, misses)
+        results.append(summarize(name, args, timings, counted, requests_before, misses))
+
+    for backend in (redis, pipelined, near, other_process):
+        await backend.close()
+
+    return results
+
+
+def main():
+    """Runs the benchmark against a fresh fake Redis server."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batches", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--keys", type=int, default=2000)
+    parser.add_argument("--redis-latency", type=float, default=0.001)
+    parser.add_argument("--near-ttl", type=float, default=5.0)
+    args = parser.parse_args()
+
+    sys.path.insert(0, SRC_PATH)
+    server = FakeRedisServer(latency=args.redis_latency).start()
+    try:
+        results = asyncio.run(run(args, server))
+    finally:
+        server.stop()
+
+    print(
+        json.dumps(
+            {
+                "benchmark": "cache_backends",
+                "redis_latency_seconds": args.redis_latency,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
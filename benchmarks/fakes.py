@@ -0,0 +1,564 @@
+"""Local stand-ins for the Quotes API, Redis and Discord, used by the benchmarks.
+
+FakeQuotesApiServer serves a synthetic quote corpus over HTTP on localhost with
+the routes the bot uses, a configurable latency and error rate. FakeRedisServer
+speaks enough of the Redis protocol for the cache backend. The fake Discord
+classes only implement what the cogs and the paginators call, every request
+taking a configurable latency.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import BaseRequestHandler, ThreadingTCPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+
+SRC_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"
+)
+
+
+def configure_environment(server):
+    """Points the bot configuration at a fake Quotes API and a temporary data path.
+
+    Must run before the bot modules are imported, they read their configuration
+    when they are.
+    """
+    os.environ["QUOTES_API_URL"] = server.url
+    os.environ["QUOTES_API_KEY"] = "benchmark"
+    os.environ["DATA_PATH"] = tempfile.mkdtemp(prefix="benchmark-")
+    sys.path.insert(0, SRC_PATH)
+
+
+def create_corpus(quotes, authors, tags, seed=0):
+    """Creates a synthetic quote corpus."""
+    rng = random.Random(seed)
+    tag_names = [f"tag{index:03d}" for index in range(tags)]
+    author_names = [f"Author {index:03d}" for index in range(authors)]
+
+    return [
+        {
+            "id": index + 1,
+            "quote_text": f"Quote number {index + 1}. " + "lorem ipsum " * 8,
+            "author_name": rng.choice(author_names),
+            "author_image": f"https://example.com/authors/{index % authors}.png",
+            "tags": rng.sample(tag_names, k=min(3, tags)),
+        }
+        for index in range(quotes)
+    ]
+
+
+class QuotesApiHandler(BaseHTTPRequestHandler):
+    """Request handler of the fake Quotes API."""
+
+    server_version = "FakeQuotesApi/1.0"
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Keeps the benchmark output clean."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serves the GET routes used by the bot."""
+        self.serve(self.serve_get)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Serves the POST routes used by the bot."""
+        self.serve(self.serve_post)
+
+    def serve(self, handler):
+        """Serves a request, answering 429 when the server is over its capacity."""
+        server = self.server
+        server.count_request()
+        if not server.admit():
+            self.send_json(429, {"error": "Too many requests"})
+            return
+
+        try:
+            handler()
+        finally:
+            server.leave()
+
+    def serve_get(self):
+        """Serves the GET routes used by the bot."""
+        server = self.server
+        time.sleep(server.latency)
+
+        if server.rng.random() < server.error_rate:
+            self.send_json(500, {"error": "Injected error"})
+            return
+
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        route = url.path[len("/api/v1") :]
+
+        if route == "/quotes/random":
+            quotes = server.filter_quotes(params)
+            if not quotes:
+                self.send_json(404, {"error": "No quotes found"})
+                return
+            self.send_json(200, server.rng.choice(quotes))
+        elif route == "/quotes":
+            page = server.paginate(server.filter_quotes(params), params)
+            self.send_json(200, page, conditional=True)
+        elif route == "/authors":
+            authors = sorted({quote["author_name"] for quote in server.corpus})
+            records = [{"name": name} for name in authors]
+            self.send_json(200, server.paginate(records, params), conditional=True)
+        elif route == "/tags":
+            self.send_json(200, {"tags": server.tags}, conditional=True)
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def serve_post(self):
+        """Creates a quote, the only POST route used by the bot."""
+        server = self.server
+        time.sleep(server.latency)
+
+        if server.rng.random() < server.error_rate:
+            self.send_json(500, {"error": "Injected error"})
+            return
+
+        if urlparse(self.path).path != "/api/v1/quotes":
+            self.send_json(404, {"error": "Not found"})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        quote = json.loads(self.rfile.read(length))
+        with server.lock:
+            quote["id"] = len(server.corpus) + 1
+            server.corpus.append(quote)
+        self.send_json(201, quote)
+
+    def send_json(self, status, body, conditional=False):
+        """Sends a JSON response, a 304 one if the client has it already."""
+        data = json.dumps(body).encode()
+        etag = None
+        if conditional and self.server.validators:
+            etag = '"%s"' % hashlib.sha1(data).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+        self.server.count_bytes(len(data))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeQuotesApiServer(ThreadingHTTPServer):
+    """Fake Quotes API served from a background thread.
+
+    Parameters
+    ------------
+    latency: float
+        Seconds every request takes.
+    error_rate: float
+        Fraction of the requests answered with a 500 error.
+    quotes: int
+        Size of the quote corpus.
+    validators: bool
+        Whether the list routes send ETags and answer conditional requests.
+    capacity: int
+        Requests served at once, the others are answered 429. None for no limit.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        *,
+        latency=0.02,
+        error_rate=0.0,
+        quotes=1000,
+        seed=0,
+        validators=True,
+        capacity=None,
+    ):
+        super().__init__(("127.0.0.1", 0), QuotesApiHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.validators = validators
+        self.capacity = capacity
+        self.active = 0
+        self.rejected = 0
+        self.bytes_sent = 0
+        self.rng = random.Random(seed)
+        self.corpus = create_corpus(quotes, authors=100, tags=50, seed=seed)
+        self.tags = sorted({tag for quote in self.corpus for tag in quote["tags"]})
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        """Base url of the api, without the version prefix."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Starts serving in the background."""
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving."""
+        self.shutdown()
+        self.server_close()
+
+    def count_request(self):
+        """Counts a request, handlers run on several threads."""
+        with self.lock:
+            self.requests += 1
+
+    def admit(self):
+        """Starts serving a request, returning False if the server is at capacity."""
+        with self.lock:
+            if self.capacity is not None and self.active >= self.capacity:
+                self.rejected += 1
+                return False
+            self.active += 1
+            return True
+
+    def leave(self):
+        """Ends serving a request."""
+        with self.lock:
+            self.active -= 1
+
+    def count_bytes(self, size):
+        """Counts the bytes of a response body."""
+        with self.lock:
+            self.bytes_sent += size
+
+    def filter_quotes(self, params):
+        """Returns the quotes matching the tags and author filters."""
+        quotes = self.corpus
+        if "tags" in params:
+            tags = set(params["tags"].split(","))
+            quotes = [quote for quote in quotes if tags.intersection(quote["tags"])]
+        if "author" in params:
+            author = params["author"].lower()
+            quotes = [
+                quote for quote in quotes if quote["author_name"].lower() == author
+            ]
+        return quotes
+
+    def paginate(self, records, params):  # pylint: disable=no-self-use
+        """Returns a page of records in the list envelope of the api."""
+        page = max(int(params.get("page", 1)), 1)
+        per_page = max(int(params.get("per_page", 20)), 1)
+        start = (page - 1) * per_page
+        return {
+            "records": records[start : start + per_page],
+            "_metadata": {
+                "page": page,
+                "per_page": per_page,
+                "page_count": -(-len(records) // per_page),
+                "total_count": len(records),
+            },
+        }
+
+
+class RedisHandler(BaseRequestHandler):
+    """Connection handler of the fake Redis server.
+
+    Every read of the socket is answered at once after a single latency, so
+    pipelined commands share their round trip like they do on a real server.
+    """
+
+    def handle(self):
+        """Answers the commands of a connection."""
+        server = self.server
+        buffer = b""
+        while True:
+            data = self.request.recv(65536)
+            if not data:
+                return
+
+            buffer += data
+            commands, buffer = parse_commands(buffer)
+            if not commands:
+                continue
+
+            server.count_request()
+            time.sleep(server.latency)
+            self.request.sendall(b"".join(server.execute(args) for args in commands))
+
+
+def parse_commands(buffer):
+    """Parses the complete commands of a buffer, returning them and the rest."""
+    commands = []
+    while True:
+        position, arguments = 0, []
+        try:
+            end = buffer.index(b"\r\n", position)
+            count = int(buffer[position + 1 : end])
+            position = end + 2
+            for _ in range(count):
+                end = buffer.index(b"\r\n", position)
+                length = int(buffer[position + 1 : end])
+                position = end + 2
+                if len(buffer) < position + length + 2:
+                    raise ValueError
+                arguments.append(buffer[position : position + length])
+                position += length + 2
+        except ValueError:
+            return commands, buffer
+
+        commands.append(arguments)
+        buffer = buffer[position:]
+
+
+class FakeRedisServer(ThreadingTCPServer):
+    """Fake Redis server served from a background thread.
+
+    Implements GET, MGET, SET with PX, DEL, PING, AUTH and SELECT on a single
+    database, which is what the cache backend sends.
+
+    Parameters
+    ------------
+    latency: float
+        Seconds every round trip takes.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, *, latency=0.001):
+        super().__init__(("127.0.0.1", 0), RedisHandler)
+        self.latency = latency
+        self.data = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        """Url of the server."""
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}"
+
+    def start(self):
+        """Starts serving in the background."""
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving."""
+        self.shutdown()
+        self.server_close()
+
+    def count_request(self):
+        """Counts a round trip, handlers run on several threads."""
+        with self.lock:
+            self.requests += 1
+
+    def lookup(self, key):
+        """Returns the value of a key, dropping it if it expired."""
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, command):
+        """Executes a command, returning its encoded reply."""
+        name, arguments = command[0].upper(), command[1:]
+        with self.lock:
+            if name in (b"PING", b"AUTH", b"SELECT"):
+                return b"+OK\r\n"
+            if name == b"GET":
+                return encode_bulk(self.lookup(arguments[0]))
+            if name == b"MGET":
+                values = [encode_bulk(self.lookup(key)) for key in arguments]
+                return b"*%d\r\n%s" % (len(values), b"".join(values))
+            if name == b"SET":
+                expires_at = None
+                if len(arguments) >= 4 and arguments[2].upper() == b"PX":
+                    expires_at = time.monotonic() + int(arguments[3]) / 1000
+                self.data[arguments[0]] = (arguments[1], expires_at)
+                return b"+OK\r\n"
+            if name == b"DEL":
+                deleted = sum(self.data.pop(key, None) is not None for key in arguments)
+                return b":%d\r\n" % deleted
+
+        return b"-ERR unknown command '%s'\r\n" % name
+
+
+def encode_bulk(value):
+    """Encodes a bulk string reply, a null reply for None."""
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+# Ids of the fake Discord objects
+fake_ids = itertools.count(1_000_000)
+
+
+class FakeMessage:
+    """Stand-in for a sent message."""
+
+    def __init__(self, channel, embed=None):
+        self.channel = channel
+        self.id = next(fake_ids)
+        self.embeds = [embed] if embed is not None else []
+        self.reactions = []
+
+    async def add_reaction(self, emoji):
+        """Adds a reaction."""
+        await asyncio.sleep(self.channel.latency)
+        self.reactions.append(emoji)
+
+    async def remove_reaction(self, emoji, member):
+        """Removes a reaction."""
+        await asyncio.sleep(self.channel.latency)
+
+    async def clear_reactions(self):
+        """Clears the reactions."""
+        await asyncio.sleep(self.channel.latency)
+        self.reactions.clear()
+
+    async def edit(self, **kwargs):
+        """Edits the message."""
+        await asyncio.sleep(self.channel.latency)
+        if kwargs.get("embed") is not None:
+            self.embeds = [kwargs["embed"]]
+
+    async def delete(self):
+        """Deletes the message."""
+        await asyncio.sleep(self.channel.latency)
+
+
+class FakeChannel:
+    """Stand-in for a guild text channel."""
+
+    def __init__(self, latency, channel_id=None):
+        self.latency = latency
+        self.id = channel_id or next(fake_ids)
+        self.guild = None
+        self.messages = []
+
+    async def send(self, content=None, *, embed=None, **kwargs):
+        """Sends a message."""
+        await asyncio.sleep(self.latency)
+        message = FakeMessage(self, embed)
+        self.messages.append(message)
+        return message
+
+    async def trigger_typing(self):
+        """Shows the typing indicator."""
+        await asyncio.sleep(self.latency)
+
+
+class FakeContext:  # pylint: disable=too-few-public-methods
+    """Stand-in for a command context."""
+
+    def __init__(self, bot, channel, author_id=7):
+        self.bot = bot
+        self.channel = channel
+        self.guild = None
+        self.message = None
+        self.author = SimpleNamespace(id=author_id, bot=False)
+
+    async def send(self, content=None, **kwargs):
+        """Sends a message to the channel of the context."""
+        return await self.channel.send(content, **kwargs)
+
+    async def trigger_typing(self):
+        """Shows the typing indicator."""
+        await self.channel.trigger_typing()
+
+
+class FakeDiscordHTTP:
+    """Stand-in for the request method of the discord.py HTTP client.
+
+    Sent messages get the ids listed in ``message_ids`` for their channel first,
+    so replayed reactions find the messages the bot sent when the trace was
+    recorded.
+
+    Parameters
+    ------------
+    user: dict
+        Payload of the bot user, the author of the sent messages.
+    latency: float
+        Seconds every request takes.
+    message_ids: Dict[str, Deque[str]]
+        Ids of the messages sent by the bot in every channel, in order.
+    """
+
+    def __init__(self, user, latency, message_ids=None):
+        self.user = user
+        self.latency = latency
+        self.message_ids = message_ids or {}
+        self.requests = 0
+
+    async def request(self, route, **kwargs):
+        """Simulates a request, returning the payload the cogs need."""
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        payload = kwargs.get("json") or {}
+
+        if route.method == "POST" and route.path == "/users/@me/channels":
+            recipient = {
+                "id": str(payload["recipient_id"]),
+                "username": "user",
+                "discriminator": "0000",
+                "avatar": None,
+            }
+            return {"id": str(next(fake_ids)), "type": 1, "recipients": [recipient]}
+
+        if route.path == "/channels/{channel_id}/messages" and route.method == "POST":
+            channel_id = str(route.channel_id)
+            sent_ids = self.message_ids.get(channel_id)
+            message_id = sent_ids.popleft() if sent_ids else str(next(fake_ids))
+            return self.create_message(message_id, channel_id, payload)
+
+        if route.path == "/channels/{channel_id}/messages/{message_id}":
+            if route.method == "PATCH":
+                return self.create_message(
+                    str(route.message_id), str(route.channel_id), payload
+                )
+
+        return None
+
+    def create_message(self, message_id, channel_id, payload):
+        """Creates the payload of a message sent by the bot."""
+        embeds = payload.get("embeds")
+        if embeds is None:
+            embeds = [payload["embed"]] if payload.get("embed") else []
+
+        return {
+            "id": message_id,
+            "channel_id": channel_id,
+            "author": self.user,
+            "content": payload.get("content") or "",
+            "embeds": embeds,
+            "attachments": [],
+            "mentions": [],
+            "mention_roles": [],
+            "mention_everyone": False,
+            "tts": False,
+            "type": 0,
+            "pinned": False,
+            "edited_timestamp": None,
+            "timestamp": "2021-01-01T00:00:00.000000+00:00",
+        }
@@ -0,0 +1,158 @@
+"""Startup and memory benchmark for the default and lean gateway modes.
+
+Feeds synthetic guild payloads into a discord.py connection state configured the
+same way the bot configures its client, and reports the ingest time, the memory
+retained by the state and the peak RSS of the process as JSON.
+
+Usage:
+    python benchmarks/gateway_modes.py [--guilds 200] [--members 500]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from discord.state import ConnectionState  # pylint: disable=wrong-import-position
+
+from bot import create_client_options  # pylint: disable=wrong-import-position
+
+BOT_USER_ID = 1
+
+
+def create_member_payload(user_id):
+    """Creates a guild member payload."""
+    return {
+        "user": {
+            "id": str(user_id),
+            "username": f"user{user_id}",
+            "discriminator": f"{user_id % 9999 + 1:04d}",
+            "avatar": None,
+        },
+        "roles": [],
+        "joined_at": "2021-01-01T00:00:00.000000+00:00",
+        "deaf": False,
+        "mute": False,
+    }
+
+
+def create_guild_payload(guild_id, members, with_members):
+    """Creates a GUILD_CREATE payload.
+
+    Without the members intent Discord only sends the bot's own member, the rest
+    of the member list arrives through guild chunking when the intent is enabled.
+    """
+    base_id = guild_id * 1_000_000
+    member_ids = range(base_id, base_id + members) if with_members else ()
+    channels = [
+        {
+            "id": str(base_id + 900_000 + i),
+            "type": 0,
+            "name": f"channel-{i}",
+            "position": i,
+        }
+        for i in range(10)
+    ]
+
+    return {
+        "id": str(guild_id),
+        "name": f"guild-{guild_id}",
+        "member_count": members,
+        "roles": [{"id": str(guild_id), "name": "@everyone", "permissions": "0"}],
+        "channels": channels,
+        "members": [create_member_payload(BOT_USER_ID)]
+        + [create_member_payload(user_id) for user_id in member_ids],
+    }
+
+
+def run_mode(lean_mode, guilds, members):
+    """Ingests the synthetic guilds with the given mode options."""
+    options = create_client_options(lean_mode)
+    loop = asyncio.new_event_loop()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    state = ConnectionState(
+        dispatch=lambda *args: None,
+        handlers={},
+        hooks={},
+        syncer=None,
+        http=None,
+        loop=loop,
+        **options,
+    )
+
+    # Lean mode never requests the member list
+    with_members = options["intents"].members
+    for guild_id in range(1, guilds + 1):
+        state._add_guild_from_data(  # pylint: disable=protected-access
+            create_guild_payload(guild_id, members, with_members)
+        )
+
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    cached_members = sum(len(guild.members) for guild in state.guilds)
+    counted_members = sum(guild.member_count for guild in state.guilds)
+    loop.close()
+
+    return {
+        "mode": "lean" if lean_mode else "default",
+        "guilds": guilds,
+        "members_per_guild": members,
+        "startup_seconds": round(elapsed, 4),
+        "retained_bytes": retained,
+        "peak_traced_bytes": peak,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "cached_members": cached_members,
+        "member_count": counted_members,
+        "max_messages": options.get("max_messages", 1000),
+    }
+
+
+def main():
+    """Runs every mode in its own process so RSS numbers don't mix."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--members", type=int, default=500)
+    parser.add_argument("--mode", choices=["default", "lean"])
+    args = parser.parse_args()
+
+    if args.mode:
+        result = run_mode(args.mode == "lean", args.guilds, args.members)
+        print(json.dumps(result))
+        return
+
+    results = []
+    for mode in ("default", "lean"):
+        output = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--mode",
+                mode,
+                "--guilds",
+                str(args.guilds),
+                "--members",
+                str(args.members),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    print(json.dumps({"benchmark": "gateway_modes", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Compares reloading the quote cog with and without the state handoff.
+
+Quotes are sent to many channels, then the quote cog is reloaded, either with
+the plain discord.py reload or with the bot reload that hands the cog state
+over, and more quotes are sent to the same channels. Both report the reload
+time, the quote messages whose reactions still work, the quotes repeated to a
+channel that had already seen them and the api calls made after the reload.
+
+Usage:
+    python benchmarks/hot_reload.py [--channels 200] [--quotes-per-channel 5]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fakes import FakeChannel, FakeContext, FakeQuotesApiServer, configure_environment
+
+
+def percentile(values, fraction):
+    """Returns a percentile of a list of values."""
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def send_quotes(cog, client, channels, amount):
+    """Sends quotes to every channel, returning the latency of every command."""
+    timings = []
+
+    async def send(channel):
+        for _ in range(amount):
+            start = time.perf_counter()
+            await cog.quote(FakeContext(client, channel))
+            timings.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(send(channel) for channel in channels))
+    return timings
+
+
+async def run_setup(name, args, server):
+    """Sends quotes, reloads the quote cog and sends quotes again."""
+    # pylint: disable=import-outside-toplevel
+    from discord.ext import commands
+
+    import bot
+    import config
+
+    client = bot.FamousQuotesBot(cogs_path=config.COGS_PATH, command_prefix="~")
+    client.warm_up_task = asyncio.ensure_future(client.warm_up_cogs())
+    await client.warm_up_task
+
+    channels = [FakeChannel(args.discord_latency) for _ in range(args.channels)]
+    await send_quotes(
+        client.get_cog("Quote"), client, channels, args.quotes_per_channel
+    )
+    sent = {
+        channel.id: {message.embeds[0].description for message in channel.messages}
+        for channel in channels
+    }
+    message_ids = [message.id for channel in channels for message in channel.messages]
+
+    requests_before = server.requests
+    start = time.perf_counter()
+    if name == "plain":
+        commands.Bot.reload_extension(client, "cogs.quote_cog")
+    else:
+        client.reload_extension("cogs.quote_cog")
+    reload_seconds = time.perf_counter() - start
+
+    cog = client.get_cog("Quote")
+    indexed = [await cog.get_message_quotes(message_id) for message_id in message_ids]
+
+    for channel in channels:
+        channel.messages.clear()
+    timings = await send_quotes(cog, client, channels, args.quotes_per_channel)
+    repeated = sum(
+        message.embeds[0].description in sent[channel.id]
+        for channel in channels
+        for message in channel.messages
+    )
+
+    # Let the warm up scheduled by the reload finish before counting requests
+    await asyncio.sleep(0.2)
+    result = {
+        "setup": name,
+        "reload_ms": round(reload_seconds * 1000, 3),
+        "quote_messages_kept": sum(quotes is not None for quotes in indexed),
+        "quote_messages_sent": len(message_ids),
+        "tags_kept": len(cog.tags),
+        "repeated_quotes": repeated,
+        "upstream_requests_after_reload": server.requests - requests_before,
+        "latency_p50_ms": round(percentile(timings, 0.5) * 1000, 3),
+        "latency_p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+    }
+    await client.close()
+    return result
+
+
+async def run(args, server):
+    """Runs both setups one after the other."""
+    return [await run_setup(name, args, server) for name in ("plain", "handoff")]
+
+
+def main():
+    """Runs both setups against a fresh fake Quotes API."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--channels", type=int, default=200)
+    parser.add_argument("--quotes-per-channel", type=int, default=5)
+    parser.add_argument("--quotes", type=int, default=1000)
+    parser.add_argument("--api-latency", type=float, default=0.02)
+    parser.add_argument("--discord-latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    server = FakeQuotesApiServer(latency=args.api_latency, quotes=args.quotes).start()
+    configure_environment(server)
+    try:
+        results = asyncio.run(run(args, server))
+    finally:
+        server.stop()
+
+    print(json.dumps({"benchmark": "hot_reload", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Compares a fixed concurrency with the adaptive limiter of QuotesApi.
+
+A fake Quotes API serving a limited number of requests at once, answering 429
+to the others, gets a background sync that wants as much concurrency as it can
+get while interactive quote fetches arrive at a steady rate. The fixed setup
+sends everything at once, the adaptive one goes through the AIMD limiter. Both
+report the requests that succeeded, the ones the api rejected, the limit the
+calls settled on and the latency of the interactive calls.
+
+Usage:
+    python benchmarks/limiter.py [--capacity 16] [--duration 5]
+        [--background-workers 64] [--interactive-rate 50]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fakes import FakeQuotesApiServer, configure_environment
+
+
+def percentile(values, fraction):
+    """Returns a percentile of a list of values."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def milliseconds(value):
+    """Rounds a duration in seconds to milliseconds."""
+    return None if value is None else round(value * 1000, 3)
+
+
+async def run_load(api, args, priorities):
+    """Runs the mixed load for a while, returning its measurements."""
+    interactive, background = priorities
+    outcomes = {"interactive": [], "background": []}
+    latencies = []
+    limits = []
+    deadline = time.monotonic() + args.duration
+
+    async def call(kind, priority):
+        start = time.perf_counter()
+        try:
+            await api.run(api.fetch_quotes, {"per_page": 20}, priority=priority)
+            outcomes[kind].append(True)
+        except Exception:  # pylint: disable=broad-except
+            outcomes[kind].append(False)
+        return time.perf_counter() - start
+
+    async def background_worker():
+        while time.monotonic() < deadline:
+            await call("background", background)
+
+    async def interactive_arrivals():
+        tasks = []
+        while time.monotonic() < deadline:
+            tasks.append(asyncio.ensure_future(call("interactive", interactive)))
+            await asyncio.sleep(1 / args.interactive_rate)
+        latencies.extend(await asyncio.gather(*tasks))
+
+    async def sample_limit():
+        while time.monotonic() < deadline:
+            limits.append(api.limiter.limit)
+            await asyncio.sleep(0.05)
+
+    await asyncio.gather(
+        interactive_arrivals(),
+        sample_limit(),
+        *(background_worker() for _ in range(args.background_workers)),
+    )
+
+    return (
+        {
+            kind: {
+                "succeeded": sum(results),
+                "failed": len(results) - sum(results),
+            }
+            for kind, results in outcomes.items()
+        },
+        latencies,
+        limits,
+    )
+
+
+async def run(args, server):
+    """Runs the load once with a fixed concurrency and once with the limiter."""
+    # pylint: disable=import-outside-toplevel
+    from config import QUOTES_API_KEY
+    from util import AdaptiveLimiter, QuotesApi, INTERACTIVE, BACKGROUND
+
+    unlimited = args.background_workers * 2
+    setups = {
+        "fixed": AdaptiveLimiter(
+            initial=unlimited, min_limit=unlimited, max_limit=unlimited
+        ),
+        "adaptive": AdaptiveLimiter(initial=8, max_limit=64, latency_target=0.5),
+    }
+
+    results = []
+    for name, limiter in setups.items():
+        api = QuotesApi(QUOTES_API_KEY)
+        api.limiter = limiter
+        api.executor = ThreadPoolExecutor(max_workers=unlimited)
+        rejected_before = server.rejected
+
+        outcomes, latencies, limits = await run_load(
+            api, args, (INTERACTIVE, BACKGROUND)
+        )
+        api.close()
+        api.executor.shutdown()
+
+        results.append(
+            {
+                "setup": name,
+                "rejected_by_api": server.rejected - rejected_before,
+                "final_limit": round(limiter.limit, 2),
+                "limit_p50_second_half": round(
+                    percentile(limits[len(limits) // 2 :], 0.5), 2
+                ),
+                "limit_decreases": limiter.decreases,
+                "interactive_latency_p50_ms": milliseconds(percentile(latencies, 0.5)),
+                "interactive_latency_p99_ms": milliseconds(percentile(latencies, 0.99)),
+                **outcomes,
+            }
+        )
+
+        # Let the api drain before the next setup
+        await asyncio.sleep(0.5)
+
+    return results
+
+
+def main():
+    """Runs both setups against a fresh fake Quotes API."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--capacity", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--background-workers", type=int, default=64)
+    parser.add_argument("--interactive-rate", type=float, default=50.0)
+    parser.add_argument("--api-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = FakeQuotesApiServer(
+        latency=args.api_latency, capacity=args.capacity, validators=False
+    ).start()
+    configure_environment(server)
+    try:
+        results = asyncio.run(run(args, server))
+    finally:
+        server.stop()
+
+    print(
+        json.dumps(
+            {
+                "benchmark": "limiter",
+                "capacity": args.capacity,
+                "api_latency_seconds": args.api_latency,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Compares decoding Quotes API pages into raw dicts and into the slotted models.
+
+Every decoder parses the same pages of a synthetic corpus. The time is measured
+over many runs and the memory is measured with tracemalloc as the size of the
+decoded pages that stay alive, which is what the caches of the bot hold on to.
+
+Usage:
+    python benchmarks/models.py [--pages 100] [--per-page 50] [--runs 20]
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from fakes import SRC_PATH, create_corpus
+
+
+def decode_pages(decoder, bodies):
+    """Decodes every page body, returning the decoded pages."""
+    return [decoder(body) for body in bodies]
+
+
+def measure(name, decoder, bodies, runs):
+    """Measures the speed and the retained memory of a decoder."""
+    decode_pages(decoder, bodies)
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        decode_pages(decoder, bodies)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    pages = decode_pages(decoder, bodies)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del pages
+
+    return {
+        "decoder": name,
+        "pages_per_second": round(len(bodies) * runs / elapsed, 2),
+        "page_decode_us": round(elapsed / (len(bodies) * runs) * 1e6, 2),
+        "retained_bytes_per_page": retained // len(bodies),
+    }
+
+
+def main():
+    """Runs the decoders one after the other."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    # pylint: disable=import-outside-toplevel
+    sys.path.insert(0, SRC_PATH)
+    from util.models import Page, Quote, loads, orjson
+
+    corpus = create_corpus(args.pages * args.per_page, authors=100, tags=50)
+    bodies = [
+        json.dumps(
+            {
+                "records": corpus[index : index + args.per_page],
+                "_metadata": {"page": index // args.per_page + 1},
+            }
+        ).encode()
+        for index in range(0, len(corpus), args.per_page)
+    ]
+
+    decoders = [
+        ("json_dicts", json.loads),
+        ("json_models", lambda body: Page.from_json(json.loads(body), Quote)),
+    ]
+    if orjson is not None:
+        decoders.append(("orjson_dicts", orjson.loads))
+        decoders.append(
+            ("orjson_models", lambda body: Page.from_json(loads(body), Quote))
+        )
+
+    print(
+        json.dumps(
+            {
+                "benchmark": "models",
+                "pages": args.pages,
+                "per_page": args.per_page,
+                "orjson": orjson is not None,
+                "results": [
+                    measure(name, decoder, bodies, args.runs)
+                    for name, decoder in decoders
+                ],
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
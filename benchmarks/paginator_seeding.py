@@ -0,0 +1,227 @@
+"""Time-to-interactive benchmark for the paginator navigation modes.
+
+Simulates the Discord HTTP API with a fixed request latency and the add reaction
+rate limit bucket, which discord.py keeps locked for 250 ms after every response.
+For every navigation mode it measures how long it takes until a paginated message
+has all of its navigation controls:
+
+- sequential: the previous behaviour, one add_reaction after the other.
+- seeder: reactions seeded by ReactionSeeder.
+- buttons: the first page is sent with its navigation buttons.
+
+discord.py runs the requests of one bucket one at a time, so the seeder has the
+same time-to-interactive as the sequential mode. Buttons need no reaction
+request at all.
+
+Usage:
+    python benchmarks/paginator_seeding.py [--latency 0.08] [--sessions 20]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+# pylint: disable=wrong-import-position
+from discord.state import ConnectionState
+
+from util.paginator import Pages, ReactionDispatcher
+
+REACTION_BUCKET_RESET = 0.25
+
+
+class FakeHTTP:
+    """Stand-in for the discord.py HTTP client with per bucket locks."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.locks = {}
+        self.requests = 0
+
+    async def call(self, bucket, reset_after=0.0):
+        """Simulates a request, keeping the bucket locked until it resets."""
+        lock = self.locks.setdefault(bucket, asyncio.Lock())
+        async with lock:
+            self.requests += 1
+            await asyncio.sleep(self.latency)
+            await asyncio.sleep(reset_after)
+
+    async def request(self, route, json=None):  # pylint: disable=redefined-outer-name
+        """Simulates a raw API request, returning a message payload."""
+        await self.call(route.bucket)
+        return {
+            "id": "100",
+            "channel_id": "5",
+            "author": {"id": "1", "username": "bot", "discriminator": "0001"},
+            "content": (json or {}).get("content") or "",
+            "embeds": [],
+            "attachments": [],
+            "mentions": [],
+            "mention_roles": [],
+            "mention_everyone": False,
+            "tts": False,
+            "type": 0,
+            "pinned": False,
+            "edited_timestamp": None,
+        }
+
+
+class FakeMessage:
+    """Stand-in for a sent message."""
+
+    def __init__(self, http, message_id):
+        self.http = http
+        self.id = message_id
+        self.reactions = []
+
+    async def add_reaction(self, emoji):
+        """Adds a reaction through the rate limited reaction bucket."""
+        await self.http.call(f"reactions:{self.id}", REACTION_BUCKET_RESET)
+        self.reactions.append(emoji)
+
+    async def edit(self, **kwargs):
+        """Edits the message."""
+        await self.http.call(f"edit:{self.id}")
+
+    async def clear_reactions(self):
+        """Clears the reactions."""
+        self.reactions.clear()
+
+    async def remove_reaction(self, *args):
+        """Removes a reaction."""
+
+    async def delete(self):
+        """Deletes the message."""
+
+
+class FakeChannel:
+    """Stand-in for a text channel."""
+
+    def __init__(self, http, state):
+        self.http = http
+        self.id = 5
+        self.guild = None
+        self._state = state
+        self.next_id = 100
+
+    async def send(self, content=None, embed=None):
+        """Sends a message."""
+        await self.http.call("send")
+        self.next_id += 1
+        return FakeMessage(self.http, self.next_id)
+
+
+class FakeBot:
+    """Stand-in for the bot, only what the paginator uses."""
+
+    def __init__(self, http):
+        self.http = http
+        self.loop = asyncio.get_event_loop()
+        self.listeners = []
+
+    def add_listener(self, func, name=None):
+        """Registers an event listener."""
+        self.listeners.append((name, func))
+
+
+class FakeContext:  # pylint: disable=too-few-public-methods
+    """Stand-in for a command context."""
+
+    def __init__(self, bot, channel):
+        self.bot = bot
+        self.channel = channel
+        self.message = None
+        self.author = type("Author", (), {"id": 7})()
+
+
+async def wait_until_interactive(pages, mode, expected):
+    """Waits until every navigation control of a session is available."""
+    while pages.session is None:
+        await asyncio.sleep(0.001)
+
+    if mode == "buttons":
+        return
+
+    while len(pages.message.reactions) < expected:
+        await asyncio.sleep(0.001)
+
+
+def create_pages(ctx, mode):
+    """Creates a paginator for a navigation mode."""
+    pages = Pages(
+        ctx, entries=list(range(100)), per_page=10, use_buttons=mode == "buttons"
+    )
+
+    if mode == "sequential":
+
+        async def add_reactions():
+            for emoji in pages.navigation_emojis():
+                await pages.message.add_reaction(emoji)
+
+        pages.add_reactions = add_reactions
+
+    return pages
+
+
+async def run_session(ctx, mode):
+    """Runs one pagination session, returning the time it took to be interactive."""
+    pages = create_pages(ctx, mode)
+
+    start = time.perf_counter()
+    task = asyncio.ensure_future(pages.paginate())
+    await wait_until_interactive(pages, mode, len(pages.navigation_emojis()))
+    elapsed = time.perf_counter() - start
+
+    ReactionDispatcher.of(ctx.bot).close(pages.session)
+    await task
+    return elapsed
+
+
+async def run_mode(mode, latency, sessions):
+    """Runs several sessions one after the other in a navigation mode."""
+    http = FakeHTTP(latency)
+    state = ConnectionState(
+        dispatch=lambda *args: None,
+        handlers={},
+        hooks={},
+        syncer=None,
+        http=None,
+        loop=asyncio.get_event_loop(),
+    )
+    ctx = FakeContext(FakeBot(http), FakeChannel(http, state))
+
+    timings = [await run_session(ctx, mode) for _ in range(sessions)]
+    return {
+        "mode": mode,
+        "sessions": sessions,
+        "latency_seconds": latency,
+        "time_to_interactive_p50": round(statistics.median(timings), 4),
+        "time_to_interactive_max": round(max(timings), 4),
+        "http_requests_per_session": http.requests / sessions,
+    }
+
+
+def main():
+    """Runs the benchmark for every navigation mode."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.08)
+    parser.add_argument("--sessions", type=int, default=20)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    results = [
+        loop.run_until_complete(run_mode(mode, args.latency, args.sessions))
+        for mode in ("sequential", "seeder", "buttons")
+    ]
+
+    print(json.dumps({"benchmark": "paginator_seeding", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
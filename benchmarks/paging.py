@@ -0,0 +1,88 @@
+"""Compares syncing the whole quote catalog with different read-ahead windows.
+
+Goes through every page of the quote list of a local fake Quotes API with
+QuotesApi.iter_quotes, spending some time on every page like a real consumer
+would. A read-ahead of 0 fetches the pages one after the other.
+
+Usage:
+    python benchmarks/paging.py [--quotes 5000] [--per-page 100]
+        [--api-latency 0.02] [--consume-time 0.002]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fakes import FakeQuotesApiServer, configure_environment
+
+READ_AHEADS = (0, 1, 2, 4, 8)
+
+
+async def sync_catalog(api, args, read_ahead):
+    """Goes through every page of the catalog, returning the sync measurements."""
+    pages = records = 0
+    start = time.perf_counter()
+    async for page in api.iter_quotes(per_page=args.per_page, read_ahead=read_ahead):
+        pages += 1
+        records += len(page.records)
+        await asyncio.sleep(args.consume_time)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "read_ahead": read_ahead,
+        "pages": pages,
+        "records": records,
+        "seconds": round(elapsed, 4),
+        "pages_per_second": round(pages / elapsed, 2),
+    }
+
+
+async def run(args):
+    """Syncs the catalog once per read-ahead window."""
+    # pylint: disable=import-outside-toplevel
+    from config import QUOTES_API_KEY
+    from util import QuotesApi
+
+    # Conditional requests would make the later syncs cheaper than the first
+    api = QuotesApi(QUOTES_API_KEY)
+    results = []
+    for read_ahead in READ_AHEADS:
+        api.conditional_responses.clear()
+        results.append(await sync_catalog(api, args, read_ahead))
+    api.close()
+    return results
+
+
+def main():
+    """Runs the syncs against a fresh fake Quotes API."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quotes", type=int, default=5000)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--api-latency", type=float, default=0.02)
+    parser.add_argument("--consume-time", type=float, default=0.002)
+    args = parser.parse_args()
+
+    server = FakeQuotesApiServer(latency=args.api_latency, quotes=args.quotes).start()
+    configure_environment(server)
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        server.stop()
+
+    print(
+        json.dumps(
+            {
+                "benchmark": "paging",
+                "quotes": args.quotes,
+                "per_page": args.per_page,
+                "api_latency_seconds": args.api_latency,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Compares the cost of the messages that aren't commands with every prefix setup.
+
+Chat messages go through the command processing of the bot, with the static
+prefix of plain discord.py and with the per-guild prefixes, a thousand guilds
+having a custom one. Both report the microseconds spent per message.
+
+Usage:
+    python benchmarks/prefixes.py [--messages 200000] [--guilds 1000]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from types import SimpleNamespace
+
+from fakes import FakeQuotesApiServer, configure_environment
+
+# Characters custom prefixes start with, a few guilds use each of them
+PREFIX_CHARACTERS = "!?$%&.,;-+=>"
+
+
+def create_messages(count, guilds, seed=0):
+    """Creates chat messages spread over the guilds."""
+    rng = random.Random(seed)
+    words = ["hello", "quote", "anyone", "around", "today", "nice", "lol", "ok"]
+    return [
+        SimpleNamespace(
+            content=" ".join(rng.choices(words, k=rng.randint(1, 12))),
+            guild=SimpleNamespace(id=rng.randint(1, guilds)),
+            author=SimpleNamespace(id=rng.randint(100, 10000), bot=False),
+            _state=None,
+        )
+        for _ in range(count)
+    ]
+
+
+async def time_messages(process, messages):
+    """Returns the microseconds spent per message by a command processor."""
+    start = time.perf_counter()
+    for message in messages:
+        await process(message)
+    return round((time.perf_counter() - start) / len(messages) * 1e6, 3)
+
+
+async def run(args):
+    """Processes the same messages with both prefix setups."""
+    # pylint: disable=import-outside-toplevel
+    from discord.ext import commands
+
+    import bot
+    import config
+
+    client = bot.FamousQuotesBot(cogs_path=config.COGS_PATH, command_prefix="~")
+    client._connection.user = SimpleNamespace(id=1)  # pylint: disable=protected-access
+
+    rng = random.Random(args.seed)
+    for guild_id in range(1, args.guilds + 1):
+        prefix = rng.choice(PREFIX_CHARACTERS) + rng.choice(("", "q", "quote "))
+        await client.prefixes.set(guild_id, prefix)
+
+    messages = create_messages(args.messages, args.guilds, args.seed)
+    resolver = client.command_prefix
+
+    # Plain discord.py, parsing every message against a single static prefix
+    client.command_prefix = "~"
+    static = await time_messages(
+        lambda message: commands.Bot.process_commands(client, message), messages
+    )
+
+    client.command_prefix = resolver
+    per_guild = await time_messages(client.process_commands, messages)
+
+    await client.close()
+    return [
+        {"setup": "static", "microseconds_per_message": static},
+        {"setup": "per_guild", "microseconds_per_message": per_guild},
+    ]
+
+
+def main():
+    """Runs both setups with a temporary local store."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # The bot modules read their configuration from the environment on import
+    server = FakeQuotesApiServer()
+    configure_environment(server)
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        server.server_close()
+
+    print(
+        json.dumps(
+            {
+                "benchmark": "prefixes",
+                "messages": args.messages,
+                "guilds": args.guilds,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
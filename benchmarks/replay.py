@@ -0,0 +1,362 @@
+"""Replays a recorded gateway event trace into the bot to test its capacity.
+
+Traces are recorded by the bot when TRACE_PATH is set. The replay feeds the
+events to the discord.py connection state at 1x to 100x their recorded pace,
+so they go through the same parsing and dispatching as live traffic, with the
+Discord HTTP client and the Quotes API replaced by local stand-ins. It reports
+the event loop lag, the command latency and the memory growth as JSON.
+
+A synthetic trace with the same shape can be created to try the harness without
+a recording.
+
+Usage:
+    python benchmarks/replay.py synthesize trace.jsonl.gz [--events 5000]
+    python benchmarks/replay.py run trace.jsonl.gz [--speed 10]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import resource
+import sys
+import time
+from collections import Counter, defaultdict, deque
+
+from fakes import (
+    SRC_PATH,
+    FakeDiscordHTTP,
+    FakeQuotesApiServer,
+    configure_environment,
+)
+
+# Seconds between two event loop lag samples
+LAG_INTERVAL = 0.01
+
+# Commands typed by the users of a synthetic trace, with their weights
+SYNTHETIC_COMMANDS = {
+    "quote": 60,
+    "quote love": 10,
+    "quotes 3": 10,
+    "tags": 5,
+    "about": 5,
+    "help": 5,
+    "saved": 5,
+}
+
+
+def percentile(values, fraction):
+    """Returns a percentile of a list of values."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def milliseconds(value):
+    """Rounds a duration in seconds to milliseconds."""
+    return None if value is None else round(value * 1000, 3)
+
+
+def current_rss_kb():
+    """Returns the current resident set size of the process."""
+    try:
+        with open("/proc/self/statm", encoding="utf-8") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * resource.getpagesize() // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def synthesize(args):
+    """Writes a synthetic trace through the trace recorder."""
+    # pylint: disable=import-outside-toplevel, too-many-locals
+    sys.path.insert(0, SRC_PATH)
+    from util import TraceRecorder
+
+    rng = random.Random(args.seed)
+    recorder = TraceRecorder(args.trace, command_prefix="~")
+    now = recorder.started_at
+    ids = iter(range(10**17, 10**18))
+
+    def user(user_id, bot=False):
+        return {
+            "id": str(user_id),
+            "username": "someone",
+            "discriminator": "1234",
+            "avatar": None,
+            "bot": bot,
+        }
+
+    bot_user = user(next(ids), bot=True)
+    recorder.record({"op": 0, "t": "READY", "d": {"user": bot_user}}, now)
+
+    guilds = []
+    for _ in range(args.guilds):
+        guild_id = str(next(ids))
+        channels = [str(next(ids)) for _ in range(5)]
+        users = [str(next(ids)) for _ in range(20)]
+        guilds.append((guild_id, channels, users))
+        guild = {
+            "id": guild_id,
+            "name": "A guild",
+            "owner_id": users[0],
+            "member_count": rng.randint(10, 5000),
+            "roles": [
+                {"id": guild_id, "name": "@everyone", "permissions": "104324673"}
+            ],
+            "channels": [
+                {"id": channel_id, "type": 0, "name": "general", "position": index}
+                for index, channel_id in enumerate(channels)
+            ],
+            "members": [{"user": bot_user, "roles": [], "joined_at": None}],
+        }
+        recorder.record({"op": 0, "t": "GUILD_CREATE", "d": guild}, now)
+
+    commands = list(SYNTHETIC_COMMANDS)
+    weights = list(SYNTHETIC_COMMANDS.values())
+    bot_messages = []
+    events = len(guilds) + 1
+
+    while events < args.events:
+        now += rng.expovariate(args.rate)
+        guild_id, channels, users = rng.choice(guilds)
+        channel_id, user_id = rng.choice(channels), rng.choice(users)
+        member = {"user": user(user_id), "roles": [], "joined_at": None}
+
+        if bot_messages and rng.random() < 0.2:
+            # Reactions to the quotes sent by the bot, or page turns
+            message_guild, message_channel, message_id = rng.choice(bot_messages)
+            emoji = rng.choice(["❤️", "⭐", "\N{BLACK RIGHT-POINTING TRIANGLE}"])
+            reaction = {
+                "user_id": user_id,
+                "channel_id": message_channel,
+                "message_id": message_id,
+                "guild_id": message_guild,
+                "emoji": {"id": None, "name": emoji},
+                "member": member,
+            }
+            recorder.record({"op": 0, "t": "MESSAGE_REACTION_ADD", "d": reaction}, now)
+            events += 1
+            continue
+
+        is_command = rng.random() < 0.5
+        content = (
+            "~" + rng.choices(commands, weights)[0] if is_command else "hello " * 5
+        )
+        message = {
+            "id": str(next(ids)),
+            "channel_id": channel_id,
+            "guild_id": guild_id,
+            "author": user(user_id),
+            "member": member,
+            "content": content,
+            "timestamp": "2021-01-01T00:00:00.000000+00:00",
+            "type": 0,
+        }
+        recorder.record({"op": 0, "t": "MESSAGE_CREATE", "d": message}, now)
+        events += 1
+
+        if is_command:
+            # The reply of the bot, received through the gateway like any message
+            reply = dict(message, id=str(next(ids)), author=bot_user, content="")
+            reply.pop("member")
+            bot_messages.append((guild_id, channel_id, reply["id"]))
+            recorder.record({"op": 0, "t": "MESSAGE_CREATE", "d": reply}, now + 0.05)
+            events += 1
+
+    recorder.close()
+    return {"trace": args.trace, "events": recorder.events}
+
+
+class ReplayStats:
+    """Measurements taken while a trace is replayed."""
+
+    def __init__(self):
+        self.command_latencies = defaultdict(list)
+        self.loop_lags = []
+        self.feed_lags = []
+
+    async def sample_loop_lag(self):
+        """Measures how late the event loop wakes up a sleeping task."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LAG_INTERVAL
+            await asyncio.sleep(LAG_INTERVAL)
+            self.loop_lags.append(max(loop.time() - expected, 0.0))
+
+    def time_commands(self, client):
+        """Wraps the command invocation of the bot to measure its latency."""
+        invoke = client.invoke
+
+        async def timed_invoke(ctx):
+            start = time.perf_counter()
+            try:
+                await invoke(ctx)
+            finally:
+                if ctx.command is not None:
+                    latencies = self.command_latencies[ctx.command.qualified_name]
+                    latencies.append(time.perf_counter() - start)
+
+        client.invoke = timed_invoke
+
+
+async def replay(args, server):
+    """Feeds the events of a trace to the bot, returning the measurements."""
+    # pylint: disable=import-outside-toplevel, too-many-locals, protected-access
+    import discord
+
+    import bot
+    import config
+    from util import ReactionDispatcher, load_trace
+
+    header, events = load_trace(args.trace)
+
+    # The ids of the messages sent by the bot are handed out again when the
+    # replayed bot sends its messages, so the recorded reactions find them
+    ready = next((data for _, kind, data in events if kind == "READY"), None)
+    bot_user = (
+        ready["user"]
+        if ready
+        else {
+            "id": "1",
+            "username": "bot",
+            "discriminator": "0000",
+            "avatar": None,
+            "bot": True,
+        }
+    )
+    sent_ids = defaultdict(deque)
+    for _, kind, data in events:
+        if kind == "MESSAGE_CREATE" and data["author"]["id"] == bot_user["id"]:
+            sent_ids[data["channel_id"]].append(data["id"])
+
+    client = bot.FamousQuotesBot(
+        cogs_path=config.COGS_PATH,
+        command_prefix=header.get("command_prefix") or "~",
+        **bot.create_client_options(lean_mode=True),
+    )
+    http = FakeDiscordHTTP(bot_user, args.discord_latency, sent_ids)
+    client.http.request = http.request
+
+    state = client._connection
+    state.user = discord.ClientUser(state=state, data=bot_user)
+    await client.prepare_caches()
+
+    stats = ReplayStats()
+    stats.time_commands(client)
+    lag_task = asyncio.ensure_future(stats.sample_loop_lag())
+
+    loop = asyncio.get_running_loop()
+    rss_start = current_rss_kb()
+    start = loop.time()
+    counts = Counter()
+
+    for offset, kind, data in events:
+        if kind == "READY":
+            continue
+
+        delay = start + offset / args.speed - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            stats.feed_lags.append(-delay)
+
+        state.parsers[kind](data)
+        counts[kind] += 1
+
+    # Let the commands that are still running finish, ending the pagination
+    # sessions as soon as they open
+    deadline = loop.time() + args.drain_timeout
+    while client.inflight_tasks and loop.time() < deadline:
+        ReactionDispatcher.of(client).close_all()
+        await asyncio.wait(list(client.inflight_tasks), timeout=0.1)
+
+    duration = loop.time() - start
+    rss_end = current_rss_kb()
+    lag_task.cancel()
+    await client.close()
+
+    # Paginated commands last until their pagination session ends
+    latencies = [
+        value for values in stats.command_latencies.values() for value in values
+    ]
+    by_command = {
+        name: {
+            "commands": len(values),
+            "latency_p50_ms": milliseconds(percentile(values, 0.5)),
+            "latency_p99_ms": milliseconds(percentile(values, 0.99)),
+        }
+        for name, values in sorted(stats.command_latencies.items())
+    }
+
+    return {
+        "benchmark": "replay",
+        "trace": args.trace,
+        "speed": args.speed,
+        "events": sum(counts.values()),
+        "events_by_type": dict(counts),
+        "duration_seconds": round(duration, 3),
+        "commands": len(latencies),
+        "command_latency_p50_ms": milliseconds(percentile(latencies, 0.5)),
+        "command_latency_p99_ms": milliseconds(percentile(latencies, 0.99)),
+        "commands_by_name": by_command,
+        "loop_lag_p50_ms": milliseconds(percentile(stats.loop_lags, 0.5)),
+        "loop_lag_p99_ms": milliseconds(percentile(stats.loop_lags, 0.99)),
+        "loop_lag_max_ms": milliseconds(max(stats.loop_lags, default=None)),
+        "feed_lag_max_ms": milliseconds(max(stats.feed_lags, default=0.0)),
+        "rss_start_kb": rss_start,
+        "rss_end_kb": rss_end,
+        "rss_growth_kb": rss_end - rss_start,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "discord_requests": http.requests,
+        "upstream_requests": server.requests,
+    }
+
+
+def run(args):
+    """Replays a trace against a fresh fake Quotes API."""
+    server = FakeQuotesApiServer(
+        latency=args.api_latency, error_rate=args.error_rate
+    ).start()
+    configure_environment(server)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(replay(args, server))
+    finally:
+        server.stop()
+
+
+def main():
+    """Synthesizes or replays a trace."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    synthesize_parser = subparsers.add_parser("synthesize")
+    synthesize_parser.add_argument("trace")
+    synthesize_parser.add_argument("--events", type=int, default=5000)
+    synthesize_parser.add_argument("--rate", type=float, default=20.0)
+    synthesize_parser.add_argument("--guilds", type=int, default=50)
+    synthesize_parser.add_argument("--seed", type=int, default=0)
+
+    run_parser = subparsers.add_parser("run")
+    run_parser.add_argument("trace")
+    run_parser.add_argument("--speed", type=float, default=1.0)
+    run_parser.add_argument("--api-latency", type=float, default=0.02)
+    run_parser.add_argument("--discord-latency", type=float, default=0.05)
+    run_parser.add_argument("--error-rate", type=float, default=0.0)
+    run_parser.add_argument("--drain-timeout", type=float, default=30.0)
+
+    args = parser.parse_args()
+    if args.action == "run" and not 1 <= args.speed <= 100:
+        parser.error("--speed must be between 1 and 100")
+
+    result = synthesize(args) if args.action == "synthesize" else run(args)
+    print(json.dumps(result, indent=2))
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Measures the quote search index: builds, searches, memory and loop lag.
+
+A synthetic corpus with a Zipf distributed vocabulary is indexed at once, then
+a small batch of new quotes is added incrementally. Queries are ranked with the
+top-k heap selection of the index and, for comparison, with a full sort of
+every match. The event loop lag is sampled while the index is built on its
+worker thread.
+
+Usage:
+    python benchmarks/search.py [--quotes 50000] [--queries 2000]
+"""
+
+import argparse
+import asyncio
+import heapq
+import json
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+from util.search import SearchIndex, tokenize  # pylint: disable=wrong-import-position
+
+
+def create_quotes(count, vocabulary, seed=0, start=0):
+    """Creates quotes whose words follow a Zipf distribution."""
+    rng = random.Random(seed)
+    words = [f"word{index}" for index in range(vocabulary)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    return [
+        SimpleNamespace(
+            key=start + index,
+            quote_text=" ".join(rng.choices(words, weights, k=rng.randint(6, 30))),
+        )
+        for index in range(count)
+    ]
+
+
+def percentile(values, fraction):
+    """Returns a percentile of a list of values."""
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def milliseconds(value):
+    """Rounds a duration in seconds to milliseconds."""
+    return round(value * 1000, 3)
+
+
+def sorted_search(index, query, limit):
+    """Ranks every match with a full sort, the baseline of the heap selection."""
+    heapq_nlargest = heapq.nlargest
+    try:
+        heapq.nlargest = lambda n, items, key: sorted(items, key=key, reverse=True)[:n]
+        return index.search(query, limit)
+    finally:
+        heapq.nlargest = heapq_nlargest
+
+
+def posting_bytes(index):
+    """Returns the bytes of the posting arrays and of the same postings as lists."""
+    arrays = lists = 0
+    for doc_ids, counts in index.postings.values():
+        arrays += sys.getsizeof(doc_ids) + sys.getsizeof(counts)
+        lists += sys.getsizeof(list(doc_ids)) + sys.getsizeof(list(counts))
+        lists += 28 * len(doc_ids)
+    return arrays, lists
+
+
+async def build_with_lag(index, quotes, page_size):
+    """Indexes the quotes page by page on the index thread, sampling the loop lag."""
+    lags = []
+    done = asyncio.Event()
+
+    async def sample():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    sampler = asyncio.ensure_future(sample())
+    start = time.perf_counter()
+    for offset in range(0, len(quotes), page_size):
+        await index.run(index.add, quotes[offset : offset + page_size])
+    elapsed = time.perf_counter() - start
+    done.set()
+    await sampler
+    return elapsed, max(lags, default=0.0)
+
+
+async def run(args):
+    """Builds the index, extends it and runs the queries."""
+    quotes = create_quotes(args.quotes, args.vocabulary, args.seed)
+    index = SearchIndex()
+
+    build_seconds, max_lag = await build_with_lag(index, quotes, 100)
+
+    new_quotes = create_quotes(
+        args.quotes // 100, args.vocabulary, args.seed + 1, start=args.quotes
+    )
+    start = time.perf_counter()
+    added = index.add(quotes[-1000:] + new_quotes)
+    incremental_seconds = time.perf_counter() - start
+
+    rng = random.Random(args.seed)
+    queries = [
+        " ".join(rng.choice(quote.quote_text.split()) for _ in range(rng.randint(1, 3)))
+        for quote in rng.choices(quotes, k=args.queries)
+    ]
+
+    timings = {"heap": [], "sort": []}
+    for query in queries:
+        start = time.perf_counter()
+        best = index.search(query, args.limit)
+        timings["heap"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        assert sorted_search(index, query, args.limit) == best
+        timings["sort"].append(time.perf_counter() - start)
+
+    arrays, lists = posting_bytes(index)
+    index.close()
+
+    return {
+        "benchmark": "search",
+        "quotes": len(index),
+        "terms": len(index.postings),
+        "tokens_per_quote": round(
+            sum(len(tokenize(quote.quote_text)) for quote in quotes[:1000]) / 1000, 2
+        ),
+        "build_seconds": round(build_seconds, 3),
+        "max_loop_lag_during_build_ms": milliseconds(max_lag),
+        "incremental_quotes_added": added,
+        "incremental_seconds": round(incremental_seconds, 4),
+        "posting_bytes_arrays": arrays,
+        "posting_bytes_lists": lists,
+        "results": [
+            {
+                "ranking": ranking,
+                "latency_p50_ms": milliseconds(percentile(values, 0.5)),
+                "latency_p99_ms": milliseconds(percentile(values, 0.99)),
+            }
+            for ranking, values in timings.items()
+        ],
+    }
+
+
+def main():
+    """Runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quotes", type=int, default=50000)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""Benchmark suite of the bot commands against local stand-ins.
+
+Starts a fake Quotes API on localhost and drives the commands of the real cogs
+with fake Discord contexts at high concurrency. Every scenario runs in its own
+process, so the peak RSS numbers don't mix, and reports its throughput, latency
+percentiles and the upstream requests it made. The output is JSON, so runs of
+two commits can be compared with any JSON diff.
+
+Scenarios:
+
+- quote: QuoteCog.quote in many channels.
+- quote_tags: QuoteCog.quote_tags until its paginator is interactive.
+- about: StatsCog.about with a few hundred guilds in the cache.
+- refresh: QuoteCog.refresh_tags and a corpus sync of every quote page, with an
+  unchanged catalog so the conditional requests are answered 304.
+- cache_dict: CacheDict gets and sets with a skewed key distribution.
+- paginator: Pages sessions with three page turns each.
+
+Usage:
+    python benchmarks/suite.py [--operations 2000] [--concurrency 100]
+        [--api-latency 0.02] [--discord-latency 0.005] [--error-rate 0.0]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+from fakes import (
+    FakeChannel,
+    FakeContext,
+    FakeQuotesApiServer,
+    configure_environment,
+)
+
+SCENARIOS = ("quote", "quote_tags", "about", "refresh", "cache_dict", "paginator")
+
+
+def percentile(values, fraction):
+    """Returns a percentile of a list of values."""
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def summarize(scenario, args, timings, elapsed, **extra):
+    """Creates the result of a scenario."""
+    result = {
+        "scenario": scenario,
+        "operations": len(timings),
+        "concurrency": args.concurrency,
+        "seconds": round(elapsed, 4),
+        "throughput_per_second": round(len(timings) / elapsed, 2),
+        "latency_p50_ms": round(percentile(timings, 0.5) * 1000, 3),
+        "latency_p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    result.update(extra)
+    return result
+
+
+async def run_concurrently(operation, operations, concurrency):
+    """Runs an operation a number of times with a pool of workers.
+
+    Returns the latency of every run and the total time it took.
+    """
+    timings = []
+    remaining = iter(range(operations))
+
+    async def worker():
+        for index in remaining:
+            start = time.perf_counter()
+            await operation(index)
+            timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return timings, time.perf_counter() - start
+
+
+async def wait_for_session(bot, channel):
+    """Waits until the paginator of the last message of a channel is interactive."""
+    from util import ReactionDispatcher  # pylint: disable=import-outside-toplevel
+
+    dispatcher = ReactionDispatcher.of(bot)
+    while True:
+        if channel.messages:
+            session = dispatcher.sessions.get(channel.messages[-1].id)
+            if session is not None and session.waiter is not None:
+                return dispatcher, session
+        await asyncio.sleep(0.001)
+
+
+async def press(dispatcher, session, emoji):
+    """Reacts to a paginated message as its author."""
+    payload = SimpleNamespace(
+        message_id=session.message_id, user_id=session.user_id, emoji=emoji, member=None
+    )
+    await dispatcher.on_raw_reaction_add(payload)
+
+
+async def create_bot():
+    """Creates the bot with every cog loaded, without connecting to Discord."""
+    import bot  # pylint: disable=import-outside-toplevel
+    import config  # pylint: disable=import-outside-toplevel
+
+    return bot.FamousQuotesBot(cogs_path=config.COGS_PATH, command_prefix="~")
+
+
+async def run_quote(args, server):
+    """Sends random quotes to many channels."""
+    client = await create_bot()
+    cog = client.get_cog("Quote")
+    channels = [FakeChannel(args.discord_latency) for _ in range(args.channels)]
+
+    async def operation(index):
+        ctx = FakeContext(client, channels[index % len(channels)])
+        await cog.quote(ctx)
+
+    timings, elapsed = await run_concurrently(
+        operation, args.operations, args.concurrency
+    )
+    return summarize("quote", args, timings, elapsed, upstream_requests=server.requests)
+
+
+async def run_quote_tags(args, server):
+    """Sends the tag list until its paginator is interactive, then stops it."""
+    client = await create_bot()
+    cog = client.get_cog("Quote")
+    await cog.cog_warm_up()
+
+    async def operation(index):
+        channel = FakeChannel(args.discord_latency)
+        task = asyncio.ensure_future(cog.quote_tags(FakeContext(client, channel)))
+        dispatcher, session = await wait_for_session(client, channel)
+        await press(dispatcher, session, "\N{BLACK SQUARE FOR STOP}")
+        await task
+
+    timings, elapsed = await run_concurrently(
+        operation, args.operations, args.concurrency
+    )
+    return summarize(
+        "quote_tags", args, timings, elapsed, upstream_requests=server.requests
+    )
+
+
+async def run_about(args, server):
+    """Sends the about embed with a few hundred guilds in the cache."""
+    # pylint: disable=import-outside-toplevel
+    from gateway_modes import create_guild_payload
+
+    client = await create_bot()
+    for guild_id in range(1, args.guilds + 1):
+        client._connection._add_guild_from_data(  # pylint: disable=protected-access
+            create_guild_payload(guild_id, 500, with_members=False)
+        )
+
+    cog = client.get_cog("Stats")
+    channel = FakeChannel(args.discord_latency)
+
+    async def operation(index):
+        await cog.about(FakeContext(client, channel))
+
+    timings, elapsed = await run_concurrently(
+        operation, args.operations, args.concurrency
+    )
+    return summarize("about", args, timings, elapsed, upstream_requests=server.requests)
+
+
+async def run_refresh(args, server):
+    """Refreshes the tag list and syncs every page of the quote corpus."""
+    from util import metrics  # pylint: disable=import-outside-toplevel
+
+    client = await create_bot()
+    cog = client.get_cog("Quote")
+    per_page = 100
+    pages = -(-args.quotes // per_page)
+
+    async def operation(index):
+        await cog.refresh_tags()
+        for page in range(1, pages + 1):
+            await cog.api.run(
+                cog.api.fetch_quotes, {"page": page, "per_page": per_page}
+            )
+
+    timings, elapsed = await run_concurrently(operation, args.operations // 10 or 1, 1)
+    result = summarize(
+        "refresh", args, timings, elapsed, upstream_requests=server.requests
+    )
+    result["concurrency"] = 1
+    result["upstream_bytes"] = server.bytes_sent
+    result["bytes_saved"] = metrics.counters.get("quotes_api.bytes_saved", 0)
+    return result
+
+
+async def run_cache_dict(args, server):  # pylint: disable=unused-argument
+    """Runs batches of CacheDict gets and sets, most of them on a few hot keys."""
+    from util import CacheDict  # pylint: disable=import-outside-toplevel
+
+    cache = CacheDict(10000)
+    rng = random.Random(0)
+    batch_size = 1000
+    keys = [int(rng.paretovariate(1.2) * 100) for _ in range(batch_size * 10)]
+
+    async def operation(index):
+        offset = (index % 10) * batch_size
+        for key in keys[offset : offset + batch_size]:
+            if key in cache:
+                cache[key]  # pylint: disable=pointless-statement
+            else:
+                cache[key] = key
+
+    timings, elapsed = await run_concurrently(operation, args.operations, 1)
+    result = summarize("cache_dict", args, timings, elapsed, batch_size=batch_size)
+    result["concurrency"] = 1
+    result["cache_operations_per_second"] = round(
+        len(timings) * batch_size / elapsed, 2
+    )
+    return result
+
+
+async def run_paginator(args, server):  # pylint: disable=unused-argument
+    """Runs paginator sessions with three page turns each."""
+    from util import Pages  # pylint: disable=import-outside-toplevel
+
+    client = await create_bot()
+    entries = [f"Entry {index}" for index in range(200)]
+
+    async def operation(index):
+        channel = FakeChannel(args.discord_latency)
+        pages = Pages(FakeContext(client, channel), entries=entries, per_page=10)
+        task = asyncio.ensure_future(pages.paginate())
+
+        for emoji in ["\N{BLACK RIGHT-POINTING TRIANGLE}"] * 3:
+            dispatcher, session = await wait_for_session(client, channel)
+            await press(dispatcher, session, emoji)
+            await asyncio.sleep(0)
+
+        dispatcher, session = await wait_for_session(client, channel)
+        await press(dispatcher, session, "\N{BLACK SQUARE FOR STOP}")
+        await task
+
+    timings, elapsed = await run_concurrently(
+        operation, args.operations, args.concurrency
+    )
+    return summarize("paginator", args, timings, elapsed)
+
+
+def run_scenario(args):
+    """Runs a single scenario against a fresh fake Quotes API."""
+    server = FakeQuotesApiServer(
+        latency=args.api_latency,
+        error_rate=args.error_rate,
+        quotes=args.quotes,
+        validators=not args.no_validators,
+    ).start()
+
+    configure_environment(server)
+
+    runner = globals()[f"run_{args.scenario}"]
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(runner(args, server))
+    finally:
+        server.stop()
+
+
+def main():
+    """Runs every scenario in its own process."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--operations", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--channels", type=int, default=200)
+    parser.add_argument("--guilds", type=int, default=500)
+    parser.add_argument("--quotes", type=int, default=1000)
+    parser.add_argument("--api-latency", type=float, default=0.02)
+    parser.add_argument("--discord-latency", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--no-validators", action="store_true")
+    parser.add_argument("--scenario", choices=SCENARIOS)
+    args, _ = parser.parse_known_args()
+
+    if args.scenario:
+        print(json.dumps(run_scenario(args)))
+        return
+
+    results = []
+    for scenario in SCENARIOS:
+        output = subprocess.run(
+            [sys.executable, __file__, "--scenario", scenario] + sys.argv[1:],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    print(
+        json.dumps(
+            {
+                "benchmark": "suite",
+                "python": sys.version.split()[0],
+                "api_latency_seconds": args.api_latency,
+                "discord_latency_seconds": args.discord_latency,
+                "error_rate": args.error_rate,
+                "validators": not args.no_validators,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
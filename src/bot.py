@@ -1,42 +1,453 @@
 """Discord bot client file."""
 
+import asyncio
+import importlib
 import os
+import signal
+import time
 from datetime import datetime
 
 import discord
 from discord.ext import commands
 
-from util import generate_logger
+from util import (
+    generate_logger,
+    ReactionDispatcher,
+    find_extension_commands,
+    find_extension_imports,
+    save_snapshot,
+    load_snapshot,
+    TraceRecorder,
+    create_cache_backend,
+    LocalStore,
+    GuildPrefixes,
+)
 from config import (
     SUPPORT_SERVER_INVITE_URL,
     BOT_INVITE_URL,
     DISCORD_TOKEN,
     COMMAND_PREFIX,
     COGS_PATH,
+    LEAN_MODE,
+    LAZY_COGS,
+    SNAPSHOT_PATH,
+    SNAPSHOT_MAX_AGE,
+    SHUTDOWN_TIMEOUT,
+    TRACE_PATH,
+    CACHE_URL,
 )
 
 logger = generate_logger(__name__)
 
 
+def create_client_options(lean_mode=False):
+    """Returns the gateway intents and cache options for the bot client.
+
+    The default mode requests the privileged members intent and keeps every member
+    of every guild in memory. Lean mode only subscribes to the events the cogs
+    listen to and relies on ``guild.member_count`` instead of the member cache.
+    """
+    if not lean_mode:
+        intents = discord.Intents.default()
+        intents.members = True
+        return {"intents": intents}
+
+    # Guilds are needed for the channel cache, messages for commands and
+    # reactions for quote forwarding and the paginators
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_messages = True
+    intents.dm_messages = True
+    intents.guild_reactions = True
+    intents.dm_reactions = True
+
+    # Reaction forwarding works with raw reaction events, so no message
+    # needs to be kept in the message cache
+    return {
+        "intents": intents,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "chunk_guilds_at_startup": False,
+        "max_messages": None,
+    }
+
+
 class FamousQuotesBot(commands.Bot):
     """Discord Bot Client."""
 
-    def __init__(self, cogs_path, *args, **kwargs):
+    def __init__(  # pylint: disable=too-many-arguments
+        self, cogs_path, *args, lazy_cogs=(), trace_path=None, cache_url=None, **kwargs
+    ):
         super().__init__(*args, **kwargs)
         self.cogs_path = cogs_path
+        self.lazy_cogs = set(lazy_cogs)
+
+        # Cache shared by the cogs, and by the bot processes if it's a shared one
+        self.cache_backend = create_cache_backend(cache_url)
+
+        # Prefixes of the guilds are resolved from memory for every message, the
+        # command_prefix option is the default one
+        self.prefixes = GuildPrefixes(LocalStore.of(self), self.command_prefix)
+        self.command_prefix = self.prefixes.resolve
+
+        # Opt-in recording of the gateway events, for load tests with real traffic
+        self.trace_recorder = None
+        if trace_path:
+            self.trace_recorder = TraceRecorder(
+                trace_path, command_prefix=kwargs.get("command_prefix")
+            )
+
+        # Seconds spent importing the dependencies of every loaded extension,
+        # then running its module and setup
+        self.extension_timings = {}
+
+        # Command stubs registered for the extensions that haven't been loaded yet
+        self.lazy_commands = {}
+
+        self.warm_up_task = None
+
+        # Event handler tasks that are still running, drained on shutdown
+        self.inflight_tasks = set()
+        self.accepting_commands = True
+        self.shutdown_task = None
 
         # Load extensions when initialising the bot
         self.load_extensions()
 
     def load_extensions(self):
         """Load bot cogs."""
-        for filename in os.listdir(self.cogs_path):
+        for filename in sorted(os.listdir(self.cogs_path)):
             if filename.endswith(".py"):
                 extension = filename[:-3]
+                if extension in self.lazy_cogs:
+                    self.register_lazy_extension(extension)
+                else:
+                    self.load_timed_extension(extension)
+
+    def load_timed_extension(self, extension):
+        """Loads an extension, recording how long its dependencies and load took.
+
+        Returns whether the extension was loaded.
+        """
+        name = f"cogs.{extension}"
+        path = os.path.join(self.cogs_path, f"{extension}.py")
+        start = time.perf_counter()
+
+        try:
+            # Importing the top-level dependencies first keeps their cost apart
+            # from load_extension, which runs the extension module and its setup,
+            # so the module itself must not be imported here. Dependencies shared
+            # by several extensions are only charged to the first one loaded
+            for module in find_extension_imports(path):
+                importlib.import_module(module)
+            imported = time.perf_counter()
+            self.load_extension(name)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error("Failed to load extension %s\n%s", extension, exc)
+            return False
+
+        finished = time.perf_counter()
+        self.extension_timings[extension] = {
+            "dependencies": imported - start,
+            "load": finished - imported,
+        }
+        logger.info(
+            "Loaded extension %s (dependencies: %.2f ms, module and setup: %.2f ms)",
+            extension,
+            (imported - start) * 1000,
+            (finished - imported) * 1000,
+        )
+
+        self.dispatch("extension_loaded", extension)
+
+        # Extensions loaded once the bot is ready still need their caches warmed up
+        if self.warm_up_task is not None:
+            cogs = [cog for cog in self.cogs.values() if cog.__module__ == name]
+            self.loop.create_task(self.warm_up_cogs(cogs))
+
+        return True
+
+    def register_lazy_extension(self, extension):
+        """Registers command stubs that load the extension on their first use."""
+        path = os.path.join(self.cogs_path, f"{extension}.py")
+
+        try:
+            extension_commands = find_extension_commands(path)
+        except (OSError, SyntaxError) as exc:
+            logger.error("Failed to register lazy extension %s\n%s", extension, exc)
+            return
+
+        stubs = []
+        for attrs in extension_commands:
+            stub = self.create_lazy_command(extension, **attrs)
+            self.add_command(stub)
+            stubs.append(stub)
+
+        self.lazy_commands[extension] = stubs
+        logger.info("Registered lazy extension %s (%s commands)", extension, len(stubs))
+
+    def create_lazy_command(self, extension, **attrs):
+        """Creates a command stub that loads an extension and runs the real command."""
+
+        async def lazy_command(ctx):
+            # The real command is invoked again on the same message once loaded
+            if self.load_lazy_extension(extension):
+                await self.process_commands(ctx.message)
+
+        return commands.Command(lazy_command, **attrs)
+
+    def load_lazy_extension(self, extension):
+        """Replaces the command stubs of a lazy extension by the extension itself."""
+        if f"cogs.{extension}" in self.extensions:
+            return True
+
+        stubs = self.lazy_commands.pop(extension, [])
+        for stub in stubs:
+            self.remove_command(stub.name)
+
+        if self.load_timed_extension(extension):
+            return True
+
+        # Put the stubs back so the extension can be loaded on a later try
+        for stub in stubs:
+            self.add_command(stub)
+        self.lazy_commands[extension] = stubs
+        return False
+
+    async def prepare_caches(self):
+        """Restores the cache snapshot and warms up whatever it didn't cover."""
+        await self.restore_snapshot()
+        await self.warm_up_cogs()
+
+    async def restore_snapshot(self):
+        """Restores the cog caches saved by the last graceful shutdown.
+
+        Cogs opt in by defining ``snapshot_version``, ``cog_snapshot`` and
+        ``cog_restore``. States saved with another version are discarded.
+        """
+        snapshot = await self.loop.run_in_executor(
+            None, load_snapshot, SNAPSHOT_PATH, SNAPSHOT_MAX_AGE
+        )
+
+        for name, (version, state) in snapshot.items():
+            cog = self.get_cog(name)
+            if cog is None or not hasattr(cog, "cog_restore"):
+                continue
+
+            if version != getattr(cog, "snapshot_version", None):
+                logger.info("Discarded stale snapshot of cog %s", name)
+                continue
+
+            try:
+                cog.cog_restore(state)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.error("Failed to restore cog %s\n%s", name, exc)
+            else:
+                logger.info("Restored snapshot of cog %s", name)
+
+    def save_snapshot(self):
+        """Saves the cog caches so the next start doesn't begin cold."""
+        cogs = {}
+        for name, cog in self.cogs.items():
+            if hasattr(cog, "cog_snapshot"):
                 try:
-                    self.load_extension(f"cogs.{extension}")
+                    cogs[name] = (cog.snapshot_version, cog.cog_snapshot())
                 except Exception as exc:  # pylint: disable=broad-except
-                    logger.error("Failed to load extension %s\n%s", extension, exc)
+                    logger.error("Failed to snapshot cog %s\n%s", name, exc)
+
+        try:
+            save_snapshot(SNAPSHOT_PATH, cogs)
+        except OSError as exc:
+            logger.error("Failed to save cache snapshot\n%s", exc)
+        else:
+            logger.info("Saved cache snapshot of %s cogs", len(cogs))
+
+    def reload_extension(self, name, *, package=None):
+        """Reloads an extension, handing the live state of its cogs to the new ones.
+
+        Cogs opt in by defining ``cog_handoff``, returning their caches, sessions
+        and tasks, and ``cog_adopt``, taking them over in the new instance. The
+        bot sets ``handed_off`` on the old cog meanwhile, its ``cog_unload`` must
+        leave the handed off resources open then.
+        """
+        name = self._resolve_name(name, package)  # pylint: disable=protected-access
+
+        handoffs = {}
+        for cog_name, cog in self.cogs.items():
+            if cog.__module__ != name or not hasattr(cog, "cog_handoff"):
+                continue
+            try:
+                handoffs[cog_name] = (cog, cog.cog_handoff())
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.error("Failed to hand off cog %s\n%s", cog_name, exc)
+            else:
+                cog.handed_off = True
+
+        # A failed reload rolls back to a new instance of the old cogs, which
+        # takes the state over just the same
+        try:
+            super().reload_extension(name)
+        finally:
+            for cog_name, (old_cog, state) in handoffs.items():
+                self.hand_over_cog(cog_name, old_cog, state)
+
+            # Cogs that weren't handed anything still need their caches warmed up
+            if self.warm_up_task is not None:
+                cogs = [cog for cog in self.cogs.values() if cog.__module__ == name]
+                self.loop.create_task(self.warm_up_cogs(cogs))
+
+    def hand_over_cog(self, name, old_cog, state):
+        """Hands the state of a reloaded cog to its new instance."""
+        cog = self.get_cog(name)
+
+        # The reload failed before the old cog was even unloaded
+        if cog is old_cog:
+            old_cog.handed_off = False
+            return
+
+        if cog is not None and hasattr(cog, "cog_adopt"):
+            try:
+                cog.cog_adopt(state)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.error("Failed to hand over cog %s\n%s", name, exc)
+            else:
+                logger.info("Handed over the state of cog %s", name)
+                return
+
+        # Nothing took the state over, so it's closed like on a plain unload
+        old_cog.handed_off = False
+        old_cog.cog_unload()
+
+    async def close(self):
+        """Saves the cache snapshot, unloads the cogs and closes the connection to Discord."""
+        if not self.is_closed():
+            # Caches are only saved once they were restored, so a failed start
+            # doesn't overwrite a good snapshot with empty caches
+            if self.warm_up_task is not None:
+                self.save_snapshot()
+
+            # Unloading runs the cog_unload hooks, which close the cog resources
+            for extension in list(self.extensions):
+                try:
+                    self.unload_extension(extension)
+                except Exception as exc:  # pylint: disable=broad-except
+                    logger.error("Failed to unload extension %s\n%s", extension, exc)
+
+            if self.trace_recorder is not None:
+                self.trace_recorder.close()
+
+            # The cogs queue their last writes while unloading
+            store = getattr(self, "local_store", None)
+            if store is not None:
+                store.close()
+
+            await self.cache_backend.close()
+
+        await super().close()
+
+    def dispatch(self, event_name, *args, **kwargs):
+        """Dispatches an event, recording the gateway payloads if tracing is on."""
+        if event_name == "socket_response" and self.trace_recorder is not None:
+            self.trace_recorder.record(args[0])
+        super().dispatch(event_name, *args, **kwargs)
+
+    def _schedule_event(self, coro, event_name, *args, **kwargs):
+        """Schedules an event handler, keeping track of it until it's done."""
+        task = super()._schedule_event(coro, event_name, *args, **kwargs)
+        self.inflight_tasks.add(task)
+        task.add_done_callback(self.inflight_tasks.discard)
+        return task
+
+    async def process_commands(self, message):
+        """Processes the commands of a message, unless the bot is shutting down."""
+        if not self.accepting_commands:
+            return
+
+        # Most messages aren't commands, they're rejected before any parsing
+        if not self.prefixes.is_command(message.content):
+            return
+
+        await super().process_commands(message)
+
+    def request_shutdown(self):
+        """Starts the graceful shutdown, called from the signal handlers."""
+        if self.shutdown_task is None:
+            logger.info("Received signal to shut down, draining in-flight work")
+            self.shutdown_task = self.loop.create_task(self.shutdown())
+
+    async def shutdown(self, timeout=SHUTDOWN_TIMEOUT):
+        """Stops taking commands, drains the in-flight work and closes the bot.
+
+        Handlers that are still running after ``timeout`` seconds are cancelled.
+        """
+        self.accepting_commands = False
+
+        # Pagination sessions would otherwise keep their handlers alive for minutes
+        ReactionDispatcher.of(self).close_all()
+
+        tasks = {task for task in self.inflight_tasks if not task.done()}
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            logger.info(
+                "Drained %s in-flight tasks, cancelled %s",
+                len(tasks) - len(pending),
+                len(pending),
+            )
+
+        await self.close()
+
+    async def start(self, *args, **kwargs):
+        """Loads the prefixes of the guilds, then connects to Discord."""
+        await self.prefixes.load()
+        await super().start(*args, **kwargs)
+
+    def run(self, *args, **kwargs):
+        """Runs the bot until it's closed, shutting down gracefully on SIGINT and SIGTERM."""
+        loop = self.loop
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.request_shutdown)
+            except NotImplementedError:
+                pass
+
+        try:
+            loop.run_until_complete(self.start(*args, **kwargs))
+        finally:
+            if not self.is_closed():
+                loop.run_until_complete(self.close())
+
+            # Cancel whatever is left before closing the loop
+            tasks = [task for task in asyncio.all_tasks(loop) if not task.done()]
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    async def warm_up_cogs(self, cogs=None):
+        """Runs the ``cog_warm_up`` hooks of the cogs concurrently."""
+        if cogs is None:
+            cogs = list(self.cogs.values())
+
+        async def timed_warm_up(cog):
+            start = time.perf_counter()
+            await cog.cog_warm_up()
+            return time.perf_counter() - start
+
+        cogs = [cog for cog in cogs if hasattr(cog, "cog_warm_up")]
+        results = await asyncio.gather(
+            *(timed_warm_up(cog) for cog in cogs), return_exceptions=True
+        )
+
+        for cog, result in zip(cogs, results):
+            if isinstance(result, Exception):
+                logger.error("Failed to warm up cog %s\n%s", cog.qualified_name, result)
+            else:
+                logger.info(
+                    "Warmed up cog %s (%.2f ms)", cog.qualified_name, result * 1000
+                )
 
     # Bot Evernt Listeners
     async def on_ready(self):
@@ -45,10 +456,14 @@ class FamousQuotesBot(commands.Bot):
         if not hasattr(self, "uptime"):
             self.uptime = datetime.utcnow()
 
+        # Restore and warm up the caches in the background on the first connection
+        if self.warm_up_task is None:
+            self.warm_up_task = self.loop.create_task(self.prepare_caches())
+
         # Sets bots status and activity
         status = discord.Status.online
         activity = discord.Activity(
-            name=f"{self.command_prefix}help", type=discord.ActivityType.listening
+            name=f"{self.prefixes.default}help", type=discord.ActivityType.listening
         )
         await self.change_presence(status=status, activity=activity, afk=False)
 
@@ -91,14 +506,14 @@ if __name__ == "__main__":
         "very simple commands."
     )
 
-    intents = discord.Intents.default()
-    intents.members = True
-
     famous_quotes_bot = FamousQuotesBot(
         cogs_path=COGS_PATH,
+        lazy_cogs=LAZY_COGS,
+        trace_path=TRACE_PATH,
+        cache_url=CACHE_URL,
         command_prefix=COMMAND_PREFIX,
         description=BOT_DESCRIPTION,
-        intents=intents,
+        **create_client_options(LEAN_MODE),
     )
 
     # Client event lop initialisation
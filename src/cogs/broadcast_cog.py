@@ -0,0 +1,343 @@
+"""Discord bot Broadcast cog."""
+
+import asyncio
+import math
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import discord
+from discord.ext import commands
+
+from util import (
+    generate_logger,
+    QuotesApi,
+    LocalStore,
+    TimerHeap,
+    fan_out,
+    metrics,
+    BACKGROUND,
+)
+from config import QUOTES_API_KEY, BROADCAST_RATE, BROADCAST_WORKERS
+
+logger = generate_logger(__name__)
+
+# Seconds between two broadcasts of every subscription interval
+INTERVALS = {"hourly": 60 * 60, "daily": 60 * 60 * 24}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    interval TEXT NOT NULL,
+    tags TEXT
+);
+CREATE INDEX IF NOT EXISTS subscriptions_guild ON subscriptions (guild_id);
+"""
+
+
+class Subscription:
+    """Quote broadcast subscription of a channel."""
+
+    __slots__ = ("channel_id", "guild_id", "interval", "tags", "deadline")
+
+    def __init__(self, channel_id, guild_id, interval, tags=None):
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.interval = interval
+        self.tags = tags
+        self.deadline = next_deadline(interval)
+
+
+def next_deadline(interval):
+    """Returns the next start of an interval, so subscriptions are broadcast together."""
+    seconds = INTERVALS[interval]
+    return (math.floor(time.time() / seconds) + 1) * seconds
+
+
+class BroadcastCog(commands.Cog, name="Broadcast"):
+    """Broadcast cog class."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.api = QuotesApi(QUOTES_API_KEY)
+        self.store = LocalStore.of(bot)
+        self.store.submit(self.store.executescript, SCHEMA)
+
+        # Subscriptions by channel id, all of them share a single timer task
+        self.subscriptions = {}
+        self.timers = TimerHeap(self.on_subscriptions_due)
+        self.broadcast_tasks = set()
+
+        # Set while the subscriptions and tasks are handed off to a reloaded cog
+        self.handed_off = False
+
+        metrics.gauge("broadcast.subscriptions", lambda: len(self.subscriptions))
+
+    def create_quote_embed(self, quote):  # pylint: disable=no-self-use
+        """Creates the embed of a broadcast quote."""
+        embed = discord.Embed(colour=discord.Colour.blue())
+        embed.title = "Scheduled Quote"
+        embed.description = f"```📜 {quote.quote_text}```"
+        embed.set_thumbnail(url=quote.author_image)
+        embed.add_field(name="Author", value=f"— *{quote.author_name}*")
+        embed.add_field(name="Tags", value=", ".join(quote.tags))
+        embed.timestamp = datetime.utcnow()
+        return embed
+
+    def create_error_embed(self, message):  # pylint: disable=no-self-use
+        """Creates an embed to display an error message."""
+        embed = discord.Embed(colour=discord.Colour.red())
+        embed.title = message
+        return embed
+
+    async def check_manage_channels(self, ctx):
+        """Returns whether the author can manage the channel, telling them if not.
+
+        Checked in the commands rather than as a command check, so the help
+        pages stay the same for every member.
+        """
+        if ctx.channel.permissions_for(ctx.author).manage_channels:
+            return True
+
+        embed = self.create_error_embed(
+            "Sorry, managing the quote broadcasts needs the Manage Channels permission."
+        )
+        await ctx.channel.send(embed=embed)
+        return False
+
+    def add_subscription(self, subscription):
+        """Adds a subscription, replacing the previous one of its channel."""
+        previous = self.subscriptions.pop(subscription.channel_id, None)
+        if previous is not None:
+            self.timers.cancel(previous)
+
+        self.subscriptions[subscription.channel_id] = subscription
+        self.timers.schedule(subscription)
+
+    def remove_subscription(self, channel_id):
+        """Removes the subscription of a channel, returning whether it existed."""
+        subscription = self.subscriptions.pop(channel_id, None)
+        if subscription is None:
+            return False
+
+        self.timers.cancel(subscription)
+        return True
+
+    def on_subscriptions_due(self, subscriptions):
+        """Broadcasts the due subscriptions and schedules their next broadcast."""
+        for subscription in subscriptions:
+            subscription.deadline = next_deadline(subscription.interval)
+            self.timers.schedule(subscription)
+
+        task = self.bot.loop.create_task(self.broadcast(subscriptions))
+        self.broadcast_tasks.add(task)
+        task.add_done_callback(self.broadcast_tasks.discard)
+
+    async def fetch_quote(self, tags):
+        """Fetches a random quote, optionally filtered by tags."""
+        query_params = {"tags": tags} if tags else None
+        return await self.api.run(
+            self.api.fetch_random_quote, query_params=query_params, priority=BACKGROUND
+        )
+
+    async def broadcast(self, subscriptions):
+        """Sends a quote to every subscribed channel.
+
+        Channels subscribed to the same tags share a single quote, so the api is
+        called once per tag filter however many channels there are.
+        """
+        buckets = defaultdict(list)
+        for subscription in subscriptions:
+            buckets[subscription.tags].append(subscription.channel_id)
+
+        quotes = await asyncio.gather(
+            *(self.fetch_quote(tags) for tags in buckets), return_exceptions=True
+        )
+
+        jobs = []
+        for (tags, channel_ids), quote in zip(buckets.items(), quotes):
+            if isinstance(quote, Exception):
+                logger.error("Could not get broadcast quote for tags %s", tags)
+                continue
+
+            # The embed is serialized once for every channel of the bucket
+            embed = self.create_quote_embed(quote).to_dict()
+            jobs.extend((channel_id, embed) for channel_id in channel_ids)
+
+        async def send(job):
+            channel_id, embed = job
+            await self.bot.http.send_message(channel_id, None, embed=embed)
+
+        start = time.perf_counter()
+        failures = await fan_out(
+            jobs, send, workers=BROADCAST_WORKERS, rate=BROADCAST_RATE
+        )
+        metrics.increment("broadcast.sent", len(jobs) - len(failures))
+        metrics.increment("broadcast.failed", len(failures))
+        logger.info(
+            "Broadcast %s quotes to %s channels in %.2fs (%s failed)",
+            len(buckets),
+            len(jobs),
+            time.perf_counter() - start,
+            len(failures),
+        )
+
+        # Channels that were deleted or that the bot can't write to anymore
+        gone = [
+            (channel_id,)
+            for (channel_id, _), exc in failures
+            if isinstance(exc, (discord.Forbidden, discord.NotFound))
+        ]
+        for (channel_id,) in gone:
+            self.remove_subscription(channel_id)
+        if gone:
+            await self.store.run(
+                self.store.executemany,
+                "DELETE FROM subscriptions WHERE channel_id = ?",
+                gone,
+            )
+
+    def cog_unload(self):
+        """Stops the broadcasts and closes the api session when the cog is unloaded."""
+        if self.handed_off:
+            return
+        self.timers.close()
+        for task in self.broadcast_tasks:
+            task.cancel()
+        self.api.close()
+
+    def cog_handoff(self):
+        """Returns the subscriptions, timers and running broadcasts, for the reloaded cog."""
+        return {
+            "api": self.api,
+            "subscriptions": self.subscriptions,
+            "timers": self.timers,
+            "broadcast_tasks": self.broadcast_tasks,
+        }
+
+    def cog_adopt(self, state):
+        """Takes over the subscriptions and running broadcasts of the replaced cog."""
+        self.api.close()
+        self.timers.close()
+        self.api = state["api"]
+        self.subscriptions = state["subscriptions"]
+        self.broadcast_tasks = state["broadcast_tasks"]
+
+        # The timer task keeps running, only the due subscriptions go to this cog now
+        self.timers = state["timers"]
+        self.timers.on_expire = self.on_subscriptions_due
+
+    async def cog_warm_up(self):
+        """Loads the subscriptions from the local store once the bot is ready."""
+        rows = await self.store.run(
+            self.store.execute,
+            "SELECT channel_id, guild_id, interval, tags FROM subscriptions",
+        )
+
+        for channel_id, guild_id, interval, tags in rows:
+            if channel_id not in self.subscriptions and interval in INTERVALS:
+                self.add_subscription(
+                    Subscription(channel_id, guild_id, interval, tags)
+                )
+
+        logger.info("Loaded %s broadcast subscriptions", len(self.subscriptions))
+
+    # Commands
+    @commands.guild_only()
+    @commands.command(
+        name="subscribe",
+        aliases=["sub"],
+        brief="Subscribes the channel to quote broadcasts.",
+        help="Subscribes the channel to hourly or daily quotes, optionally filtered by tags.",
+    )
+    async def subscribe(self, ctx, interval="daily", tags: str = None):
+        """Subscribes the channel to quote broadcasts."""
+        if not await self.check_manage_channels(ctx):
+            return
+
+        interval = interval.lower()
+        if interval not in INTERVALS:
+            embed = self.create_error_embed(
+                f"Sorry, the interval must be one of: {', '.join(INTERVALS)}."
+            )
+            await ctx.channel.send(embed=embed)
+            return
+
+        subscription = Subscription(ctx.channel.id, ctx.guild.id, interval, tags)
+        await self.store.run(
+            self.store.execute,
+            "INSERT OR REPLACE INTO subscriptions VALUES (?, ?, ?, ?)",
+            (subscription.channel_id, subscription.guild_id, interval, tags),
+        )
+        self.add_subscription(subscription)
+
+        embed = discord.Embed(colour=discord.Colour.blue())
+        embed.title = f"This channel will receive {interval} quotes"
+        if tags:
+            embed.description = f"Tags: {tags}"
+        await ctx.channel.send(embed=embed)
+
+    @commands.guild_only()
+    @commands.command(
+        name="unsubscribe",
+        aliases=["unsub"],
+        brief="Unsubscribes the channel from quote broadcasts.",
+        help="Stops the quote broadcasts of the channel.",
+    )
+    async def unsubscribe(self, ctx):
+        """Unsubscribes the channel from quote broadcasts."""
+        if not await self.check_manage_channels(ctx):
+            return
+
+        if not self.remove_subscription(ctx.channel.id):
+            embed = self.create_error_embed("This channel has no subscription.")
+            await ctx.channel.send(embed=embed)
+            return
+
+        await self.store.run(
+            self.store.execute,
+            "DELETE FROM subscriptions WHERE channel_id = ?",
+            (ctx.channel.id,),
+        )
+
+        embed = discord.Embed(colour=discord.Colour.blue())
+        embed.title = "This channel will no longer receive quotes"
+        await ctx.channel.send(embed=embed)
+
+    @commands.guild_only()
+    @commands.command(
+        name="subscriptions",
+        brief="Lists the quote broadcasts of the server.",
+        help="Lists the channels of the server subscribed to quote broadcasts.",
+    )
+    async def list_subscriptions(self, ctx):
+        """Lists the quote broadcast subscriptions of the guild."""
+        rows = await self.store.run(
+            self.store.execute,
+            "SELECT channel_id, interval, tags FROM subscriptions WHERE guild_id = ?",
+            (ctx.guild.id,),
+        )
+
+        embed = discord.Embed(colour=discord.Colour.blue())
+        embed.title = "Quote Subscriptions"
+        embed.description = (
+            "\n".join(
+                f"<#{channel_id}> — {interval}" + (f" ({tags})" if tags else "")
+                for channel_id, interval, tags in rows
+            )
+            or "No channel of this server is subscribed."
+        )
+        await ctx.channel.send(embed=embed)
+
+
+def setup(bot):
+    """Sets up the broadcast cog for the bot."""
+    logger.info("Loading Broadcast Cog")
+    bot.add_cog(BroadcastCog(bot))
+
+
+def teardown(bot):
+    """Tears down the broadcast cog for the bot."""
+    logger.info("Unloading Broadcast Cog")
+    bot.remove_cog("Broadcast")
@@ -0,0 +1,246 @@
+"""Discord bot Bulk cog."""
+
+import asyncio
+import tempfile
+import time
+from contextlib import aclosing
+
+import aiohttp
+import discord
+from discord.ext import commands
+
+from util import (
+    generate_logger,
+    QuotesApi,
+    Pages,
+    BACKGROUND,
+    BulkProgress,
+    ExportWriter,
+    RowReader,
+    import_rows,
+    BULK_FORMATS,
+)
+from config import QUOTES_API_KEY, BULK_WORKERS, BULK_RETRIES
+
+logger = generate_logger(__name__)
+
+# Seconds between two updates of the progress of an import
+PROGRESS_INTERVAL = 2.0
+
+# Number of row errors shown on every page of an import report
+ERRORS_PER_PAGE = 10
+
+# Upload limit of the servers without boosts
+DEFAULT_FILESIZE_LIMIT = 8 * 1024 * 1024
+
+
+class BulkCog(commands.Cog, name="Bulk"):
+    """Bulk cog class."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.api = QuotesApi(QUOTES_API_KEY)
+
+        # Imports still running, cancelled when the cog is unloaded
+        self.import_tasks = set()
+
+        # Set while the api session and imports are handed off to a reloaded cog
+        self.handed_off = False
+
+    def create_progress_embed(
+        self, filename, progress, elapsed
+    ):  # pylint: disable=no-self-use
+        """Creates an embed to display the progress of an import."""
+        embed = discord.Embed(colour=discord.Colour.blue())
+        embed.title = f"{'Imported' if progress.done else 'Importing'} {filename}"
+        embed.add_field(name="📄 Rows", value=f"**{progress.read}** read", inline=True)
+        embed.add_field(
+            name="✅ Written", value=f"**{progress.written}** quotes", inline=True
+        )
+        embed.add_field(
+            name="⚠️ Invalid", value=f"**{progress.invalid}** rows", inline=True
+        )
+        embed.add_field(
+            name="❌ Failed", value=f"**{progress.failed}** writes", inline=True
+        )
+        embed.add_field(
+            name="🔁 Retried", value=f"**{progress.retried}** writes", inline=True
+        )
+        embed.set_footer(text=f"{elapsed:.0f}s elapsed")
+        return embed
+
+    def create_error_embed(self, message):  # pylint: disable=no-self-use
+        """Creates an embed to display an error message."""
+        embed = discord.Embed(colour=discord.Colour.red())
+        embed.title = message
+        return embed
+
+    async def stream_rows(self, attachment, reader):  # pylint: disable=no-self-use
+        """Downloads an attachment line by line, yielding its rows as they're read."""
+        async with aiohttp.ClientSession() as session:
+            async with session.get(attachment.url) as response:
+                response.raise_for_status()
+                async for line in response.content:
+                    for row in reader.feed(line.decode("utf-8-sig")):
+                        yield row
+
+        for row in reader.close():
+            yield row
+
+    def write_quote(self, data):
+        """Sends an imported quote to the api."""
+        return self.api.run(self.api.post_quote, data, priority=BACKGROUND)
+
+    def cog_unload(self):
+        """Stops the running imports and closes the api session when the cog is unloaded."""
+        if self.handed_off:
+            return
+        for task in self.import_tasks:
+            task.cancel()
+        self.api.close()
+
+    def cog_handoff(self):
+        """Returns the api session and the running imports, for the reloaded cog."""
+        return {"api": self.api, "import_tasks": self.import_tasks}
+
+    def cog_adopt(self, state):
+        """Takes over the api session and the running imports of the replaced cog."""
+        self.api.close()
+        self.api = state["api"]
+        self.import_tasks = state["import_tasks"]
+
+    # Commands
+    @commands.is_owner()
+    @commands.command(
+        name="import",
+        brief="Imports quotes from a CSV or JSONL attachment.",
+        help="Imports the quotes of an attached .csv or .jsonl file, with the "
+        "quote_text, author_name, author_image and tags columns.",
+        hidden=True,
+    )
+    async def import_quotes(self, ctx):
+        """Imports the quotes of an attached file."""
+        attachments = ctx.message.attachments if ctx.message else []
+        if not attachments:
+            embed = self.create_error_embed("Please attach a .csv or .jsonl file.")
+            await ctx.send(embed=embed)
+            return
+
+        attachment = attachments[0]
+        file_format = attachment.filename.rsplit(".", 1)[-1].lower()
+        if file_format not in BULK_FORMATS:
+            embed = self.create_error_embed("Sorry, only .csv and .jsonl files work.")
+            await ctx.send(embed=embed)
+            return
+
+        progress = BulkProgress()
+        start = time.monotonic()
+        message = await ctx.send(
+            embed=self.create_progress_embed(attachment.filename, progress, 0)
+        )
+
+        task = asyncio.ensure_future(
+            import_rows(
+                self.stream_rows(attachment, RowReader(file_format)),
+                self.write_quote,
+                progress,
+                workers=BULK_WORKERS,
+                retries=BULK_RETRIES,
+            )
+        )
+        self.import_tasks.add(task)
+        task.add_done_callback(self.import_tasks.discard)
+
+        # Show the progress until the import is over
+        while not task.done():
+            await asyncio.wait([task], timeout=PROGRESS_INTERVAL)
+            embed = self.create_progress_embed(
+                attachment.filename, progress, time.monotonic() - start
+            )
+            try:
+                await message.edit(embed=embed)
+            except discord.HTTPException:
+                pass
+
+        logger.info(
+            "Imported %s: %s written, %s invalid, %s failed",
+            attachment.filename,
+            progress.written,
+            progress.invalid,
+            progress.failed,
+        )
+
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "Import of %s stopped\n%s", attachment.filename, task.exception()
+            )
+            embed = self.create_error_embed(
+                f"Sorry, the import stopped after {progress.read} rows."
+            )
+            await ctx.send(embed=embed)
+
+        if progress.errors:
+            entries = [f"Line {line}: {error}" for line, error in progress.errors]
+            pages = Pages(ctx, entries=entries, per_page=ERRORS_PER_PAGE)
+            pages.embed.title = "Import Errors"
+            await pages.paginate()
+
+    @commands.is_owner()
+    @commands.command(
+        name="export",
+        brief="Exports the quotes as a CSV or JSONL file.",
+        help="Exports every quote, optionally filtered by tags, as a .jsonl or "
+        ".csv file that can be imported back.",
+        hidden=True,
+    )
+    async def export_quotes(self, ctx, file_format="jsonl", tags: str = None):
+        """Exports the quotes as a file."""
+        file_format = file_format.lower().lstrip(".")
+        if file_format not in BULK_FORMATS:
+            embed = self.create_error_embed("Sorry, the format must be csv or jsonl.")
+            await ctx.send(embed=embed)
+            return
+
+        query_params = {"tags": tags} if tags else None
+        limit = ctx.guild.filesize_limit if ctx.guild else DEFAULT_FILESIZE_LIMIT
+
+        # Quotes are written as their pages arrive, never all held in memory
+        with tempfile.TemporaryFile() as export_file:
+            writer = ExportWriter(export_file, file_format)
+            try:
+                async with aclosing(self.api.iter_quotes(query_params)) as pages:
+                    async for page in pages:
+                        for quote in page.records:
+                            writer.write(quote)
+            except Exception:  # pylint: disable=broad-except
+                logger.error("Could not export quotes")
+                embed = self.create_error_embed("Sorry, could not export the quotes.")
+                await ctx.send(embed=embed)
+                return
+
+            writer.close()
+            size = export_file.seek(0, 2)
+            export_file.seek(0)
+            if size > limit:
+                embed = self.create_error_embed(
+                    f"Sorry, the export is {size // 1024} KB, over the upload limit."
+                )
+                await ctx.send(embed=embed)
+                return
+
+            await ctx.send(
+                content=f"Exported **{writer.count}** quotes.",
+                file=discord.File(export_file, filename=f"quotes.{file_format}"),
+            )
+
+
+def setup(bot):
+    """Sets up the bulk cog for the bot."""
+    logger.info("Loading Bulk Cog")
+    bot.add_cog(BulkCog(bot))
+
+
+def teardown(bot):
+    """Tears down the bulk cog for the bot."""
+    logger.info("Unloading Bulk Cog")
+    bot.remove_cog("Bulk")
@@ -1,23 +1,103 @@
 """Discord bot Quote cog."""
 
+import math
+import random
+from bisect import bisect_left
 from datetime import datetime
 
 import discord
 from discord.ext import commands
-
-from util import generate_logger, QuotesApi, CacheDict
-from config import QUOTES_API_KEY
+from discord.http import Route
+
+from util import (
+    generate_logger,
+    QuotesApi,
+    Quote,
+    CacheDict,
+    Pages,
+    FieldPages,
+    LocalStore,
+    SavedQuotes,
+    RecentlySeen,
+    metrics,
+    INTERACTIVE,
+    BACKGROUND,
+)
+from config import (
+    QUOTES_API_KEY,
+    QUOTE_POOL_SIZE,
+    QUOTE_POOL_TTL,
+    RECENT_QUOTES_WINDOW,
+)
 
 logger = generate_logger(__name__)
 
+# Number of tags shown on every page of the tag list
+TAGS_PER_PAGE = 20
+
+# Discord allows up to 10 embeds in a single message
+MAX_BATCH_QUOTES = 10
+
+# Reactions added to the quote messages
+FORWARD_EMOJI = "❤️"
+SAVE_EMOJI = "⭐"
+
+# Number of saved quotes shown on every page of a collection
+SAVED_QUOTES_PER_PAGE = 5
+
+# Seconds the tag list and the quote messages are kept in the cache backend
+TAGS_TTL = 60 * 60
+QUOTE_MESSAGE_TTL = 60 * 60 * 24
+
+
+def quote_pool_key(filters):
+    """Returns the cache key of the quote pool of some filters."""
+    return "quote_pool:" + ":".join(value or "" for _, value in filters)
+
+
+class TagPages(Pages):
+    """Paginator for the tag list, built from tag pages chunked beforehand."""
+
+    def __init__(self, ctx, tags, chunks):
+        super().__init__(ctx, entries=tags, per_page=TAGS_PER_PAGE)
+        self.chunks = chunks
+        self.embed.title = "Quote Tags"
+        self.embed.timestamp = datetime.utcnow()
+
+    def get_page(self, page):
+        return self.chunks[page - 1]
+
 
 class QuoteCog(commands.Cog, name="Quote"):
     """Quote cog class."""
 
+    # Version of the cache snapshot layout
+    snapshot_version = 3
+
     def __init__(self, bot):
         self.bot = bot
-        self.quote_embeds = CacheDict(10000)
+
+        # Quotes of the quote messages by message id, for the reactions
+        self.quote_messages = CacheDict(10000)
+
+        # Prefetched quotes are kept in the cache backend, shared by the bot
+        # processes if it's shared, so most commands need no api call
+        self.cache = bot.cache_backend
+        self.quote_counts = CacheDict(256)
+
+        # Quotes sent recently to every channel, skipped when picking quotes
+        self.recent_quotes = CacheDict(10000)
         self.api = QuotesApi(QUOTES_API_KEY)
+        self.saved_quotes = SavedQuotes(LocalStore.of(bot))
+
+        # Sorted list of the tag names available on the api, their lowercase
+        # search keys and the tag list pages
+        self.tags = []
+        self.tag_keys = []
+        self.tag_pages = []
+
+        # Set while the caches and resources are handed off to a reloaded cog
+        self.handed_off = False
 
     def create_quote_embed(
         self, quote, author, tags, author_picture_url, channel
@@ -32,23 +112,137 @@ class QuoteCog(commands.Cog, name="Quote"):
         embed.add_field(name="Tags", value=f"{tags}", inline=True)
 
         if not isinstance(channel, discord.DMChannel):
-            embed.set_footer(text="React with ❤️ to forward this quote to your inbox")
+            embed.set_footer(
+                text=f"React with {FORWARD_EMOJI} to forward this quote to your inbox "
+                f"or with {SAVE_EMOJI} to save it"
+            )
 
         embed.timestamp = datetime.utcnow()
         return embed
 
-    def create_tag_list_embed(self, tags):
-        """Creates an embed to display the tags available."""
-        tag_names = ""
-
-        for tag in sorted(tags):
-            tag_names += f"{tag}\n"
-
-        embed = discord.Embed(title="Quote Tags", colour=discord.Colour.blue())
-        embed.description = tag_names
+    def set_tags(self, tags):
+        """Caches the tag list, sorted, along with its pages and search keys."""
+        self.tags = sorted(tags, key=str.lower)
+        self.tag_keys = [tag.lower() for tag in self.tags]
+        self.tag_pages = self.chunk_tags(self.tags)
+
+    def chunk_tags(self, tags):  # pylint: disable=no-self-use
+        """Splits a tag list into pages."""
+        return [
+            tags[index : index + TAGS_PER_PAGE]
+            for index in range(0, len(tags), TAGS_PER_PAGE)
+        ]
+
+    def find_tags(self, prefix):
+        """Returns the tags that start with a prefix, using binary search."""
+        prefix = prefix.lower()
+        start = bisect_left(self.tag_keys, prefix)
+        end = bisect_left(self.tag_keys, prefix + "\uffff", lo=start)
+        return self.tags[start:end]
+
+    async def send_embeds(self, channel, embeds):
+        """Sends one or more embeds in a single message."""
+        if len(embeds) == 1:
+            return await channel.send(embed=embeds[0])
+
+        # discord.py 1.7 can only send one embed per message
+        route = Route("POST", "/channels/{channel_id}/messages", channel_id=channel.id)
+        data = await self.bot.http.request(
+            route, json={"embeds": [embed.to_dict() for embed in embeds]}
+        )
+
+        # pylint: disable=protected-access
+        return discord.Message(state=channel._state, channel=channel, data=data)
+
+    async def index_quote_message(self, message, quotes):
+        """Adds the reactions to a quote message and keeps track of its quotes."""
+        await message.add_reaction(FORWARD_EMOJI)
+        await message.add_reaction(SAVE_EMOJI)
+
+        # All the quotes of a message are a single entry of the cache
+        self.quote_messages[message.id] = quotes
+
+        # Reactions can reach another bot process when the cache is shared
+        if self.cache.shared:
+            await self.cache.set(
+                f"quote_message:{message.id}", quotes, ttl=QUOTE_MESSAGE_TTL
+            )
 
-        embed.timestamp = datetime.utcnow()
-        return embed
+    async def get_message_quotes(self, message_id):
+        """Returns the quotes of a quote message, None if it isn't one."""
+        if message_id in self.quote_messages:
+            return self.quote_messages[message_id]
+
+        if self.cache.shared:
+            return await self.cache.get(f"quote_message:{message_id}")
+
+        return None
+
+    def count_pages(self, total):  # pylint: disable=no-self-use
+        """Returns the number of quote pools in a number of quotes, 1 if it's unknown."""
+        return max(math.ceil(total / QUOTE_POOL_SIZE), 1) if total else 1
+
+    async def fetch_quote_pool(self, filters):
+        """Fetches a random page of the quotes matching some filters."""
+        query_params = {key: value for key, value in filters if value is not None}
+        query_params["per_page"] = QUOTE_POOL_SIZE
+
+        # Pick a random page of the quote list, so a single request is needed
+        # once the number of quotes matching the filters is known
+        total = self.quote_counts[filters] if filters in self.quote_counts else None
+        query_params["page"] = random.randint(1, self.count_pages(total))
+        page = await self.api.run(self.api.fetch_quotes, query_params=query_params)
+
+        # Otherwise the first page tells it, and a random page is fetched from it
+        page_count = self.count_pages(page.total_count)
+        if total is None and page_count > 1:
+            query_params["page"] = random.randint(1, page_count)
+            if query_params["page"] != 1:
+                page = await self.api.run(
+                    self.api.fetch_quotes, query_params=query_params
+                )
+
+        self.quote_counts[filters] = page.total_count
+        await self.cache.set(quote_pool_key(filters), page.records, ttl=QUOTE_POOL_TTL)
+        metrics.increment("quotes.pool_fetches")
+        return page.records
+
+    async def get_quote_pool(self, filters):
+        """Returns the prefetched quotes matching some filters, fetching them if needed."""
+        quotes = await self.cache.get(quote_pool_key(filters))
+        if quotes is None:
+            quotes = await self.fetch_quote_pool(filters)
+        return quotes
+
+    async def pick_quotes(self, channel, amount=1, tags=None, author=None):
+        """Picks random quotes that were not sent recently to a channel."""
+        filters = (("tags", tags), ("author", author))
+
+        if RECENT_QUOTES_WINDOW <= 0:
+            quotes = await self.get_quote_pool(filters)
+            return random.sample(quotes, min(amount, len(quotes)))
+
+        if channel.id not in self.recent_quotes:
+            self.recent_quotes[channel.id] = RecentlySeen(RECENT_QUOTES_WINDOW)
+        seen = self.recent_quotes[channel.id]
+
+        quotes = await self.get_quote_pool(filters)
+        fresh = [quote for quote in quotes if quote.key not in seen]
+
+        # The channel has seen the whole pool, try another page of the quotes
+        if len(fresh) < amount:
+            quotes = await self.fetch_quote_pool(filters)
+            fresh = [quote for quote in quotes if quote.key not in seen]
+            metrics.increment("quotes.pool_exhausted")
+
+        # Small quote lists can't avoid repeats, some quotes are sent again then
+        if len(fresh) < amount:
+            fresh += [quote for quote in quotes if quote.key in seen]
+
+        picked = random.sample(fresh, min(amount, len(fresh)))
+        for quote in picked:
+            seen.add(quote.key)
+        return picked
 
     def create_error_embed(self, message):
         """Creates an embed to display an error message."""
@@ -58,32 +252,118 @@ class QuoteCog(commands.Cog, name="Quote"):
 
     # Event Listeners
     @commands.Cog.listener()
-    async def on_reaction_add(self, reaction, user):
+    async def on_raw_reaction_add(self, payload):
         """Called when a message has a reaction added to it
 
         When a user reacts to a quote embedded by the bot with the proper reactions,
         it can be sent to him by using DM or it can be saved to their list of personal quotes,
         it all depends on the reaction used.
+
+        The raw event is used so forwarding doesn't depend on the reacted message
+        being in the client message cache.
         """
 
-        # Check that the reaction channels is not done on a private channel
+        # Check that the reaction is not done on a private channel
         # and the user is not a bot
-        if not isinstance(reaction.message.channel, discord.DMChannel) and not user.bot:
-
-            if reaction.emoji == "❤️":
-                # Get the ID from the message that was reacted to
-                message_id = reaction.message.id
-
-                # Check if the message that was reacted is a quote embed message
-                if message_id in self.quote_embeds:
-                    # Get the embed from the dictionary
-                    embed = self.quote_embeds[message_id]
-
-                    # Create a DM channel with the user to send the embed
-                    await user.create_dm()
-                    await user.dm_channel.send(embed=embed)
+        if payload.guild_id is None or payload.member is None or payload.member.bot:
+            return
+
+        # Check if the message that was reacted is a quote embed message
+        quotes = await self.get_message_quotes(payload.message_id)
+        if quotes is None:
+            return
+
+        emoji = str(payload.emoji)
+        if emoji == FORWARD_EMOJI:
+            # Send the quotes to the user through a DM channel
+            dm_channel = payload.member.dm_channel or await payload.member.create_dm()
+            embeds = [
+                self.create_quote_embed(
+                    quote=quote.quote_text,
+                    tags=quote.tags,
+                    author=quote.author_name,
+                    author_picture_url=quote.author_image,
+                    channel=dm_channel,
+                )
+                for quote in quotes
+            ]
+            await self.send_embeds(dm_channel, embeds)
+
+        elif emoji == SAVE_EMOJI:
+            # Saves are buffered and written to the local store in batches
+            self.saved_quotes.save(payload.user_id, quotes)
+            metrics.increment("quotes.saved", len(quotes))
 
     # Class Methods
+    def cog_unload(self):
+        """Closes the api session and queues the buffered saves when the cog is unloaded."""
+        if self.handed_off:
+            return
+        self.api.close()
+        self.saved_quotes.close()
+
+    def cog_handoff(self):
+        """Returns the live caches and resources of the cog, for its reloaded instance."""
+        return {
+            "quote_messages": self.quote_messages,
+            "quote_counts": self.quote_counts,
+            "recent_quotes": self.recent_quotes,
+            "tags": (self.tags, self.tag_keys, self.tag_pages),
+            "api": self.api,
+            "saved_quotes": self.saved_quotes,
+        }
+
+    def cog_adopt(self, state):
+        """Takes over the caches and resources of the instance this cog replaced."""
+        self.api.close()
+        self.api = state["api"]
+        self.saved_quotes = state["saved_quotes"]
+
+        self.quote_messages = state["quote_messages"]
+        self.quote_counts = state["quote_counts"]
+        self.recent_quotes = state["recent_quotes"]
+        self.tags, self.tag_keys, self.tag_pages = state["tags"]
+
+    async def cog_warm_up(self):
+        """Loads the tag list once the bot is ready, unless a snapshot restored it."""
+        if not self.tags:
+            await self.load_tags(priority=BACKGROUND)
+
+    def cog_snapshot(self):
+        """Returns the cog caches in a JSON serializable form."""
+        return {
+            "tags": self.tags,
+            # Keep the LRU order of the quote embeds
+            "quote_messages": [
+                [message_id, [quote.to_json() for quote in quotes]]
+                for message_id, quotes in self.quote_messages.items()
+            ],
+        }
+
+    def cog_restore(self, state):
+        """Restores the cog caches from a snapshot."""
+        self.set_tags(state["tags"])
+
+        for message_id, quotes in state["quote_messages"]:
+            self.quote_messages[message_id] = [
+                Quote.from_json(quote) for quote in quotes
+            ]
+
+    async def load_tags(self, priority=INTERACTIVE):
+        """Loads the tag list from the cache backend, or from the api if it's not there."""
+        tags = await self.cache.get("tags")
+        if tags is not None:
+            self.set_tags(tags)
+            return self.tags
+
+        return await self.refresh_tags(priority)
+
+    async def refresh_tags(self, priority=INTERACTIVE):
+        """Fetches the tag list from the api and caches it."""
+        self.set_tags(await self.api.run(self.api.fetch_tags, priority=priority))
+        await self.cache.set("tags", self.tags, ttl=TAGS_TTL)
+        return self.tags
+
     async def cog_before_invoke(self, ctx):
         """A special method that acts as a cog local pre-invoke hook."""
         await ctx.trigger_typing()
@@ -104,62 +384,143 @@ class QuoteCog(commands.Cog, name="Quote"):
         """Sends a quote as a message."""
         try:
             # Get random quote filtered by tags and authors
-            query_params = {}
+            quotes = await self.pick_quotes(ctx.channel, tags=tags, author=author)
+            if not quotes:
+                raise LookupError("No quotes found")
 
-            if tags is not None:
-                query_params["tags"] = tags
-
-            if author is not None:
-                query_params["author"] = author
-
-            quote = self.api.get_random_quote(query_params=query_params).json()
+            quote = quotes[0]
 
             embed = self.create_quote_embed(
-                quote=quote["quote_text"],
-                tags=quote["tags"],
-                author=quote["author_name"],
-                author_picture_url=quote["author_image"],
+                quote=quote.quote_text,
+                tags=quote.tags,
+                author=quote.author_name,
+                author_picture_url=quote.author_image,
                 channel=ctx.channel,
             )
 
             # Retrieve the message that was sent to the channels
             message = await ctx.channel.send(embed=embed)
 
-            # If the command was not sent by DM, add an emoji to the message
+            # If the command was not sent by DM, add the reactions to the message
+            # and keep track of the quote for possible reactions
             if not isinstance(ctx.channel, discord.DMChannel):
-                await message.add_reaction("❤️")
-
-                # Use dictionary as cache to keep track of quote embeds
-                # for possible reactions
-                embed = message.embeds[0]
-                embed.set_footer(text=discord.Embed.Empty)
-                embed.timestamp = discord.Embed.Empty
-                self.quote_embeds[message.id] = embed
+                await self.index_quote_message(message, [quote])
 
         except Exception:  # pylint: disable=broad-except
             logger.error("Sorry, could not get quote.")
             embed = self.create_error_embed("Sorry, could not find any quote.")
             await ctx.channel.send(embed=embed)
 
+    @commands.command(
+        name="quotes",
+        aliases=["qts"],
+        brief="Sends several quotes at once.",
+        help=f"Sends up to {MAX_BATCH_QUOTES} quotes at once, optionally filtered by tags.",
+    )
+    async def quotes(self, ctx, amount: int = 5, tags: str = None):
+        """Sends several quotes in a single message."""
+        amount = max(1, min(amount, MAX_BATCH_QUOTES))
+
+        try:
+            # All the quotes come from a single page of the quote list
+            quotes = await self.pick_quotes(ctx.channel, amount, tags=tags)
+            if not quotes:
+                raise LookupError("No quotes found")
+
+            embeds = [
+                self.create_quote_embed(
+                    quote=quote.quote_text,
+                    tags=quote.tags,
+                    author=quote.author_name,
+                    author_picture_url=quote.author_image,
+                    channel=ctx.channel,
+                )
+                for quote in quotes
+            ]
+
+            # Only the last embed of the message keeps the reaction hint
+            for embed in embeds[:-1]:
+                embed.set_footer(text=discord.Embed.Empty)
+
+            message = await self.send_embeds(ctx.channel, embeds)
+
+            if not isinstance(ctx.channel, discord.DMChannel):
+                await self.index_quote_message(message, quotes)
+
+        except Exception:  # pylint: disable=broad-except
+            logger.error("Sorry, could not get quotes.")
+            embed = self.create_error_embed("Sorry, could not find any quotes.")
+            await ctx.channel.send(embed=embed)
+
     @commands.command(
         name="tags",
         aliases=["tgs"],
         brief="Sends a list of all tags available.",
-        help="Sends a list of all tags available.",
+        help="Sends a list of all tags available, or only the ones starting with a prefix.",
     )
-    async def quote_tags(self, ctx):
+    async def quote_tags(self, ctx, prefix: str = None):
         """Sends a list of all tags available."""
         try:
-            # Get list of tags available from the api
-            tags = self.api.get_all_tags().json()
+            # Use the cached tag list, or load it if it's not loaded yet
+            if not self.tags:
+                await self.load_tags()
 
-            embed = self.create_tag_list_embed(list(tags["tags"]))
-            await ctx.channel.send(embed=embed)
+            if prefix is None:
+                tags, chunks = self.tags, self.tag_pages
+            else:
+                tags = self.find_tags(prefix)
+                chunks = self.chunk_tags(tags)
 
         except Exception:  # pylint: disable=broad-except
             logger.error("Could not get available tags")
             embed = self.create_error_embed("Sorry, could not get available tags.")
             await ctx.channel.send(embed=embed)
+            return
+
+        if not tags:
+            # Embed titles are limited to 256 characters
+            if prefix is None:
+                message = "Sorry, there are no tags available."
+            else:
+                message = f"Sorry, no tags start with {prefix}."[:256]
+            embed = self.create_error_embed(message)
+            await ctx.channel.send(embed=embed)
+            return
+
+        pages = TagPages(ctx, tags, chunks)
+        await pages.paginate()
+
+    @commands.command(
+        name="saved",
+        aliases=["svd"],
+        brief="Sends your saved quotes.",
+        help=f"Sends the quotes you saved by reacting with {SAVE_EMOJI} to a quote.",
+    )
+    async def saved(self, ctx):
+        """Sends the saved quotes of the author."""
+        try:
+            quotes = await self.saved_quotes.get(ctx.author.id)
+        except Exception:  # pylint: disable=broad-except
+            logger.error("Could not get saved quotes")
+            embed = self.create_error_embed("Sorry, could not get your saved quotes.")
+            await ctx.channel.send(embed=embed)
+            return
+
+        if not quotes:
+            embed = self.create_error_embed(
+                f"You have no saved quotes yet, react with {SAVE_EMOJI} to save one."
+            )
+            await ctx.channel.send(embed=embed)
+            return
+
+        # Field values are limited to 1024 characters
+        entries = [
+            (f"— {quote.author_name}", f"📜 {quote.quote_text}"[:1024])
+            for quote in quotes
+        ]
+        pages = FieldPages(ctx, entries=entries, per_page=SAVED_QUOTES_PER_PAGE)
+        pages.embed.title = "Saved Quotes"
+        await pages.paginate()
 
 
 def setup(bot):
@@ -171,4 +532,4 @@ def setup(bot):
 def teardown(bot):
     """Tears down the quote cog for the bot."""
     logger.info("Unloading Quote Cog")
-    bot.remove_cog("cogs.quote_cog")
+    bot.remove_cog("Quote")
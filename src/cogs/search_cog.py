@@ -0,0 +1,138 @@
+"""Discord bot Search cog."""
+
+import asyncio
+from contextlib import aclosing
+
+import discord
+from discord.ext import commands
+
+from util import (
+    generate_logger,
+    QuotesApi,
+    FieldPages,
+    SearchIndex,
+    metrics,
+)
+from config import QUOTES_API_KEY, SEARCH_REFRESH_INTERVAL
+
+logger = generate_logger(__name__)
+
+# Number of quotes a search finds and number shown on every page of the results
+SEARCH_RESULTS = 25
+RESULTS_PER_PAGE = 5
+
+
+class SearchCog(commands.Cog, name="Search"):
+    """Search cog class."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.api = QuotesApi(QUOTES_API_KEY)
+
+        # Inverted index of every quote of the api, synced in the background
+        self.index = SearchIndex()
+        self.sync_task = None
+
+        # Set while the index and its sync are handed off to a reloaded cog
+        self.handed_off = False
+
+        metrics.gauge("search.quotes", lambda: len(self.index))
+
+    def create_error_embed(self, message):  # pylint: disable=no-self-use
+        """Creates an embed to display an error message."""
+        embed = discord.Embed(colour=discord.Colour.red())
+        embed.title = message
+        return embed
+
+    async def sync_index(self):
+        """Indexes the quotes of the api that aren't in the index yet."""
+        added = 0
+
+        # Every page is indexed as soon as it arrives, on the index thread
+        async with aclosing(self.api.iter_quotes()) as pages:
+            async for page in pages:
+                added += await self.index.run(self.index.add, page.records)
+
+        metrics.increment("search.indexed", added)
+        logger.info("Indexed %s new quotes, %s in total", added, len(self.index))
+
+    async def sync_loop(self):
+        """Keeps the index up to date with the quotes added to the api."""
+        while True:
+            try:
+                await self.sync_index()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.error("Could not sync the search index\n%s", exc)
+            await asyncio.sleep(SEARCH_REFRESH_INTERVAL)
+
+    def cog_unload(self):
+        """Stops the index sync and closes the api session when the cog is unloaded."""
+        if self.handed_off:
+            return
+        if self.sync_task is not None:
+            self.sync_task.cancel()
+        self.api.close()
+        self.index.close()
+
+    def cog_handoff(self):
+        """Returns the index, its sync task and the api session, for the reloaded cog."""
+        return {"api": self.api, "index": self.index, "sync_task": self.sync_task}
+
+    def cog_adopt(self, state):
+        """Takes over the index and its sync from the replaced cog."""
+        self.api.close()
+        self.index.close()
+        self.api = state["api"]
+        self.index = state["index"]
+        self.sync_task = state["sync_task"]
+
+    async def cog_warm_up(self):
+        """Starts building the index in the background once the bot is ready."""
+        if self.sync_task is None:
+            self.sync_task = self.bot.loop.create_task(self.sync_loop())
+
+    # Commands
+    @commands.command(
+        name="search",
+        aliases=["find"],
+        brief="Searches the quotes containing some words.",
+        help="Sends the quotes that best match some words, like `search courage fear`.",
+    )
+    async def search(self, ctx, *, query: str):
+        """Sends the quotes that best match a query."""
+        if not len(self.index):  # pylint: disable=len-as-condition
+            embed = self.create_error_embed(
+                "Sorry, the quotes are still being indexed, try again in a moment."
+            )
+            await ctx.channel.send(embed=embed)
+            return
+
+        quotes = await self.index.run(self.index.search, query, SEARCH_RESULTS)
+        metrics.increment("search.queries")
+
+        if not quotes:
+            # Embed titles are limited to 256 characters
+            embed = self.create_error_embed(f"Sorry, no quotes match {query}."[:256])
+            await ctx.channel.send(embed=embed)
+            return
+
+        # Field values are limited to 1024 characters
+        entries = [
+            (f"— {quote.author_name}", f"📜 {quote.quote_text}"[:1024])
+            for quote in quotes
+        ]
+        pages = FieldPages(ctx, entries=entries, per_page=RESULTS_PER_PAGE)
+        pages.embed.title = f"Quotes matching {query}"[:256]
+        await pages.paginate()
+
+
+def setup(bot):
+    """Sets up the search cog for the bot."""
+    logger.info("Loading Search Cog")
+    bot.add_cog(SearchCog(bot))
+
+
+def teardown(bot):
+    """Tears down the search cog for the bot."""
+    logger.info("Unloading Search Cog")
+    bot.remove_cog("Search")
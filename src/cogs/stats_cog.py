@@ -1,15 +1,36 @@
 """Discord bot Stats cog."""
 
+import asyncio
+import cProfile
+import pstats
+import tempfile
 from datetime import datetime
 
 import discord
 from discord.ext import commands
 
-from util import generate_logger
+from util import generate_logger, metrics, StreamingTextPages
 from config import BOT_INVITE_URL, SUPPORT_SERVER_INVITE_URL, VERSION
 
 logger = generate_logger(__name__)
 
+# Longest an owner can profile the bot for, in seconds
+MAX_PROFILE_SECONDS = 60
+
+
+def write_profile(profiler):
+    """Writes the stats of a profile to a temporary file, sorted by cumulative time."""
+    output = tempfile.TemporaryFile("w+", encoding="utf-8")
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats()
+    output.seek(0)
+    return output
+
+
+def read_lines(file):
+    """Yields the lines of a file as they're read, closing it at the end."""
+    with file:
+        yield from file
+
 
 class StatsCog(commands.Cog, name="Stats"):
     """Bot statistics cog."""
@@ -119,6 +140,17 @@ class StatsCog(commands.Cog, name="Stats"):
         embed.timestamp = datetime.utcnow()
         return embed
 
+    def create_metrics_embed(self, values):
+        """Creates an embed to show the current bot metrics."""
+        lines = [f"{name}: {value}" for name, value in values.items()]
+
+        embed = discord.Embed(
+            title="📈 Famous Quotes Bot Metrics", color=discord.Color.dark_magenta()
+        )
+        embed.description = "```\n" + ("\n".join(lines) or "No metrics yet") + "\n```"
+        embed.timestamp = datetime.utcnow()
+        return embed
+
     # Class Methods
     async def cog_before_invoke(self, ctx):
         """A special method that acts as a cog local pre-invoke hook."""
@@ -145,17 +177,17 @@ class StatsCog(commands.Cog, name="Stats"):
         version = VERSION
         start_datetime = datetime(2020, 12, 25)
         server_invite_url = SUPPORT_SERVER_INVITE_URL
-        total_members = len(self.bot.users)
         bot_commands = len(self.bot.commands)
 
         guilds = 0
+        total_members = 0
         text_channels = 0
-        # Get every text channel from every guild the bot is in
+        # Member counts come from the guild payload, so they don't depend on
+        # the member cache being populated
         for guild in self.bot.guilds:
             guilds += 1
-            for channel in guild.channels:
-                if isinstance(channel, discord.TextChannel):
-                    text_channels += 1
+            total_members += guild.member_count or 0
+            text_channels += len(guild.text_channels)
 
         # Create embed
         embed = self.create_about_embed(
@@ -177,6 +209,39 @@ class StatsCog(commands.Cog, name="Stats"):
         embed = self.create_version_embed(version)
         await ctx.send(embed=embed)
 
+    @commands.is_owner()
+    @commands.command(
+        name="metrics", help="Shows the internal metrics of the bot.", hidden=True
+    )
+    async def metrics(self, ctx):
+        """Shows the internal metrics of the bot."""
+        embed = self.create_metrics_embed(metrics.snapshot())
+        await ctx.send(embed=embed)
+
+    @commands.is_owner()
+    @commands.command(
+        name="profile",
+        help="Profiles the event loop for a few seconds and shows the stats.",
+        hidden=True,
+    )
+    async def profile(self, ctx, seconds: float = 5.0):
+        """Profiles the event loop and paginates the profiler output."""
+        seconds = max(0.1, min(seconds, MAX_PROFILE_SECONDS))
+
+        # Everything the event loop runs meanwhile is profiled
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+
+        # The output is never read into memory whole, pages are read from the file
+        loop = asyncio.get_running_loop()
+        output = await loop.run_in_executor(None, write_profile, profiler)
+        async with StreamingTextPages(ctx, read_lines(output)) as pages:
+            await pages.paginate()
+
     @commands.command(
         name="join",
         aliases=["invite"],
@@ -200,4 +265,4 @@ def setup(bot):
 def teardown(bot):
     """Tears down the stats cog for the bot."""
     logger.info("Unloading Stats Cog")
-    bot.remove_cog("stats_cog")
+    bot.remove_cog("Stats")
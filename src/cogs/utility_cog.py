@@ -27,6 +27,9 @@ class HelpPaginator(Pages):
         self.prefix = help_command.clean_prefix
         self.is_bot = False
 
+        # Embeds already built for this session, by page
+        self.page_embeds = {}
+
     def get_bot_page(self, page):
         """Gets a list of page commands."""
         cog, description, commands = self.entries[page - 1]
@@ -34,6 +37,18 @@ class HelpPaginator(Pages):
         self.description = description
         return commands
 
+    def get_embed(self, entries, page, *, first=False):
+        """Gets the embed for a page, building it only once per session."""
+        key = (page, first)
+        embed = self.page_embeds.get(key)
+
+        if embed is None:
+            self.prepare_embed(entries, page, first=first)
+            embed = self.embed.copy()
+            self.page_embeds[key] = embed
+
+        return embed
+
     def prepare_embed(self, entries, page, *, first=False):
         """Prepares the pagination page message."""
         self.embed.clear_fields()
@@ -87,7 +102,7 @@ class HelpPaginator(Pages):
             await asyncio.sleep(30.0)
             await self.show_current_page()
 
-        self.bot.loop.create_task(go_back_to_current_page())
+        self.create_task(go_back_to_current_page(), name="go_back")
 
     async def show_bot_help(self):
         """Shows how to use the bot."""
@@ -126,7 +141,7 @@ class HelpPaginator(Pages):
             await asyncio.sleep(30.0)
             await self.show_current_page()
 
-        self.bot.loop.create_task(go_back_to_current_page())
+        self.create_task(go_back_to_current_page(), name="go_back")
 
 
 class PaginatedHelpCommand(commands.HelpCommand):
@@ -158,15 +173,32 @@ class PaginatedHelpCommand(commands.HelpCommand):
             alias = command.name if not parent else f"{parent} {command.name}"
         return f"{alias} {command.signature}"
 
-    async def send_bot_help(self, mapping):
-        """Handles the implementation of the bot command page in the help command.
+    async def get_permission_profile(self):
+        """Returns the key of the commands the author can see in the help pages.
 
-        This function is called when the help command is called with no arguments.
+        Hidden commands are never listed, so the visible commands only depend on
+        the owner checks and on whether the help is requested in a DM.
+        """
+        ctx = self.context
+        is_owner = await ctx.bot.is_owner(ctx.author)
+        return (is_owner, ctx.guild is None)
+
+    async def get_bot_pages(self):
+        """Returns the bot help pages for the author and their command count.
+
+        The pages are cached by permission profile in the Utility cog, which
+        clears them whenever the set of commands changes.
         """
 
         def key(cog):
             return cog.cog_name or "\u200bNo Category"
 
+        profile = await self.get_permission_profile()
+        cache = self.cog.help_pages if self.cog is not None else {}
+
+        if profile in cache:
+            return cache[profile]
+
         bot = self.context.bot
         entries = await self.filter_commands(bot.commands, sort=True, key=key)
         nested_pages = []
@@ -190,6 +222,16 @@ class PaginatedHelpCommand(commands.HelpCommand):
                 for i in range(0, len(commands), per_page)
             )
 
+        cache[profile] = (nested_pages, total)
+        return nested_pages, total
+
+    async def send_bot_help(self, mapping):
+        """Handles the implementation of the bot command page in the help command.
+
+        This function is called when the help command is called with no arguments.
+        """
+        nested_pages, total = await self.get_bot_pages()
+
         # A value of 1 forces the pagination session
         pages = HelpPaginator(self, self.context, nested_pages, per_page=1)
 
@@ -256,10 +298,23 @@ class Utility(commands.Cog):
         bot.help_command = PaginatedHelpCommand()
         bot.help_command.cog = self
 
+        # Bot help pages by permission profile
+        self.help_pages = {}
+
     def cog_unload(self):
         """Unload a cog from the bot."""
         self.bot.help_command = self.old_help_command
 
+    def invalidate_help_pages(self):
+        """Clears the cached help pages after the set of commands changed."""
+        self.help_pages.clear()
+
+    # Event Listeners
+    @commands.Cog.listener()
+    async def on_extension_loaded(self, extension):
+        """Called when the bot loads an extension outside of these commands."""
+        self.invalidate_help_pages()
+
     # Class Methods
     async def cog_before_invoke(self, ctx):
         """A special method that acts as a cog local pre-invoke hook."""
@@ -271,6 +326,37 @@ class Utility(commands.Cog):
         return await super().cog_after_invoke(ctx)
 
     # Commands
+    @commands.guild_only()
+    @commands.command(
+        name="prefix",
+        brief="Shows or changes the command prefix of the server.",
+        help="Shows the command prefix of the server. Members with the Manage Server "
+        "permission can change it, setting the default prefix again resets it.",
+    )
+    async def prefix(self, ctx, *, prefix: str = None):
+        """Command which shows or changes the prefix of the guild."""
+        prefixes = self.bot.prefixes
+        if prefix is None:
+            await ctx.send(
+                f"The prefix of this server is `{prefixes.get(ctx.guild.id)}`"
+            )
+            return
+
+        # Checked here rather than as a command check, so the help pages stay
+        # the same for every member
+        if not ctx.author.guild_permissions.manage_guild:
+            await ctx.send(
+                "Sorry, changing the prefix needs the Manage Server permission."
+            )
+            return
+
+        try:
+            await prefixes.set(ctx.guild.id, prefix)
+        except ValueError as exc:
+            await ctx.send(f"**`ERROR`:** {exc}")
+        else:
+            await ctx.send(f"**`SUCCESS`** The prefix of this server is now `{prefix}`")
+
     @commands.is_owner()
     @commands.command(
         name="load",
@@ -285,6 +371,7 @@ class Utility(commands.Cog):
         except Exception as exc:  # pylint: disable=broad-except
             await ctx.send(f"**`ERROR`:** {type(exc).__name__} - {exc}")
         else:
+            self.invalidate_help_pages()
             await ctx.send("**`SUCCESS`**")
 
     @commands.is_owner()
@@ -301,6 +388,7 @@ class Utility(commands.Cog):
         except Exception as exc:  # pylint: disable=broad-except
             await ctx.send(f"**`ERROR`:** {type(exc).__name__} - {exc}")
         else:
+            self.invalidate_help_pages()
             await ctx.send("**`SUCCESS`**")
 
     @commands.is_owner()
@@ -317,6 +405,7 @@ class Utility(commands.Cog):
         except Exception as exc:  # pylint: disable=broad-except
             await ctx.send(f"**`ERROR`:** {type(exc).__name__} - {exc}")
         else:
+            self.invalidate_help_pages()
             await ctx.send("**`SUCCESS`**")
 
 
@@ -329,4 +418,4 @@ def setup(bot):
 def teardown(bot):
     """Tears down the help cog for the bot."""
     logger.info("Unloading Help Cog")
-    bot.remove_cog("cogs.help_cog")
+    bot.remove_cog("Utility")
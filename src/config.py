@@ -6,6 +6,7 @@ from os.path import dirname, abspath, join
 # File paths
 BASE_PROJECT_PATH = dirname(dirname((abspath(__file__))))
 COGS_PATH = join(BASE_PROJECT_PATH, "src", "cogs")
+DATA_PATH = os.getenv("DATA_PATH", join(BASE_PROJECT_PATH, "data"))
 
 # Discord Bot
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
@@ -14,6 +15,60 @@ SUPPORT_SERVER_INVITE_URL = os.getenv("SUPPORT_SERVER_INVITE_URL")
 BOT_INVITE_URL = os.getenv("BOT_INVITE_URL")
 COMMAND_PREFIX = os.getenv("COMMAND_PREFIX")
 
+# Gateway
+# Lean mode drops privileged intents and the member cache
+LEAN_MODE = os.getenv("LEAN_MODE", "false").lower() in ("1", "true", "yes")
+
+# Extensions
+# Cogs listed here are imported on the first use of one of their commands
+LAZY_COGS = [
+    cog.strip() for cog in os.getenv("LAZY_COGS", "").split(",") if cog.strip()
+]
+
+# Seconds given to in-flight work to finish on shutdown
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "8"))
+
+# Cache snapshots
+SNAPSHOT_PATH = join(DATA_PATH, "snapshot.json")
+SNAPSHOT_MAX_AGE = int(os.getenv("SNAPSHOT_MAX_AGE", str(60 * 60 * 24)))
+
+# Gateway event trace, recorded for load tests when a path is set
+TRACE_PATH = os.getenv("TRACE_PATH")
+
+# Cache backend, shared by the bot processes when it's a redis:// url
+CACHE_URL = os.getenv("CACHE_URL")
+
+# Local store
+STORE_PATH = join(DATA_PATH, "store.sqlite3")
+
+# Broadcasts
+# Sends per second of a broadcast, below the Discord global limit of 50
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "40"))
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "8"))
+
+# Bulk imports
+# Quote writes in flight and retries of a failed write during an import
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", "8"))
+BULK_RETRIES = int(os.getenv("BULK_RETRIES", "3"))
+
+# Random quotes
+# Quotes fetched at once for every filter and seconds they are picked from
+QUOTE_POOL_SIZE = int(os.getenv("QUOTE_POOL_SIZE", "50"))
+QUOTE_POOL_TTL = float(os.getenv("QUOTE_POOL_TTL", "600"))
+# Number of quotes sent last to a channel that are not sent again, 0 disables it
+RECENT_QUOTES_WINDOW = int(os.getenv("RECENT_QUOTES_WINDOW", "20"))
+
+# Quote search
+# Seconds between two syncs of the search index with the quotes of the api
+SEARCH_REFRESH_INTERVAL = float(os.getenv("SEARCH_REFRESH_INTERVAL", "21600"))
+
 # Quotes API
 QUOTES_API_URL = os.getenv("QUOTES_API_URL")
 QUOTES_API_KEY = os.getenv("QUOTES_API_KEY")
+# Seconds before a request times out
+QUOTES_API_TIMEOUT = float(os.getenv("QUOTES_API_TIMEOUT", "10"))
+# Requests in flight at first and at most, the limit adapts in between, and
+# seconds under which a request counts as healthy
+QUOTES_API_CONCURRENCY = int(os.getenv("QUOTES_API_CONCURRENCY", "8"))
+QUOTES_API_MAX_CONCURRENCY = int(os.getenv("QUOTES_API_MAX_CONCURRENCY", "32"))
+QUOTES_API_LATENCY_TARGET = float(os.getenv("QUOTES_API_LATENCY_TARGET", "1"))
@@ -1,8 +1,73 @@
 """Utilities initialization file."""
 
 from util.logger import generate_logger
-from util.paginator import Pages
+from util.paginator import Pages, FieldPages, StreamingTextPages, ReactionDispatcher
 from util.quotes import QuotesApi
+from util.limiter import AdaptiveLimiter, INTERACTIVE, BACKGROUND
+from util.models import Quote, Author, Page
 from util.cache import CacheDict
+from util.extensions import find_extension_commands, find_extension_imports
+from util.snapshot import save_snapshot, load_snapshot
+from util.metrics import metrics
+from util.store import LocalStore
+from util.timers import TimerHeap
+from util.fanout import fan_out
+from util.saved_quotes import SavedQuotes
+from util.prefixes import GuildPrefixes
+from util.search import SearchIndex
+from util.recent import RecentlySeen
+from util.trace import TraceRecorder, load_trace
+from util.bulk import (
+    BulkProgress,
+    ExportWriter,
+    RowReader,
+    import_rows,
+    BULK_FORMATS,
+)
+from util.cache_backend import (
+    CacheBackend,
+    MemoryBackend,
+    RedisBackend,
+    NearCache,
+    create_cache_backend,
+)
 
-__all__ = ["generate_logger", "Pages", "QuotesApi", "CacheDict"]
+__all__ = [
+    "generate_logger",
+    "Pages",
+    "FieldPages",
+    "StreamingTextPages",
+    "ReactionDispatcher",
+    "QuotesApi",
+    "AdaptiveLimiter",
+    "INTERACTIVE",
+    "BACKGROUND",
+    "Quote",
+    "Author",
+    "Page",
+    "CacheDict",
+    "find_extension_commands",
+    "find_extension_imports",
+    "save_snapshot",
+    "load_snapshot",
+    "metrics",
+    "LocalStore",
+    "TimerHeap",
+    "fan_out",
+    "SavedQuotes",
+    "GuildPrefixes",
+    "SearchIndex",
+    "RecentlySeen",
+    "TraceRecorder",
+    "load_trace",
+    "BulkProgress",
+    "ExportWriter",
+    "RowReader",
+    "import_rows",
+    "BULK_FORMATS",
+    "CacheBackend",
+    "MemoryBackend",
+    "RedisBackend",
+    "NearCache",
+    "create_cache_backend",
+]
@@ -0,0 +1,295 @@
+"""Utility classes to import and export quotes in bulk."""
+
+import asyncio
+import csv
+import io
+import json
+from collections import deque
+
+import requests
+
+from util.fanout import RateLimiter
+from util.metrics import metrics
+from util.quotes import is_overload
+
+# File formats of the imports and exports
+BULK_FORMATS = ("jsonl", "csv")
+
+# Columns of the CSV files, tags are joined with commas in a single column
+CSV_FIELDS = ("quote_text", "author_name", "author_image", "tags")
+
+# Number of row errors kept for the import report
+MAX_REPORTED_ERRORS = 1000
+
+
+def validate_row(row):
+    """Validates an imported row, returning the quote resource to write.
+
+    Raises ValueError with a message for the report if the row is invalid.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("Row is not an object")
+
+    data = {}
+    for field in ("quote_text", "author_name"):
+        value = row.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"Missing {field}")
+        data[field] = value.strip()
+
+    image = row.get("author_image") or None
+    if image is not None and not (
+        isinstance(image, str) and image.startswith(("http://", "https://"))
+    ):
+        raise ValueError("author_image is not an url")
+    data["author_image"] = image
+
+    tags = row.get("tags") or []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError("tags is not a list of strings")
+    data["tags"] = [tag.strip() for tag in tags if tag.strip()]
+
+    return data
+
+
+class RowReader:
+    """Turns the lines of a CSV or JSONL file into rows as they are fed.
+
+    Lines can be fed as soon as they are downloaded, so a file is validated
+    while it's streamed. CSV values spanning several lines are buffered until
+    their closing quote.
+
+    Parameters
+    ------------
+    file_format: str
+        One of BULK_FORMATS.
+    """
+
+    def __init__(self, file_format):
+        if file_format not in BULK_FORMATS:
+            raise ValueError(f"Unsupported format {file_format}")
+
+        self.file_format = file_format
+        self.line_number = 0
+        self.row_line = 1
+        self.buffer = []
+        self.header = None
+
+    def feed(self, line):
+        """Feeds a line, returning the ``(line_number, row, error)`` it completes."""
+        self.line_number += 1
+        if self.file_format == "jsonl":
+            return self.feed_jsonl(line)
+        return self.feed_csv(line)
+
+    def feed_jsonl(self, line):
+        """Parses a JSONL line."""
+        if not line.strip():
+            return []
+
+        try:
+            return [(self.line_number, json.loads(line), None)]
+        except ValueError as exc:
+            return [(self.line_number, None, f"Invalid JSON: {exc}")]
+
+    def feed_csv(self, line):
+        """Buffers a CSV line until the record it's part of is complete."""
+        if not self.buffer:
+            self.row_line = self.line_number
+        self.buffer.append(line)
+
+        # An odd number of quotes means a quoted value continues on the next line
+        text = "".join(self.buffer)
+        if text.count('"') % 2:
+            return []
+        self.buffer = []
+
+        try:
+            values = next(csv.reader(io.StringIO(text)), None)
+        except csv.Error as exc:
+            return [(self.row_line, None, f"Invalid CSV: {exc}")]
+
+        if not values:
+            return []
+        if self.header is None:
+            self.header = values
+            return []
+
+        if len(values) != len(self.header):
+            return [(self.row_line, None, f"Expected {len(self.header)} columns")]
+        return [(self.row_line, dict(zip(self.header, values)), None)]
+
+    def close(self):
+        """Returns the error of a CSV record left incomplete at the end of the file."""
+        if self.buffer:
+            self.buffer = []
+            return [(self.row_line, None, "Unterminated quoted value")]
+        return []
+
+
+class BulkProgress:  # pylint: disable=too-few-public-methods
+    """Counters of a bulk import, read while it runs to show its progress."""
+
+    __slots__ = ("read", "written", "invalid", "failed", "retried", "errors", "done")
+
+    def __init__(self):
+        self.read = 0
+        self.written = 0
+        self.invalid = 0
+        self.failed = 0
+        self.retried = 0
+        self.errors = deque(maxlen=MAX_REPORTED_ERRORS)
+        self.done = False
+
+    def add_error(self, line_number, message):
+        """Records the error of a row for the report."""
+        self.errors.append((line_number, message))
+
+
+def retry_delay(exc, attempt, backoff):
+    """Returns the seconds to wait before a retry, honoring Retry-After."""
+    response = getattr(exc, "response", None)
+    if response is not None:
+        try:
+            return float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            pass
+    return backoff * 2**attempt
+
+
+async def import_rows(
+    rows, write, progress, *, workers=8, retries=3, backoff=1.0, rate=None
+):  # pylint: disable=too-many-arguments
+    """Validates the rows of an async iterator and writes the valid ones.
+
+    Rows are validated as they are read and handed over to a pool of workers
+    through a bounded queue, so reading never gets far ahead of the writes and
+    memory stays flat however big the file is. Writes that fail with a network
+    error, a 429 or a 5xx are retried with an exponential backoff, the others
+    are reported right away.
+
+    Parameters
+    ------------
+    rows: AsyncIterator[Tuple[int, dict, str]]
+        ``(line_number, row, error)`` tuples, as returned by RowReader.
+    write: Callable[[dict], Awaitable[requests.Response]]
+        Sends a validated quote to the api.
+    progress: BulkProgress
+        Counters updated as the import runs.
+    workers: int
+        Number of writes in flight.
+    retries: int
+        Number of times a failed write is sent again.
+    backoff: float
+        Seconds waited before the first retry, doubled for every other one.
+    rate: float
+        Writes per second allowed, None for no limit.
+    """
+    queue = asyncio.Queue(maxsize=workers * 2)
+    limiter = RateLimiter(rate, burst=workers) if rate else None
+
+    async def produce():
+        async for line_number, row, error in rows:
+            progress.read += 1
+            try:
+                if error is not None:
+                    raise ValueError(error)
+                data = validate_row(row)
+            except ValueError as exc:
+                progress.invalid += 1
+                progress.add_error(line_number, str(exc))
+                continue
+            await queue.put((line_number, data))
+
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def send(line_number, data):
+        for attempt in range(retries + 1):
+            if limiter is not None:
+                await limiter.acquire()
+            try:
+                response = await write(data)
+                response.raise_for_status()
+                progress.written += 1
+                metrics.increment("bulk.written")
+                return
+            except (requests.RequestException, OSError) as exc:
+                if attempt < retries and is_overload(exc):
+                    progress.retried += 1
+                    metrics.increment("bulk.retried")
+                    await asyncio.sleep(retry_delay(exc, attempt, backoff))
+                    continue
+
+                progress.failed += 1
+                progress.add_error(line_number, f"{type(exc).__name__}: {exc}")
+                metrics.increment("bulk.failed")
+                return
+
+    async def consume():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            await send(*item)
+
+    tasks = [asyncio.ensure_future(produce())]
+    tasks.extend(asyncio.ensure_future(consume()) for _ in range(workers))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        progress.done = True
+
+
+class ExportWriter:
+    """Writes quotes to a binary file in one of the export formats.
+
+    Exported files can be imported back as they are.
+
+    Parameters
+    ------------
+    file: BinaryIO
+        File the quotes are written to.
+    file_format: str
+        One of BULK_FORMATS.
+    """
+
+    def __init__(self, file, file_format):
+        if file_format not in BULK_FORMATS:
+            raise ValueError(f"Unsupported format {file_format}")
+
+        self.file_format = file_format
+        self.text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        self.count = 0
+
+        if file_format == "csv":
+            self.csv_writer = csv.writer(self.text)
+            self.csv_writer.writerow(CSV_FIELDS)
+
+    def write(self, quote):
+        """Writes a quote."""
+        if self.file_format == "csv":
+            self.csv_writer.writerow(
+                (
+                    quote.quote_text,
+                    quote.author_name,
+                    quote.author_image or "",
+                    ",".join(quote.tags),
+                )
+            )
+        else:
+            data = quote.to_json()
+            data.pop("id", None)
+            self.text.write(json.dumps(data, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self):
+        """Flushes the written quotes, leaving the file open at its start."""
+        self.text.flush()
+        file = self.text.detach()
+        file.seek(0)
+        return file
@@ -0,0 +1,361 @@
+"""Utility cache backends shared by the cogs."""
+
+import asyncio
+import json
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+from util.cache import CacheDict
+from util.logger import generate_logger
+from util.models import decode_model, encode_model
+
+logger = generate_logger(__name__)
+
+
+class RedisError(Exception):
+    """Error reply of a Redis server."""
+
+
+# Errors of a shared backend, treated as cache misses by the near cache
+BACKEND_ERRORS = (OSError, EOFError, RedisError, asyncio.IncompleteReadError)
+
+
+class CacheBackend:
+    """Interface of the cache backends.
+
+    Values must be JSON serializable, models included. Backends that are
+    ``shared`` are seen by every bot process, the others only live in the
+    current one.
+    """
+
+    shared = False
+
+    async def get_many(self, keys):
+        """Returns the values of several keys, None for the missing ones."""
+        raise NotImplementedError
+
+    async def set_many(self, items, ttl=None):
+        """Sets several keys at once, expiring them after ``ttl`` seconds."""
+        raise NotImplementedError
+
+    async def delete_many(self, keys):
+        """Deletes several keys at once."""
+        raise NotImplementedError
+
+    async def get(self, key):
+        """Returns the value of a key, None if it's missing."""
+        values = await self.get_many([key])
+        return values[0]
+
+    async def set(self, key, value, ttl=None):
+        """Sets a key, expiring it after ``ttl`` seconds."""
+        await self.set_many({key: value}, ttl)
+
+    async def close(self):
+        """Releases the resources of the backend."""
+
+
+class MemoryBackend(CacheBackend):
+    """Cache backend kept in the current process, evicting the least recently used keys.
+
+    Parameters
+    ------------
+    size: int
+        Maximum number of keys.
+    """
+
+    def __init__(self, size=10000):
+        self.entries = CacheDict(size)
+
+    async def get_many(self, keys):
+        now = time.monotonic()
+        values = []
+        for key in keys:
+            entry = self.entries[key] if key in self.entries else None
+            if entry is not None and entry[0] is not None and entry[0] <= now:
+                del self.entries[key]
+                entry = None
+            values.append(None if entry is None else entry[1])
+        return values
+
+    async def set_many(self, items, ttl=None):
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        for key, value in items.items():
+            self.entries[key] = (expires_at, value)
+
+    async def delete_many(self, keys):
+        for key in keys:
+            self.entries.pop(key, None)
+
+
+def encode_command(*args):
+    """Encodes a command in the Redis serialization protocol."""
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+class RedisBackend(CacheBackend):
+    """Cache backend on a Redis server, shared by every bot process.
+
+    Commands are pipelined on a single connection: they are written as soon as
+    they are issued and their replies are matched in order by a reader task, so
+    concurrent callers never wait for each other's round trips.
+
+    Parameters
+    ------------
+    url: str
+        Server url, as ``redis://[:password@]host[:port][/db]``.
+    prefix: str
+        Prefix of every key, so several bots can share a server.
+    """
+
+    shared = True
+
+    def __init__(self, url, *, prefix="famous-quotes:"):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.database = int(parsed.path.strip("/") or 0)
+        self.prefix = prefix
+
+        self.reader = None
+        self.writer = None
+        self.reader_task = None
+        self.connect_lock = asyncio.Lock()
+
+        # Futures of the commands waiting for their reply, in order
+        self.pending = deque()
+
+    async def connect(self):
+        """Opens the connection to the server if it isn't open."""
+        async with self.connect_lock:
+            if self.writer is not None:
+                return
+
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+            writer = self.writer
+            self.reader_task = asyncio.ensure_future(self.read_replies(writer))
+
+            # Sent before any other command can be written on the connection
+            setup = []
+            if self.password:
+                setup.append(("AUTH", self.password))
+            if self.database:
+                setup.append(("SELECT", self.database))
+            futures = self.send(setup)
+
+        try:
+            await asyncio.gather(*futures)
+        except BACKEND_ERRORS as exc:
+            # Commands must not go through a connection that isn't set up
+            self.disconnect(exc, writer)
+            raise
+
+    async def read_reply(self):
+        """Reads a single reply, error replies are returned as RedisError."""
+        line = await self.reader.readline()
+        if not line:
+            raise EOFError("Connection closed by the Redis server")
+
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            return RedisError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = await self.reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(body)
+            if length < 0:
+                return None
+            return [await self.read_reply() for _ in range(length)]
+
+        raise RedisError(f"Unexpected reply {line!r}")
+
+    async def read_replies(self, writer):
+        """Hands every reply of a connection over to the command waiting for it."""
+        try:
+            while True:
+                reply = await self.read_reply()
+                future = self.pending.popleft()
+                if future.done():
+                    continue
+                if isinstance(reply, RedisError):
+                    future.set_exception(reply)
+                else:
+                    future.set_result(reply)
+        except (ValueError, IndexError) as exc:
+            # Malformed or unrequested replies leave the connection out of sync
+            self.disconnect(RedisError(f"Protocol error: {exc}"), writer)
+        except BACKEND_ERRORS as exc:
+            self.disconnect(exc, writer)
+
+    def disconnect(self, exc=None, writer=None):
+        """Closes the connection, failing the commands waiting for a reply.
+
+        Given the writer of a connection, it does nothing if that connection
+        was already replaced by a new one.
+        """
+        if writer is not None and writer is not self.writer:
+            return
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+        while self.pending:
+            future = self.pending.popleft()
+            if not future.done():
+                future.set_exception(exc or ConnectionError("Connection closed"))
+
+    def send(self, commands):
+        """Writes several commands at once, returning the futures of their replies."""
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in commands]
+        self.pending.extend(futures)
+        self.writer.write(b"".join(encode_command(*command) for command in commands))
+        return futures
+
+    async def execute_many(self, commands):
+        """Sends several commands in a single write, returning their replies."""
+        if self.writer is None:
+            await self.connect()
+
+        async with self.connect_lock:
+            # The reader task may have dropped the connection in the meantime
+            if self.writer is None:
+                raise ConnectionError("Connection to the Redis server lost")
+            writer = self.writer
+            futures = self.send(commands)
+
+        await writer.drain()
+        return await asyncio.gather(*futures)
+
+    async def get_many(self, keys):
+        if not keys:
+            return []
+
+        (values,) = await self.execute_many(
+            [("MGET", *(self.prefix + key for key in keys))]
+        )
+        try:
+            return [
+                None if value is None else json.loads(value, object_hook=decode_model)
+                for value in values
+            ]
+        except (ValueError, TypeError) as exc:
+            raise RedisError(f"Could not decode a cached value: {exc}") from exc
+
+    async def set_many(self, items, ttl=None):
+        if not items:
+            return
+
+        expiry = () if ttl is None else ("PX", int(ttl * 1000))
+        await self.execute_many(
+            [
+                (
+                    "SET",
+                    self.prefix + key,
+                    json.dumps(value, default=encode_model),
+                    *expiry,
+                )
+                for key, value in items.items()
+            ]
+        )
+
+    async def delete_many(self, keys):
+        if keys:
+            await self.execute_many([("DEL", *(self.prefix + key for key in keys))])
+
+    async def close(self):
+        if self.reader_task is not None:
+            self.reader_task.cancel()
+        self.disconnect()
+
+
+class NearCache(CacheBackend):
+    """Keeps the values of a shared backend in the current process for a short time.
+
+    Reads that hit the near cache cost no round trip, the others are fetched from
+    the backend in a single pipelined request. Values can be stale for up to
+    ``ttl`` seconds after another process changed them. Backend errors are logged
+    and treated as misses, so a lost backend only makes the cache colder.
+
+    Parameters
+    ------------
+    backend: CacheBackend
+        Shared backend behind the near cache.
+    size: int
+        Maximum number of keys kept in process.
+    ttl: float
+        Seconds a value is kept in process.
+    """
+
+    def __init__(self, backend, *, size=10000, ttl=5.0):
+        self.backend = backend
+        self.shared = backend.shared
+        self.local = MemoryBackend(size)
+        self.ttl = ttl
+
+    async def get_many(self, keys):
+        values = await self.local.get_many(keys)
+        missing = [key for key, value in zip(keys, values) if value is None]
+        if not missing:
+            return values
+
+        try:
+            fetched = await self.backend.get_many(missing)
+        except BACKEND_ERRORS as exc:
+            logger.warning("Cache backend read failed\n%s", exc)
+            return values
+
+        found = {
+            key: value for key, value in zip(missing, fetched) if value is not None
+        }
+        await self.local.set_many(found, self.ttl)
+        return [
+            found.get(key) if value is None else value
+            for key, value in zip(keys, values)
+        ]
+
+    async def set_many(self, items, ttl=None):
+        await self.local.set_many(
+            items, self.ttl if ttl is None else min(ttl, self.ttl)
+        )
+        try:
+            await self.backend.set_many(items, ttl)
+        except BACKEND_ERRORS as exc:
+            logger.warning("Cache backend write failed\n%s", exc)
+
+    async def delete_many(self, keys):
+        await self.local.delete_many(keys)
+        try:
+            await self.backend.delete_many(keys)
+        except BACKEND_ERRORS as exc:
+            logger.warning("Cache backend delete failed\n%s", exc)
+
+    async def close(self):
+        await self.backend.close()
+
+
+def create_cache_backend(url=None):
+    """Creates the cache backend of a url, an in-process one if there's no url."""
+    if not url or url.startswith("memory://"):
+        return MemoryBackend()
+
+    if url.startswith("redis://"):
+        return NearCache(RedisBackend(url))
+
+    raise ValueError(f"Unsupported cache backend url {url}")
@@ -0,0 +1,69 @@
+"""Utility functions for bot extensions."""
+
+import ast
+
+# Command attributes that are copied to the lazy command stubs
+STUB_ATTRIBUTES = ("name", "aliases", "brief", "help", "hidden")
+
+
+def is_command_decorator(node):
+    """Checks if a decorator node is a ``commands.command(...)`` call."""
+    if not isinstance(node, ast.Call):
+        return False
+
+    func = node.func
+    if isinstance(func, ast.Attribute):
+        return func.attr == "command"
+    if isinstance(func, ast.Name):
+        return func.id == "command"
+    return False
+
+
+def find_extension_imports(path):
+    """Returns the modules imported at the top level of an extension file.
+
+    The file is parsed instead of imported, so the extension dependencies can be
+    imported on their own, without running the extension module.
+    """
+    with open(path, encoding="utf-8") as extension_file:
+        tree = ast.parse(extension_file.read(), filename=path)
+
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            modules.append(node.module)
+
+    return modules
+
+
+def find_extension_commands(path):
+    """Returns the attributes of the commands declared in an extension file.
+
+    The file is parsed instead of imported, so the commands of an extension
+    can be known without paying for its import and setup.
+    """
+    with open(path, encoding="utf-8") as extension_file:
+        tree = ast.parse(extension_file.read(), filename=path)
+
+    extension_commands = []
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+
+        for decorator in node.decorator_list:
+            if not is_command_decorator(decorator):
+                continue
+
+            attrs = {"name": node.name}
+            for keyword in decorator.keywords:
+                if keyword.arg in STUB_ATTRIBUTES:
+                    try:
+                        attrs[keyword.arg] = ast.literal_eval(keyword.value)
+                    except ValueError:
+                        continue
+
+            extension_commands.append(attrs)
+
+    return extension_commands
@@ -0,0 +1,63 @@
+"""Utility functions to fan out requests to many destinations."""
+
+import asyncio
+
+
+class RateLimiter:
+    """Token bucket that spaces out calls to a steady rate.
+
+    Every call reserves the next free slot, so concurrent callers are spread out
+    instead of all waking up at the same time.
+
+    Parameters
+    ------------
+    rate: float
+        Calls allowed per second.
+    burst: int
+        Calls allowed at once after an idle period.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = None
+
+    async def acquire(self):
+        """Waits until a call is allowed."""
+        now = asyncio.get_running_loop().time()
+        if self.updated_at is not None:
+            elapsed = now - self.updated_at
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+async def fan_out(jobs, send, *, workers=8, rate=40.0):
+    """Runs ``send(job)`` for every job with a pool of workers.
+
+    The workers share a rate limiter, so the whole fan out stays below the rate
+    limit of the destination however many jobs there are. Returns the list of
+    ``(job, exception)`` tuples of the jobs that failed.
+    """
+    queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    limiter = RateLimiter(rate, burst=workers)
+    failures = []
+
+    async def worker():
+        while not queue.empty():
+            job = queue.get_nowait()
+            await limiter.acquire()
+            try:
+                await send(job)
+            except Exception as exc:  # pylint: disable=broad-except
+                failures.append((job, exc))
+
+    await asyncio.gather(*(worker() for _ in range(min(workers, queue.qsize()))))
+    return failures
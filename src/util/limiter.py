@@ -0,0 +1,116 @@
+"""Utility adaptive concurrency limiter."""
+
+import asyncio
+import heapq
+import itertools
+import time
+
+# Priorities of the calls waiting for a slot, lower ones go first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class AdaptiveLimiter:
+    """Limits the calls in flight to an upstream, tuning the limit as it goes.
+
+    The limit follows AIMD: it grows by about one slot per limit's worth of
+    calls that finish below the latency target while the limit is in use, and
+    it's cut by ``backoff`` when a call reports an overload (a timeout, a 429 or
+    a 5xx). Only calls that started after the last cut can cut it again, so the
+    failures of a window of calls in flight cut it once, however long the calls
+    take. Calls over the limit wait in a queue ordered by priority, then by
+    arrival.
+
+    Parameters
+    ------------
+    initial: int
+        Starting limit.
+    min_limit: int
+        Lowest limit, the upstream always gets that many calls.
+    max_limit: int
+        Highest limit.
+    latency_target: float
+        Seconds under which a call counts as healthy.
+    backoff: float
+        Factor the limit is multiplied by on an overload.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        *,
+        initial=8,
+        min_limit=1,
+        max_limit=32,
+        latency_target=1.0,
+        backoff=0.5,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+
+        self.in_flight = 0
+        self.decreased_at = float("-inf")
+        self.decreases = 0
+
+        # Heap of the [priority, sequence, future] entries of the waiting calls
+        self.waiters = []
+        self.sequence = itertools.count()
+
+    @property
+    def queue_depth(self):
+        """Number of calls waiting for a slot."""
+        return sum(not future.done() for _, _, future in self.waiters)
+
+    def has_slot(self):
+        """Returns whether another call can start right away."""
+        return self.in_flight < max(int(self.limit), self.min_limit)
+
+    async def acquire(self, priority=INTERACTIVE):
+        """Waits for a slot, the caller must call release once its call is over."""
+        if self.has_slot() and not self.waiters:
+            self.in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot was handed over right as the caller was cancelled
+            if future.done() and not future.cancelled():
+                self.in_flight -= 1
+                self.wake()
+            raise
+
+    def release(self, latency=None, overloaded=False):
+        """Frees the slot of a call, adjusting the limit to how the call went.
+
+        ``latency`` is how long the call took, it tells when the call started.
+        """
+        was_limited = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+
+        if overloaded:
+            now = time.monotonic()
+            started_at = now if latency is None else now - latency
+
+            # Calls sent before the last cut were sent with the old limit
+            if started_at >= self.decreased_at:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                self.decreased_at = now
+                self.decreases += 1
+        elif latency is not None and latency <= self.latency_target and was_limited:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+
+        self.wake()
+
+    def wake(self):
+        """Hands the free slots over to the waiting calls, by priority."""
+        while self.waiters and self.has_slot():
+            _, _, future = heapq.heappop(self.waiters)
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
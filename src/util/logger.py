@@ -10,6 +10,11 @@ def generate_logger(module_name):
     logger = logging.getLogger(module_name)
     logger.setLevel(logging.DEBUG)
 
+    # Modules executed more than once (extension loads and reloads) get the
+    # same logger back, which already has its handler
+    if logger.handlers:
+        return logger
+
     # Create handlers
     console_handler = logging.StreamHandler()
 
@@ -0,0 +1,43 @@
+"""Utility metrics registry."""
+
+import threading
+
+
+class Metrics:
+    """Registry of the counters and gauges reported by the bot.
+
+    Counters are incremented by the code paths they count. Gauges are functions
+    that are only called when the metrics are read, so keeping them up to date
+    costs nothing on the hot paths. Counters can be incremented from the worker
+    threads of the bot too, so increments hold a lock.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    def increment(self, name, value=1):
+        """Increments a counter."""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, func):
+        """Registers the function that reads the current value of a gauge."""
+        self.gauges[name] = func
+
+    def snapshot(self):
+        """Returns the current value of every counter and gauge, sorted by name."""
+        with self.lock:
+            values = dict(self.counters)
+        for name, func in self.gauges.items():
+            try:
+                values[name] = func()
+            except Exception:  # pylint: disable=broad-except
+                values[name] = None
+
+        return dict(sorted(values.items()))
+
+
+# Metrics shared by the whole bot
+metrics = Metrics()
@@ -0,0 +1,159 @@
+"""Utility models of the Quotes API resources."""
+
+import json
+from sys import intern
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Fastest JSON decoder available, orjson is an optional dependency
+loads = orjson.loads if orjson is not None else json.loads
+
+# Model classes by name, to rebuild them from their tagged JSON form
+MODELS = {}
+
+
+def register_model(cls):
+    """Registers a model class so it can be decoded from its tagged JSON form."""
+    MODELS[cls.__name__] = cls
+    return cls
+
+
+def invalid_resource(model, data, exc):
+    """Creates the error raised for a resource missing a required field."""
+    return ValueError(f"Invalid {model} resource, missing {exc}: {data!r:.200}")
+
+
+@register_model
+class Quote:
+    """Quote resource, only keeping the fields the bot uses.
+
+    Author names, author images and tags repeat across quotes, they are
+    interned so every distinct value is kept in memory once.
+    """
+
+    __slots__ = ("id", "quote_text", "author_name", "author_image", "tags")
+
+    def __init__(  # pylint: disable=too-many-arguments, redefined-builtin
+        self, quote_text, author_name, author_image=None, tags=(), id=None
+    ):
+        self.id = id
+        self.quote_text = quote_text
+        self.author_name = author_name
+        self.author_image = author_image
+        self.tags = tags
+
+    @classmethod
+    def from_json(cls, data):
+        """Creates a quote from its JSON form, raising ValueError if it's invalid."""
+        try:
+            author_image = data.get("author_image")
+            return cls(
+                data["quote_text"],
+                intern(data["author_name"]),
+                intern(author_image) if author_image else None,
+                tuple(map(intern, data.get("tags") or ())),
+                data.get("id"),
+            )
+        except (KeyError, TypeError, AttributeError) as exc:
+            raise invalid_resource("Quote", data, exc) from exc
+
+    def to_json(self):
+        """Returns the JSON form of the quote."""
+        return {
+            "id": self.id,
+            "quote_text": self.quote_text,
+            "author_name": self.author_name,
+            "author_image": self.author_image,
+            "tags": list(self.tags),
+        }
+
+    @property
+    def key(self):
+        """Identity of the quote, its id or a hash of its text and author."""
+        return self.id or hash((self.quote_text, self.author_name))
+
+    def __repr__(self):
+        return f"<Quote id={self.id!r} author_name={self.author_name!r}>"
+
+
+@register_model
+class Author:
+    """Author resource, only keeping the fields the bot uses."""
+
+    __slots__ = ("id", "name")
+
+    def __init__(self, name, id=None):  # pylint: disable=redefined-builtin
+        self.id = id
+        self.name = name
+
+    @classmethod
+    def from_json(cls, data):
+        """Creates an author from its JSON form, raising ValueError if it's invalid."""
+        try:
+            return cls(intern(data["name"]), data.get("id"))
+        except (KeyError, TypeError, AttributeError) as exc:
+            raise invalid_resource("Author", data, exc) from exc
+
+    def to_json(self):
+        """Returns the JSON form of the author."""
+        return {"id": self.id, "name": self.name}
+
+    def __repr__(self):
+        return f"<Author id={self.id!r} name={self.name!r}>"
+
+
+class Page:  # pylint: disable=too-few-public-methods
+    """Page of a list endpoint, with its records decoded as models."""
+
+    __slots__ = ("records", "page", "per_page", "page_count", "total_count")
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self, records, page=1, per_page=None, page_count=1, total_count=None
+    ):
+        self.records = records
+        self.page = page
+        self.per_page = per_page
+        self.page_count = page_count
+        self.total_count = total_count
+
+    @classmethod
+    def from_json(cls, data, model):
+        """Creates a page from the list envelope of the api."""
+        try:
+            records = data["records"]
+        except (KeyError, TypeError) as exc:
+            raise invalid_resource("Page", data, exc) from exc
+
+        metadata = data.get("_metadata") or {}
+        return cls(
+            [model.from_json(record) for record in records],
+            metadata.get("page", 1),
+            metadata.get("per_page"),
+            metadata.get("page_count", 1),
+            metadata.get("total_count"),
+        )
+
+    def __repr__(self):
+        return (
+            f"<Page page={self.page!r} page_count={self.page_count!r} "
+            f"records={len(self.records)}>"
+        )
+
+
+def encode_model(value):
+    """JSON encoder hook that tags the models with their class name."""
+    if type(value).__name__ not in MODELS:
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+    data = value.to_json()
+    data["__model__"] = type(value).__name__
+    return data
+
+
+def decode_model(data):
+    """JSON decoder hook that rebuilds the models tagged by encode_model."""
+    name = data.pop("__model__", None)
+    return data if name is None else MODELS[name].from_json(data)
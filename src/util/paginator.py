@@ -1,9 +1,222 @@
 """Utility pagination class."""
 
 import asyncio
+import tempfile
 
 import discord
 from discord.ext.commands import Paginator as CommandPaginator
+from discord.http import Route
+
+from util.cache import CacheDict
+from util.logger import generate_logger
+from util.metrics import metrics
+from util.timers import TimerWheel
+
+logger = generate_logger(__name__)
+
+
+class ReactionSession:
+    """State of a pagination session registered in the reaction dispatcher."""
+
+    __slots__ = (
+        "message_id",
+        "user_id",
+        "actions",
+        "timeout",
+        "deadline",
+        "waiter",
+        "pending",
+        "closed",
+    )
+
+    def __init__(self, message_id, user_id, actions, timeout):
+        self.message_id = message_id
+        self.user_id = user_id
+        self.actions = actions
+        self.timeout = timeout
+        self.deadline = asyncio.get_event_loop().time() + timeout
+        self.waiter = None
+        self.pending = None
+        self.closed = False
+
+    def deliver(self, event):
+        """Hands a reaction event over to the session."""
+        self.deadline = asyncio.get_event_loop().time() + self.timeout
+
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(event)
+        else:
+            # Only the latest reaction is kept while an action is running
+            self.pending = event
+
+    def close(self):
+        """Closes the session, waking up its waiter."""
+        self.closed = True
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def wait(self):
+        """Waits for the next ``(payload, action)`` reaction event.
+
+        Returns None once the session is closed or timed out.
+        """
+        if self.pending is not None:
+            event, self.pending = self.pending, None
+            return event
+
+        if self.closed:
+            return None
+
+        self.waiter = asyncio.get_event_loop().create_future()
+        try:
+            return await self.waiter
+        finally:
+            self.waiter = None
+
+
+class ReactionSeeder:  # pylint: disable=too-few-public-methods
+    """Adds reactions to a message in order, while they are still needed.
+
+    discord.py sends the requests of a rate limit bucket one at a time, so the
+    reactions are added one after the other. Seeding stops as soon as
+    ``is_active`` returns False, so sessions that end early don't spend the
+    reaction bucket on controls nobody will use.
+
+    Parameters
+    ------------
+    message: discord.Message
+        The message to add the reactions to.
+    emojis: List[str]
+        The reactions to add, in order.
+    is_active: Callable[[], bool]
+        Tells whether the reactions are still needed.
+    """
+
+    def __init__(self, message, emojis, *, is_active):
+        self.message = message
+        self.emojis = emojis
+        self.is_active = is_active
+
+    async def run(self):
+        """Adds the reactions, returning how many were added."""
+        added = 0
+
+        for emoji in self.emojis:
+            if not self.is_active():
+                break
+
+            try:
+                await self.message.add_reaction(emoji)
+            except discord.HTTPException as exc:
+                # The message was deleted or we lost the permission to react
+                logger.warning("Could not add the %s reaction\n%s", emoji, exc)
+                break
+            added += 1
+
+        return added
+
+
+class ReactionDispatcher:
+    """Routes raw reaction and button events to the pagination sessions of a bot.
+
+    A single listener looks the session up by message id, instead of every
+    session evaluating a ``wait_for`` check on every reaction. Session timeouts
+    are handled by one timer wheel.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.sessions = {}
+        self.wheel = TimerWheel(self.expire)
+        bot.add_listener(self.on_raw_reaction_add)
+        bot.add_listener(self.on_socket_response)
+
+        metrics.gauge("paginator.sessions", lambda: len(self.sessions))
+
+    @classmethod
+    def of(cls, bot):
+        """Returns the dispatcher of a bot, creating it on first use."""
+        dispatcher = getattr(bot, "reaction_dispatcher", None)
+        if dispatcher is None:
+            dispatcher = cls(bot)
+            bot.reaction_dispatcher = dispatcher
+        return dispatcher
+
+    def open(self, message_id, user_id, actions, timeout=120.0):
+        """Registers a session for the reactions of a user to a message."""
+        session = ReactionSession(message_id, user_id, actions, timeout)
+        self.sessions[message_id] = session
+        self.wheel.schedule(session)
+        return session
+
+    def close(self, session):
+        """Unregisters a session."""
+        if self.sessions.get(session.message_id) is session:
+            del self.sessions[session.message_id]
+        self.wheel.cancel(session)
+        session.close()
+
+    def close_all(self):
+        """Closes every registered session."""
+        for session in list(self.sessions.values()):
+            self.close(session)
+
+    def expire(self, session):
+        """Closes a session that reached its timeout."""
+        if self.sessions.get(session.message_id) is session:
+            del self.sessions[session.message_id]
+        session.close()
+
+    async def on_raw_reaction_add(self, payload):
+        """Hands a reaction over to the session of the reacted message."""
+        session = self.sessions.get(payload.message_id)
+        if session is None or payload.user_id != session.user_id:
+            return
+
+        action = session.actions.get(str(payload.emoji))
+        if action is not None:
+            session.deliver((payload, action))
+
+    async def on_socket_response(self, msg):
+        """Hands a button press over to the session of the message.
+
+        discord.py doesn't parse interactions, so they are read from the raw
+        gateway payloads.
+        """
+        if msg.get("t") != "INTERACTION_CREATE":
+            return
+
+        interaction = msg["d"]
+        if interaction.get("type") != 3 or "message" not in interaction:
+            return
+
+        session = self.sessions.get(int(interaction["message"]["id"]))
+        if session is None:
+            return
+
+        # Every press must be acknowledged, the page itself is edited afterwards
+        await self.acknowledge(interaction)
+
+        user = interaction.get("member", {}).get("user") or interaction.get("user")
+        if int(user["id"]) != session.user_id:
+            return
+
+        action = session.actions.get(interaction["data"].get("custom_id"))
+        if action is not None:
+            session.deliver((interaction, action))
+
+    async def acknowledge(self, interaction):
+        """Acknowledges a button press without changing the message."""
+        route = Route(
+            "POST",
+            "/interactions/{interaction_id}/{interaction_token}/callback",
+            interaction_id=interaction["id"],
+            interaction_token=interaction["token"],
+        )
+        try:
+            await self.bot.http.request(route, json={"type": 6})
+        except discord.HTTPException:
+            pass
 
 
 class Pages:  # pylint: disable=too-many-instance-attributes
@@ -25,6 +238,8 @@ class Pages:  # pylint: disable=too-many-instance-attributes
         How many entries show up per page.
     show_entry_count: bool
         Whether to show an entry count in the footer.
+    use_buttons: bool
+        Whether to navigate with message buttons instead of reactions.
     Attributes
     -----------
     embed: discord.Embed
@@ -35,9 +250,19 @@ class Pages:  # pylint: disable=too-many-instance-attributes
         Our permissions for the channel.
     """
 
-    def __init__(self, ctx, *, entries, per_page=12, show_entry_count=True):
+    # Background tasks of every pagination session
+    background_tasks = set()
+
+    def __init__(
+        self, ctx, *, entries, per_page=12, show_entry_count=True, use_buttons=False
+    ):  # pylint: disable=too-many-arguments
         """Initialisation for Page class instances."""
         self.bot = ctx.bot
+        self.session = None
+
+        # Background tasks owned by this session, by name
+        self.tasks = {}
+        self.use_buttons = use_buttons
         self.entries = entries
         self.message = ctx.message
         self.channel = ctx.channel
@@ -73,6 +298,43 @@ class Pages:  # pylint: disable=too-many-instance-attributes
             ("\N{INFORMATION SOURCE}", self.show_help),
         ]
 
+    def create_task(self, coro, *, name):
+        """Runs a background task owned by the pagination session.
+
+        Starting a task under the name of a task that is still running replaces
+        it, so repeated requests never pile up. Every task of the session is
+        cancelled when the session ends.
+        """
+        previous = self.tasks.get(name)
+        if previous is not None:
+            previous.cancel()
+
+        task = self.bot.loop.create_task(coro)
+        self.tasks[name] = task
+        Pages.background_tasks.add(task)
+
+        def forget_task(task):
+            Pages.background_tasks.discard(task)
+            if self.tasks.get(name) is task:
+                del self.tasks[name]
+
+            # Failures are logged instead of left unretrieved on the task
+            if not task.cancelled() and task.exception() is not None:
+                logger.error(
+                    "Paginator %s task failed", name, exc_info=task.exception()
+                )
+
+        task.add_done_callback(forget_task)
+        return task
+
+    def cancel_tasks(self):
+        """Cancels every background task of the pagination session."""
+        for task in list(self.tasks.values()):
+            task.cancel()
+
+    async def load_page(self, page):
+        """Makes a page available, the entries of every page are known upfront."""
+
     def get_page(self, page):
         """Gets the entries from a specific page."""
         base = (page - 1) * self.per_page
@@ -104,8 +366,9 @@ class Pages:  # pylint: disable=too-many-instance-attributes
             self.embed.set_footer(text=text)
 
         if self.paginating and first:
+            verb = "Press" if self.use_buttons else "React with"
             pages.append("")
-            pages.append("React with \N{INFORMATION SOURCE} for more information.")
+            pages.append(f"{verb} \N{INFORMATION SOURCE} for more information.")
 
         self.embed.description = "\n".join(pages)
 
@@ -125,15 +388,75 @@ class Pages:  # pylint: disable=too-many-instance-attributes
             await self.message.edit(content=content, embed=embed)
             return
 
-        self.message = await self.channel.send(content=content, embed=embed)
+        if self.use_buttons:
+            self.message = await self.send_with_buttons(content, embed)
+        else:
+            self.message = await self.channel.send(content=content, embed=embed)
 
-        for (reaction, _) in self.reaction_emojis:
-            if self.maximum_pages == 2 and reaction in ("\u23ed", "\u23ee"):
+    def navigation_emojis(self):
+        """Returns the emojis of the navigation controls."""
+        emojis = []
+        for emoji, _ in self.reaction_emojis:
+            if self.maximum_pages == 2 and emoji in ("\u23ea", "\u23e9"):
                 # Remove |<< and >>| if there are only two pages for the embed
                 # Users can still use it, but in this case, it won't have any effect
                 continue
+            emojis.append(emoji)
+        return emojis
+
+    def create_components(self):
+        """Creates the message components for the navigation buttons."""
+        buttons = [
+            {"type": 2, "style": 2, "emoji": {"name": emoji}, "custom_id": emoji}
+            for emoji in self.navigation_emojis()
+        ]
+
+        # Action rows hold up to 5 buttons each
+        return [
+            {"type": 1, "components": buttons[index : index + 5]}
+            for index in range(0, len(buttons), 5)
+        ]
+
+    async def send_with_buttons(self, content, embed):
+        """Sends the first page with its navigation buttons in a single request."""
+        payload = {"components": self.create_components()}
+        if content is not None:
+            payload["content"] = content
+        if embed is not None:
+            payload["embed"] = embed.to_dict()
+
+        route = Route(
+            "POST", "/channels/{channel_id}/messages", channel_id=self.channel.id
+        )
+        data = await self.bot.http.request(route, json=payload)
 
-            await self.message.add_reaction(reaction)
+        # pylint: disable=protected-access
+        return discord.Message(
+            state=self.channel._state, channel=self.channel, data=data
+        )
+
+    async def add_reactions(self):
+        """Adds the navigation reactions to the message."""
+        seeder = ReactionSeeder(
+            self.message, self.navigation_emojis(), is_active=lambda: self.paginating
+        )
+        await seeder.run()
+
+    async def clear_controls(self):
+        """Removes the navigation reactions or buttons from the message."""
+        try:
+            if self.use_buttons:
+                route = Route(
+                    "PATCH",
+                    "/channels/{channel_id}/messages/{message_id}",
+                    channel_id=self.channel.id,
+                    message_id=self.message.id,
+                )
+                await self.bot.http.request(route, json={"components": []})
+            else:
+                await self.message.clear_reactions()
+        except Exception:  # pylint: disable=broad-except
+            pass
 
     async def checked_show_page(self, page):
         """Checks that the given page not exceed
@@ -189,7 +512,9 @@ class Pages:  # pylint: disable=too-many-instance-attributes
             page = int(msg.content)
             to_delete.append(msg)
 
-            # Check the page number is within the range of pages available
+            # Check the page number is within the range of pages available,
+            # once the pages up to it are loaded
+            await self.load_page(page)
             if page != 0 and page <= self.maximum_pages:
                 await self.show_page(page)
             else:
@@ -234,69 +559,62 @@ class Pages:  # pylint: disable=too-many-instance-attributes
             await self.show_current_page()
 
         # Go back to the page before this help message
-        self.bot.loop.create_task(go_back_to_current_page())
+        self.create_task(go_back_to_current_page(), name="go_back")
 
     async def stop_pages(self):
         """Stops the interactive pagination session."""
         await self.message.delete()
         self.paginating = False
 
-    def react_check(self, payload):
-        """Check the reaction from the user."""
-
-        # If reaction user is different from the help command
-        if payload.user_id != self.author.id:
-            return False
-
-        if payload.message_id != self.message.id:
-            return False
-
-        to_check = str(payload.emoji)
-
-        for (emoji, func) in self.reaction_emojis:
-            if to_check == emoji:
-                self.match = func
-                return True
-
-        return False
-
     async def paginate(self):
         """Actually paginate the entries and run the interactive loop if necessary."""
-        first_page = self.show_page(1, first=True)
+        await self.show_page(1, first=True)
 
         if not self.paginating:
-            await first_page
-        else:
-            # Allow us to react to reactions right away if we're paginating
-            self.bot.loop.create_task(first_page)
+            return
+
+        dispatcher = ReactionDispatcher.of(self.bot)
+        self.session = dispatcher.open(
+            self.message.id, self.author.id, dict(self.reaction_emojis)
+        )
+
+        # Allow us to react to reactions right away if we're paginating
+        if not self.use_buttons:
+            self.create_task(self.add_reactions(), name="seed")
 
-        # While embed is being paginated
+        try:
+            await self.interactive_loop()
+        finally:
+            self.cancel_tasks()
+            dispatcher.close(self.session)
+
+    async def interactive_loop(self):
+        """Waits for the reactions of the user and runs their actions."""
         while self.paginating:
-            try:
-                # Wait for a reaction to be added by the original user.
-                # The waiting time limit is 2 minutes
-                payload = await self.bot.wait_for(
-                    "raw_reaction_add", check=self.react_check, timeout=120.0
-                )
-            except asyncio.TimeoutError:
-                # After the 2 minutes, stop the pagination, and
+            # Wait for a reaction to be added by the original user.
+            # The session times out after 2 minutes without reactions
+            event = await self.session.wait()
+
+            if event is None:
+                # After the session ends, stop the pagination, and
                 # clear all the reactions from the message
                 self.paginating = False
+                await self.clear_controls()
+                break
+
+            payload, action = event
+
+            if not self.use_buttons:
                 try:
-                    await self.message.clear_reactions()
+                    # After the original user has reacted to the embed, try to remove it
+                    # in order to keep the count in 1 for every emoji
+                    await self.message.remove_reaction(
+                        payload.emoji, discord.Object(id=payload.user_id)
+                    )
                 except Exception:  # pylint: disable=broad-except
-                    break
+                    pass
 
-            try:
-                # After the original user has reacted to the embed, try to remove it
-                # in order to keep the count in 1 for every emoji
-                await self.message.remove_reaction(
-                    payload.emoji, discord.Object(id=payload.user_id)
-                )
-            except Exception:  # pylint: disable=broad-except
-                pass
-
-            await self.match()
+            await action()
 
 
 class FieldPages(Pages):
@@ -345,3 +663,159 @@ class TextPages(Pages):
         if self.maximum_pages > 1:
             return f"{entry}\nPage {page}/{self.maximum_pages}"
         return entry
+
+
+class StreamingTextPages(Pages):  # pylint: disable=too-many-instance-attributes
+    """Paginates text from a stream of lines, rendering the pages on demand.
+
+    Unlike TextPages, the whole text is never held in memory: pages are built
+    when they are first shown, written to a temporary file, and only the
+    latest ``window`` pages are kept in memory. The first page is shown as soon
+    as it's rendered, even if the stream is a multi-megabyte dump.
+
+    Parameters
+    ------------
+    ctx: Context
+        The context of the command.
+    lines: Union[Iterable[str], AsyncIterable[str]]
+        The lines of text to paginate.
+    window: int
+        How many rendered pages are kept in memory.
+    """
+
+    def __init__(
+        self, ctx, lines, *, prefix="```", suffix="```", max_size=2000, window=8
+    ):  # pylint: disable=too-many-arguments
+        super().__init__(ctx, entries=[], per_page=1, show_entry_count=False)
+        self.prefix = prefix
+        self.suffix = suffix
+        self.max_size = max_size - 200
+
+        # Rendered pages live in the spill file, (offset, length) by page
+        self.spill = tempfile.TemporaryFile()
+        self.offsets = []
+        self.window = CacheDict(window)
+
+        self.source = self.render_pages(lines)
+        self.exhausted = False
+        self.maximum_pages = 0
+
+    async def iterate_lines(self, lines):
+        """Iterates over sync and async sources of lines alike."""
+        if hasattr(lines, "__aiter__"):
+            async for line in lines:
+                yield line
+        else:
+            for line in lines:
+                yield line
+
+    async def render_pages(self, lines):
+        """Groups the lines into pages that fit in a message."""
+        overhead = len(self.prefix) + len(self.suffix) + 2
+        limit = self.max_size - overhead
+        buffer = []
+        size = overhead
+        rendered = False
+
+        async for line in self.iterate_lines(lines):
+            # Lines that don't fit in a page on their own are cut
+            line = line.rstrip("\n")[:limit]
+
+            if buffer and size + len(line) + 1 > self.max_size:
+                yield "\n".join([self.prefix, *buffer, self.suffix])
+                rendered = True
+                buffer = []
+                size = overhead
+
+            buffer.append(line)
+            size += len(line) + 1
+
+        if buffer:
+            yield "\n".join([self.prefix, *buffer, self.suffix])
+        elif not rendered:
+            # An empty stream still gets a reply
+            yield "\n".join([self.prefix, "No output.", self.suffix])
+
+    async def load_page(self, page):
+        """Renders pages from the stream until ``page`` exists or the stream ends."""
+        while len(self.offsets) < page and not self.exhausted:
+            try:
+                text = await self.source.__anext__()
+            except StopAsyncIteration:
+                self.exhausted = True
+                break
+
+            data = text.encode("utf-8")
+            offset = self.spill.seek(0, 2)
+            self.spill.write(data)
+            self.offsets.append((offset, len(data)))
+            self.window[len(self.offsets)] = text
+
+            # Let other events run between pages of very long streams
+            await asyncio.sleep(0)
+
+        self.maximum_pages = len(self.offsets)
+
+    def get_page(self, page):
+        try:
+            return self.window[page]
+        except KeyError:
+            pass
+
+        offset, length = self.offsets[page - 1]
+        self.spill.seek(offset)
+        text = self.spill.read(length).decode("utf-8")
+        self.window[page] = text
+        return text
+
+    def get_embed(self, entries, page, *, first=False):
+        return None
+
+    def get_content(self, entries, page, *, first=False):
+        if self.maximum_pages > 1 or not self.exhausted:
+            total = self.maximum_pages if self.exhausted else "?"
+            return f"{entries}\nPage {page}/{total}"
+        return entries
+
+    async def show_page(self, page, *, first=False):
+        # Render one page ahead to know whether there is a next page
+        await self.load_page(page + 1)
+        await super().show_page(page, first=first)
+
+    async def checked_show_page(self, page):
+        await self.load_page(page)
+        await super().checked_show_page(page)
+
+    async def last_page(self):
+        """Goes to the last page."""
+        await self.load_page(float("inf"))
+        await self.show_page(self.maximum_pages)
+
+    async def paginate(self):
+        """Renders the first pages and runs the pagination session."""
+        try:
+            await self.load_page(2)
+            self.paginating = len(self.offsets) > 1
+            await super().paginate()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Stops reading the stream and deletes the spill file."""
+        await self.source.aclose()
+        self.spill.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def __del__(self):
+        # Sessions that were never paginated still release their spill file
+        spill = getattr(self, "spill", None)
+        if spill is not None:
+            spill.close()
+
+
+metrics.gauge("paginator.background_tasks", lambda: len(Pages.background_tasks))
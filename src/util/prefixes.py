@@ -0,0 +1,97 @@
+"""Utility class for the command prefixes of the guilds."""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS guild_prefixes (
+    guild_id INTEGER PRIMARY KEY,
+    prefix TEXT NOT NULL
+);
+"""
+
+# Longest prefix a guild can set
+MAX_PREFIX_LENGTH = 10
+
+
+class GuildPrefixes:
+    """Command prefixes of the guilds, kept in the local store and served from memory.
+
+    Guilds without a prefix of their own use the default one. Resolving the
+    prefix of a message is a single dict lookup, and the first characters of
+    every prefix in use are kept in a tuple, so a message that can't be a
+    command is rejected with a single ``startswith`` before any parsing.
+
+    Parameters
+    ------------
+    store: LocalStore
+        Store the prefixes are kept in.
+    default: str
+        Prefix of the guilds that didn't set one, and of the DMs.
+    """
+
+    def __init__(self, store, default):
+        self.store = store
+        self.default = default
+        self.prefixes = {}
+        self.starts = ()
+        self.update_starts()
+
+        self.store.submit(self.store.executescript, SCHEMA)
+
+    def update_starts(self):
+        """Collects the first characters of the prefixes, after they changed."""
+        starts = {prefix[:1] for prefix in self.prefixes.values()}
+        starts.add((self.default or "")[:1])
+        self.starts = tuple(starts)
+
+    def is_command(self, content):
+        """Returns whether a message starts like a command of some guild."""
+        return content.startswith(self.starts)
+
+    def resolve(self, bot, message):  # pylint: disable=unused-argument
+        """Returns the prefix of a message, used as the command_prefix of the bot."""
+        if message.guild is None:
+            return self.default
+        return self.prefixes.get(message.guild.id, self.default)
+
+    def get(self, guild_id):
+        """Returns the prefix of a guild."""
+        return self.prefixes.get(guild_id, self.default)
+
+    async def load(self):
+        """Loads the prefixes of the guilds from the local store."""
+        rows = await self.store.run(
+            self.store.execute, "SELECT guild_id, prefix FROM guild_prefixes"
+        )
+
+        # Prefixes changed while the rows were read are newer
+        for guild_id, prefix in rows:
+            self.prefixes.setdefault(guild_id, prefix)
+        self.update_starts()
+
+    async def set(self, guild_id, prefix):
+        """Changes the prefix of a guild, the default prefix resets it.
+
+        Raises ValueError with a message for the user if the prefix is invalid.
+        """
+        if not prefix or prefix[0].isspace():
+            raise ValueError("The prefix can't be empty or start with a space.")
+        if len(prefix) > MAX_PREFIX_LENGTH:
+            raise ValueError(
+                f"The prefix can't be longer than {MAX_PREFIX_LENGTH} characters."
+            )
+
+        if prefix == self.default:
+            await self.store.run(
+                self.store.execute,
+                "DELETE FROM guild_prefixes WHERE guild_id = ?",
+                (guild_id,),
+            )
+            self.prefixes.pop(guild_id, None)
+        else:
+            await self.store.run(
+                self.store.execute,
+                "INSERT OR REPLACE INTO guild_prefixes VALUES (?, ?)",
+                (guild_id, prefix),
+            )
+            self.prefixes[guild_id] = prefix
+
+        self.update_starts()
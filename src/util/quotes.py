@@ -1,8 +1,48 @@
 """Quotes API Client class."""
 
+import asyncio
+import functools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from sys import intern
+
 import requests
 
-from config import QUOTES_API_URL
+from config import (
+    QUOTES_API_URL,
+    QUOTES_API_TIMEOUT,
+    QUOTES_API_CONCURRENCY,
+    QUOTES_API_MAX_CONCURRENCY,
+    QUOTES_API_LATENCY_TARGET,
+)
+from util.cache import CacheDict
+from util.limiter import AdaptiveLimiter, BACKGROUND, INTERACTIVE
+from util.metrics import metrics
+from util.models import Author, Page, Quote, loads
+
+# Number of urls whose last response is kept for conditional requests
+CONDITIONAL_CACHE_SIZE = 512
+
+# Records per page and pages fetched ahead by the paging iterators by default
+PAGE_SIZE = 100
+PAGE_READ_AHEAD = 4
+
+# Concurrency limiter shared by every api client, they all call the same api,
+# and the threads running their calls, enough of them for the highest limit
+api_limiter = AdaptiveLimiter(
+    initial=QUOTES_API_CONCURRENCY,
+    max_limit=QUOTES_API_MAX_CONCURRENCY,
+    latency_target=QUOTES_API_LATENCY_TARGET,
+)
+api_executor = ThreadPoolExecutor(
+    max_workers=QUOTES_API_MAX_CONCURRENCY, thread_name_prefix="quotes-api"
+)
+metrics.gauge("quotes_api.limit", lambda: round(api_limiter.limit, 2))
+metrics.gauge("quotes_api.in_flight", lambda: api_limiter.in_flight)
+metrics.gauge("quotes_api.queue_depth", lambda: api_limiter.queue_depth)
+metrics.gauge("quotes_api.limit_decreases", lambda: api_limiter.decreases)
 
 
 class URLs:
@@ -54,35 +94,240 @@ class BearerAuth(requests.auth.AuthBase):  # pylint: disable=too-few-public-meth
         return req
 
 
+def decode(response, decoder):
+    """Decodes the body of a response into models, only once per response.
+
+    Raises requests.HTTPError for error responses and ValueError for bodies
+    missing a field the models need.
+    """
+    models = getattr(response, "models", None)
+    if models is None:
+        response.raise_for_status()
+        models = response.models = decoder(loads(response.content))
+    return models
+
+
+def is_overload(exc):
+    """Returns whether an api call failed because the api is overloaded or unreachable."""
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return is_overload_status(exc.response.status_code)
+    return False
+
+
+def is_overload_status(status_code):
+    """Returns whether a response status means the api is overloaded."""
+    return status_code == 429 or status_code >= 500
+
+
+def decode_tags(data):
+    """Decodes the tag list."""
+    return [intern(tag) for tag in data["tags"]]
+
+
 class QuotesApi:
-    """Quotes API Wrapper."""
+    """Quotes API Wrapper.
+
+    The ``get_*`` methods return the raw responses, the ``fetch_*`` methods
+    return their bodies decoded as models and the ``iter_*`` async generators
+    go through every page of a list endpoint.
+
+    The list endpoints send conditional requests: the validators of the last
+    response of every url are kept, and when the api answers 304 Not Modified
+    that response is returned again along with its decoded models. The models
+    are shared by every caller, so they must not be modified.
+    """
 
     def __init__(self, api_key):
         self.api_key = api_key
         self.url = URLs()
 
+        # Session that keeps the connections to the api alive between requests
+        self.session = requests.Session()
+        self.session.auth = BearerAuth(self.api_key)
+        self.timeout = QUOTES_API_TIMEOUT
+        self.limiter = api_limiter
+        self.executor = api_executor
+
+        # Last response of every list url with its validators, api calls run on
+        # the executor threads so the cache is guarded by a lock
+        self.conditional_responses = CacheDict(CONDITIONAL_CACHE_SIZE)
+        self.conditional_lock = threading.Lock()
+
+    def close(self):
+        """Closes the connections of the api session."""
+        self.session.close()
+
+    async def run(self, func, *args, priority=INTERACTIVE, **kwargs):
+        """Runs a blocking api call in the executor of the api clients.
+
+        The call waits for a slot of the shared concurrency limiter first,
+        interactive calls ahead of the background ones, and reports to it how
+        long it took and whether the api was overloaded.
+        """
+        await self.limiter.acquire(priority)
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        overloaded = False
+
+        try:
+            result = await loop.run_in_executor(
+                self.executor, functools.partial(func, *args, **kwargs)
+            )
+            if isinstance(result, requests.Response):
+                overloaded = is_overload_status(result.status_code)
+            return result
+        except Exception as exc:
+            overloaded = is_overload(exc)
+            raise
+        finally:
+            if overloaded:
+                metrics.increment("quotes_api.overloads")
+            self.limiter.release(time.monotonic() - start, overloaded)
+
+    async def iter_pages(
+        self,
+        fetch,
+        query_params=None,
+        *,
+        per_page=PAGE_SIZE,
+        read_ahead=PAGE_READ_AHEAD,
+        priority=BACKGROUND,
+    ):
+        """Yields every page of a list endpoint, fetching the next ones ahead.
+
+        The first page tells how many pages there are, then up to ``read_ahead``
+        pages are fetched concurrently while the caller consumes the current
+        one, so at most ``read_ahead + 1`` pages are held in memory. They skip
+        the conditional request cache, which would keep every page alive after
+        the iteration, so the bound holds once it's over too. Pages are
+        yielded in order. The fetches still running are cancelled when the
+        generator is closed, so stopping early or cancelling the caller leaves
+        nothing behind; wrap it in ``contextlib.aclosing`` to close it as soon
+        as the loop exits.
+
+        Parameters
+        ------------
+        fetch: Callable
+            Blocking method that fetches a Page, such as ``fetch_quotes``,
+            taking ``query_params`` and ``conditional`` keyword arguments.
+        query_params: dict
+            Filters of the list, the paging parameters are added to them.
+        per_page: int
+            Number of records of every page.
+        read_ahead: int
+            Number of pages fetched ahead, 0 to fetch them one after the other.
+        priority: int
+            Priority of the page fetches in the concurrency limiter.
+        """
+        query_params = dict(query_params or {}, per_page=per_page)
+
+        def fetch_page(number):
+            return self.run(
+                fetch,
+                query_params=dict(query_params, page=number),
+                conditional=False,
+                priority=priority,
+            )
+
+        page = await fetch_page(1)
+        page_count = page.page_count or 1
+        next_number = 2
+        pending = deque()
+
+        try:
+            while True:
+                # Keep the read-ahead window full before handing the page over
+                while next_number <= page_count and len(pending) < read_ahead:
+                    pending.append(asyncio.ensure_future(fetch_page(next_number)))
+                    next_number += 1
+
+                metrics.increment("quotes_api.pages")
+                yield page
+
+                if not pending and next_number <= page_count:
+                    pending.append(asyncio.ensure_future(fetch_page(next_number)))
+                    next_number += 1
+                if not pending:
+                    return
+
+                page = await pending.popleft()
+                if not page.records:
+                    return
+        finally:
+            for task in pending:
+                # The error of a page that's no longer needed isn't reported
+                if task.done() and not task.cancelled():
+                    task.exception()
+                task.cancel()
+
+    def iter_quotes(self, query_params=None, **kwargs):
+        """Yields every page of quote resources as Pages of Quotes."""
+        return self.iter_pages(self.fetch_quotes, query_params, **kwargs)
+
+    def iter_authors(self, query_params=None, **kwargs):
+        """Yields every page of author resources as Pages of Authors."""
+        return self.iter_pages(self.fetch_authors, query_params, **kwargs)
+
     def __get_data(self, url, payload=None):
         """Private method that performs a get request."""
 
         if payload is not None:
-            return requests.get(url, auth=BearerAuth(self.api_key), params=payload)
-        return requests.get(url, auth=BearerAuth(self.api_key))
+            return self.session.get(url, params=payload, timeout=self.timeout)
+        return self.session.get(url, timeout=self.timeout)
+
+    def __get_conditional_data(self, url, payload=None):
+        """Private method that performs a conditional get request."""
+        key = (url, tuple(sorted((payload or {}).items())))
+        with self.conditional_lock:
+            cached = (
+                self.conditional_responses[key]
+                if key in self.conditional_responses
+                else None
+            )
+
+        headers = {}
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        response = self.session.get(
+            url, params=payload, headers=headers, timeout=self.timeout
+        )
+        metrics.increment("quotes_api.conditional_requests")
+
+        if response.status_code == 304 and cached is not None:
+            metrics.increment("quotes_api.not_modified")
+            metrics.increment("quotes_api.bytes_saved", len(cached[2].content))
+            return cached[2]
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 200 and (etag or last_modified):
+            with self.conditional_lock:
+                self.conditional_responses[key] = (etag, last_modified, response)
+
+        return response
 
     def __put_data(self, url, data):
         """Private method that performs a put request."""
-        return requests.put(url, json=data, auth=BearerAuth(self.api_key))
+        return self.session.put(url, json=data, timeout=self.timeout)
 
     def __patch_data(self, url, data):
         """Private method that performs a patch request."""
-        return requests.put(url, json=data, auth=BearerAuth(self.api_key))
+        return self.session.patch(url, json=data, timeout=self.timeout)
 
     def __delete_data(self, url):
         """Private method that performs a delete request."""
-        return requests.delete(url, auth=BearerAuth(self.api_key))
+        return self.session.delete(url, timeout=self.timeout)
 
     def __post_data(self, url, data):
         """Private method that performs a post request."""
-        return requests.post(url, json=data, auth=BearerAuth(self.api_key))
+        return self.session.post(url, json=data, timeout=self.timeout)
 
     def get_quote(self, quote_id, query_params=None):
         """Get quote resource by id."""
@@ -114,17 +359,43 @@ class QuotesApi:
         quotes_url = self.url.random_quote_url()
         return self.__get_data(quotes_url, query_params)
 
-    def get_all_quotes(self, query_params=None):
+    def get_all_quotes(self, query_params=None, conditional=True):
         """Get list of quote resources."""
         quotes_url = self.url.quotes_url()
-        return self.__get_data(quotes_url, query_params)
+        if not conditional:
+            return self.__get_data(quotes_url, query_params)
+        return self.__get_conditional_data(quotes_url, query_params)
 
-    def get_all_authors(self, query_params=None):
+    def get_all_authors(self, query_params=None, conditional=True):
         """Get list of author resources."""
         authors_url = self.url.authors_url()
-        return self.__get_data(authors_url, query_params)
+        if not conditional:
+            return self.__get_data(authors_url, query_params)
+        return self.__get_conditional_data(authors_url, query_params)
 
     def get_all_tags(self):
         """Get list of tag resources."""
         tags_url = self.url.tags_url()
-        return self.__get_data(tags_url)
+        return self.__get_conditional_data(tags_url)
+
+    def fetch_random_quote(self, query_params=None):
+        """Get random quote resource as a Quote."""
+        return decode(self.get_random_quote(query_params), Quote.from_json)
+
+    def fetch_quotes(self, query_params=None, conditional=True):
+        """Get a page of quote resources as a Page of Quotes."""
+        return decode(
+            self.get_all_quotes(query_params, conditional),
+            lambda data: Page.from_json(data, Quote),
+        )
+
+    def fetch_authors(self, query_params=None, conditional=True):
+        """Get a page of author resources as a Page of Authors."""
+        return decode(
+            self.get_all_authors(query_params, conditional),
+            lambda data: Page.from_json(data, Author),
+        )
+
+    def fetch_tags(self):
+        """Get list of tag resources as a list of strings."""
+        return decode(self.get_all_tags(), decode_tags)
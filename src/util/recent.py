@@ -0,0 +1,36 @@
+"""Utility class to remember recently seen items."""
+
+
+class RecentlySeen:
+    """Fixed-size ring of the last keys seen, with constant time lookups.
+
+    Once the ring is full, adding a key forgets the oldest one, so the memory
+    used never grows past ``size`` keys.
+    """
+
+    __slots__ = ("ring", "keys", "cursor")
+
+    def __init__(self, size):
+        assert size > 0
+        self.ring = [None] * size
+        self.keys = set()
+        self.cursor = 0
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key):
+        """Remembers a key, forgetting the oldest one if the ring is full."""
+        if key in self.keys:
+            return
+
+        oldest = self.ring[self.cursor]
+        if oldest is not None:
+            self.keys.discard(oldest)
+
+        self.ring[self.cursor] = key
+        self.cursor = (self.cursor + 1) % len(self.ring)
+        self.keys.add(key)
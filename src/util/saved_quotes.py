@@ -0,0 +1,169 @@
+"""Utility class for the personal saved quote collections."""
+
+import asyncio
+import json
+import time
+
+from util.logger import generate_logger
+from util.models import Quote
+
+logger = generate_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    api_id TEXT UNIQUE,
+    quote_text TEXT NOT NULL,
+    author_name TEXT NOT NULL,
+    author_image TEXT,
+    tags TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS quotes_without_api_id
+    ON quotes (quote_text, author_name) WHERE api_id IS NULL;
+CREATE TABLE IF NOT EXISTS saved_quotes (
+    user_id INTEGER NOT NULL,
+    quote_id INTEGER NOT NULL REFERENCES quotes (id),
+    saved_at REAL NOT NULL,
+    PRIMARY KEY (user_id, quote_id)
+) WITHOUT ROWID;
+"""
+
+
+def quote_key(quote):
+    """Returns what a quote is matched on, its api id or its text and author."""
+    if quote.id is None:
+        return (quote.quote_text, quote.author_name)
+    return str(quote.id)
+
+
+class SavedQuotes:
+    """Personal quote collections of the users, kept in the local store.
+
+    Every quote is stored once under a compact local integer id, which is all
+    the collections reference. Quotes are matched on their api id, or on their
+    text and author when they don't have one. Saves are buffered and written in batches on the store thread, so a burst of
+    save reactions costs a single transaction and never blocks the event loop.
+
+    Parameters
+    ------------
+    store: LocalStore
+        Store the collections are kept in.
+    delay: float
+        Seconds a save can wait in the buffer before it's written.
+    batch_size: int
+        Number of buffered saves that are written right away.
+    """
+
+    def __init__(self, store, *, delay=2.0, batch_size=100):
+        self.store = store
+        self.delay = delay
+        self.batch_size = batch_size
+        self.pending = []
+        self.flush_handle = None
+
+        self.store.submit(self.store.executescript, SCHEMA)
+
+    def save(self, user_id, quotes):
+        """Adds quotes to the collection of a user."""
+        saved_at = time.time()
+        self.pending.extend((user_id, quote, saved_at) for quote in quotes)
+
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif self.flush_handle is None:
+            loop = asyncio.get_event_loop()
+            self.flush_handle = loop.call_later(self.delay, self.flush)
+
+    def flush(self):
+        """Queues the buffered saves on the store thread without waiting for them."""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        if self.pending:
+            batch, self.pending = self.pending, []
+            future = self.store.submit(self.write, batch)
+            future.add_done_callback(self.log_failure)
+
+    def log_failure(self, future):  # pylint: disable=no-self-use
+        """Logs the error of a batch that could not be written."""
+        if future.exception() is not None:
+            logger.error("Could not write saved quotes\n%s", future.exception())
+
+    def write(self, batch):
+        """Writes a batch of saves in a single transaction."""
+        connection = self.store.connect()
+        with connection:
+            # The stored copy of a quote is refreshed every time it's saved
+            quotes = {quote_key(quote): quote for _, quote, _ in batch}
+            ids = {
+                key: self.write_quote(connection, quote)
+                for key, quote in quotes.items()
+            }
+            connection.executemany(
+                "INSERT OR IGNORE INTO saved_quotes VALUES (?, ?, ?)",
+                [
+                    (user_id, ids[quote_key(quote)], saved_at)
+                    for user_id, quote, saved_at in batch
+                ],
+            )
+
+    def write_quote(self, connection, quote):  # pylint: disable=no-self-use
+        """Inserts or refreshes a quote, returning its local id."""
+        values = (
+            quote.quote_text,
+            quote.author_name,
+            quote.author_image,
+            json.dumps(list(quote.tags)),
+        )
+
+        if quote.id is None:
+            connection.execute(
+                "INSERT INTO quotes (quote_text, author_name, author_image, tags) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (quote_text, author_name) WHERE api_id IS NULL "
+                "DO UPDATE SET author_image = excluded.author_image, "
+                "tags = excluded.tags",
+                values,
+            )
+            return connection.execute(
+                "SELECT id FROM quotes "
+                "WHERE api_id IS NULL AND quote_text = ? AND author_name = ?",
+                values[:2],
+            ).fetchone()[0]
+
+        api_id = str(quote.id)
+        connection.execute(
+            "INSERT INTO quotes "
+            "(api_id, quote_text, author_name, author_image, tags) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (api_id) DO UPDATE SET quote_text = excluded.quote_text, "
+            "author_name = excluded.author_name, "
+            "author_image = excluded.author_image, tags = excluded.tags",
+            (api_id, *values),
+        )
+        return connection.execute(
+            "SELECT id FROM quotes WHERE api_id = ?", (api_id,)
+        ).fetchone()[0]
+
+    def read(self, user_id):
+        """Reads the collection of a user, the last saved quote first."""
+        rows = self.store.execute(
+            "SELECT q.api_id, q.quote_text, q.author_name, q.author_image, q.tags "
+            "FROM saved_quotes s JOIN quotes q ON q.id = s.quote_id "
+            "WHERE s.user_id = ? ORDER BY s.saved_at DESC",
+            (user_id,),
+        )
+        return [
+            Quote(text, author, image, tuple(json.loads(tags)), api_id)
+            for api_id, text, author, image, tags in rows
+        ]
+
+    async def get(self, user_id):
+        """Returns the collection of a user, including the saves still buffered."""
+        self.flush()
+        return await self.store.run(self.read, user_id)
+
+    def close(self):
+        """Queues the buffered saves, the store writes them before closing."""
+        self.flush()
@@ -0,0 +1,193 @@
+"""Utility full-text search index of the quotes."""
+
+import asyncio
+import functools
+import heapq
+import math
+import re
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+# Words of the quote texts, apostrophes are kept inside words like "don't"
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)*")
+
+# Words too common to tell quotes apart, left out of the index and the queries
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i if in into is it "
+    "its me my no not of on or our she so than that the their them then there "
+    "these they this to was we were what when which who will with you your".split()
+)
+
+# Plural endings stripped by the stemmer, with their replacement
+PLURALS = (("sses", "ss"), ("ies", "y"), ("ss", "ss"), ("us", "us"), ("s", ""))
+
+# Inflection and derivation suffixes stripped after the plural, longest first
+SUFFIXES = (
+    ("ational", "ate"),
+    ("fulness", "ful"),
+    ("iveness", "ive"),
+    ("ization", "ize"),
+    ("ement", ""),
+    ("ness", ""),
+    ("ment", ""),
+    ("ing", ""),
+    ("ed", ""),
+)
+
+# Shortest stem left by the stemmer
+MIN_STEM_LENGTH = 3
+
+# BM25 term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def strip_suffix(word, suffixes):
+    """Replaces the first suffix of a list a word ends with, keeping a long enough stem."""
+    for suffix, replacement in suffixes:
+        if word.endswith(suffix):
+            if len(word) - len(suffix) >= MIN_STEM_LENGTH:
+                return word[: -len(suffix)] + replacement
+            return word
+    return word
+
+
+@functools.lru_cache(maxsize=65536)
+def stem(word):
+    """Reduces a word to its stem, a light take on the Porter stemmer.
+
+    Stems don't need to be words, only to be the same for the forms of a word,
+    so "love", "loves", "loved" and "loving" are all "lov".
+    """
+    if word.endswith("'s"):
+        word = word[:-2]
+    word = strip_suffix(word, PLURALS)
+    word = strip_suffix(word, SUFFIXES)
+
+    # Doubled consonants left by the suffixes, like "running" or "stopped"
+    if (
+        len(word) > MIN_STEM_LENGTH
+        and word[-1] == word[-2]
+        and word[-1] not in "aeiouls"
+    ):
+        word = word[:-1]
+
+    if len(word) > MIN_STEM_LENGTH and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Returns the stemmed terms of a text, without the stopwords."""
+    return [
+        stem(word)
+        for word in WORD_PATTERN.findall(text.lower())
+        if word not in STOPWORDS
+    ]
+
+
+class SearchIndex:
+    """Inverted index of the quote texts, ranking the matches with BM25.
+
+    Every term maps to a posting list of two compact integer arrays, the ids of
+    the documents that contain it, in increasing order, and how many times they
+    do. Quotes are only added, so the index is built incrementally as the quote
+    pages arrive and later syncs only index the quotes it doesn't have yet.
+
+    Builds and searches run on a single worker thread, in the order they were
+    submitted, so the event loop never waits on them and a search never sees a
+    half added quote.
+    """
+
+    def __init__(self):
+        self.quotes = []
+        self.lengths = array("I")
+        self.total_length = 0
+        self.norms = []
+        self.keys = set()
+
+        # Term -> (document ids, term frequencies)
+        self.postings = {}
+
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search")
+
+    def __len__(self):
+        return len(self.quotes)
+
+    async def run(self, func, *args, **kwargs):
+        """Runs an index call on the index thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    def add(self, quotes):
+        """Indexes the quotes that aren't in the index yet, returning how many."""
+        added = 0
+        for quote in quotes:
+            if quote.key in self.keys:
+                continue
+
+            terms = tokenize(quote.quote_text)
+            frequencies = {}
+            for term in terms:
+                frequencies[term] = frequencies.get(term, 0) + 1
+
+            doc_id = len(self.quotes)
+            for term, frequency in frequencies.items():
+                if term not in self.postings:
+                    self.postings[term] = (array("I"), array("H"))
+                doc_ids, counts = self.postings[term]
+                doc_ids.append(doc_id)
+                counts.append(min(frequency, 0xFFFF))
+
+            self.quotes.append(quote)
+            self.lengths.append(len(terms))
+            self.total_length += len(terms)
+            self.keys.add(quote.key)
+            added += 1
+
+        return added
+
+    def length_norms(self):
+        """Returns the BM25 length normalization of every document.
+
+        They depend on the average document length, so they're computed again
+        on the first search after quotes were added.
+        """
+        if len(self.norms) != len(self.quotes):
+            average_length = self.total_length / len(self.quotes) or 1
+            self.norms = [
+                BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                for length in self.lengths
+            ]
+        return self.norms
+
+    def search(self, query, limit=10):
+        """Returns the quotes that best match a query, best first."""
+        if not self.quotes:
+            return []
+
+        count = len(self.quotes)
+        norms = self.length_norms()
+        scores = {}
+
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+
+            doc_ids, counts = self.postings[term]
+            idf = math.log(1 + (count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            weight = idf * (BM25_K1 + 1)
+            for doc_id, frequency in zip(doc_ids, counts):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * frequency / (
+                    frequency + norms[doc_id]
+                )
+
+        # Only the best matches are sorted, whatever the number of matches
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [self.quotes[doc_id] for doc_id, _ in best]
+
+    def close(self):
+        """Stops the index thread."""
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,59 @@
+"""Utility functions to persist cache snapshots."""
+
+import json
+import os
+import time
+
+# Bumped whenever the layout of the snapshot file changes
+SNAPSHOT_FORMAT = 1
+
+
+def save_snapshot(path, cogs):
+    """Writes the cog states to a snapshot file.
+
+    ``cogs`` maps every cog name to a ``(version, state)`` tuple. The file is
+    written next to the old one and swapped in, so a crash while saving never
+    leaves a half written snapshot behind.
+    """
+    snapshot = {
+        "format": SNAPSHOT_FORMAT,
+        "created_at": time.time(),
+        "cogs": {
+            name: {"version": version, "state": state}
+            for name, (version, state) in cogs.items()
+        },
+    }
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as snapshot_file:
+        json.dump(snapshot, snapshot_file, separators=(",", ":"))
+    os.replace(temporary_path, path)
+
+
+def load_snapshot(path, max_age=None):
+    """Reads the cog states from a snapshot file.
+
+    Returns a dict mapping every cog name to its ``(version, state)`` tuple, which
+    is empty if the file doesn't exist, is unreadable, was written with another
+    format or is older than ``max_age`` seconds.
+    """
+    try:
+        with open(path, encoding="utf-8") as snapshot_file:
+            snapshot = json.load(snapshot_file)
+    except (OSError, ValueError):
+        return {}
+
+    if snapshot.get("format") != SNAPSHOT_FORMAT:
+        return {}
+
+    if max_age is not None and time.time() - snapshot.get("created_at", 0) > max_age:
+        return {}
+
+    return {
+        name: (entry.get("version"), entry.get("state"))
+        for name, entry in snapshot.get("cogs", {}).items()
+    }
@@ -0,0 +1,85 @@
+"""Utility local store class."""
+
+import asyncio
+import functools
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from config import STORE_PATH
+
+
+class LocalStore:
+    """Embedded SQLite database shared by the cogs.
+
+    Every query runs on a single worker thread, in the order it was submitted,
+    so the event loop never waits on the disk and the connection is never used
+    by two threads at once.
+
+    Parameters
+    ------------
+    path: str
+        Path of the database file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store")
+
+    @classmethod
+    def of(cls, bot):
+        """Returns the local store of a bot, creating it on first use."""
+        store = getattr(bot, "local_store", None)
+        if store is None:
+            store = cls(STORE_PATH)
+            bot.local_store = store
+        return store
+
+    def connect(self):
+        """Returns the database connection, opening it on first use."""
+        if self.connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+        return self.connection
+
+    def submit(self, func, *args, **kwargs):
+        """Queues a blocking store call without waiting for it."""
+        return self.executor.submit(func, *args, **kwargs)
+
+    async def run(self, func, *args, **kwargs):
+        """Runs a blocking store call on the store thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    def execute(self, sql, parameters=()):
+        """Runs a statement in its own transaction, returning the rows it selected."""
+        connection = self.connect()
+        with connection:
+            return connection.execute(sql, parameters).fetchall()
+
+    def executemany(self, sql, rows):
+        """Runs a statement for every row in a single transaction."""
+        connection = self.connect()
+        with connection:
+            connection.executemany(sql, rows)
+
+    def executescript(self, script):
+        """Runs several statements, used to create the tables of a cog."""
+        connection = self.connect()
+        with connection:
+            connection.executescript(script)
+
+    def close(self):
+        """Waits for the queued calls and closes the database connection."""
+        self.executor.shutdown(wait=True)
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
@@ -0,0 +1,166 @@
+"""Utility timer classes."""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+
+# Longest sleep of a timer heap, so wall clock changes are noticed
+MAX_HEAP_SLEEP = 60.0
+
+
+class TimerWheel:
+    """Hashed timer wheel that expires many items with a single background task.
+
+    Items must have a ``deadline`` attribute in event loop time. Deadlines can be
+    pushed back by simply updating the attribute: an item whose slot comes up
+    before its deadline is put back into the wheel instead of expiring.
+
+    Parameters
+    ------------
+    on_expire: Callable
+        Function called with every item that reaches its deadline.
+    slots: int
+        Number of slots in the wheel.
+    resolution: float
+        Seconds between two ticks of the wheel.
+    """
+
+    def __init__(self, on_expire, *, slots=128, resolution=1.0):
+        self.on_expire = on_expire
+        self.slots = [set() for _ in range(slots)]
+        self.resolution = resolution
+        self.cursor = 0
+        self.task = None
+
+        # Slot index of every item in the wheel
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def schedule(self, item):
+        """Adds an item to the wheel, starting the ticking task if needed."""
+        loop = asyncio.get_event_loop()
+        ticks = math.ceil((item.deadline - loop.time()) / self.resolution)
+        slot = (self.cursor + max(ticks, 1)) % len(self.slots)
+
+        self.cancel(item)
+        self.slots[slot].add(item)
+        self.positions[item] = slot
+
+        if self.task is None or self.task.done():
+            self.task = loop.create_task(self.run())
+
+    def cancel(self, item):
+        """Removes an item from the wheel."""
+        slot = self.positions.pop(item, None)
+        if slot is not None:
+            self.slots[slot].discard(item)
+
+    async def run(self):
+        """Ticks the wheel while it has items."""
+        loop = asyncio.get_event_loop()
+
+        while self.positions:
+            await asyncio.sleep(self.resolution)
+            self.cursor = (self.cursor + 1) % len(self.slots)
+
+            bucket = self.slots[self.cursor]
+            self.slots[self.cursor] = set()
+
+            now = loop.time()
+            for item in list(bucket):
+                # Callbacks can cancel or reschedule the other items of the bucket
+                if (
+                    self.positions.get(item) != self.cursor
+                    or item in self.slots[self.cursor]
+                ):
+                    continue
+
+                self.positions.pop(item, None)
+                if item.deadline <= now:
+                    self.on_expire(item)
+                else:
+                    self.schedule(item)
+
+
+class TimerHeap:
+    """Binary heap of timers that expires many items with a single background task.
+
+    Unlike the timer wheel, deadlines are in wall clock time and can be any
+    distance in the future. Items that are due at the same time are expired
+    together, so the callback can batch the work they need.
+
+    Parameters
+    ------------
+    on_expire: Callable
+        Function called with the list of items that reached their deadline.
+    """
+
+    def __init__(self, on_expire):
+        self.on_expire = on_expire
+        self.heap = []
+        self.counter = itertools.count()
+        self.task = None
+
+        # Heap entry of every item, cancelled entries stay in the heap emptied
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def schedule(self, item):
+        """Adds an item to the heap, waking the background task if it's due first."""
+        self.cancel(item)
+        entry = [item.deadline, next(self.counter), item]
+        self.entries[item] = entry
+        heapq.heappush(self.heap, entry)
+
+        running = self.task is not None and not self.task.done()
+        if (
+            running
+            and self.heap[0] is entry
+            and asyncio.current_task() is not self.task
+        ):
+            self.task.cancel()
+            running = False
+
+        if not running:
+            self.task = asyncio.get_event_loop().create_task(self.run())
+
+    def cancel(self, item):
+        """Removes an item from the heap."""
+        entry = self.entries.pop(item, None)
+        if entry is not None:
+            entry[-1] = None
+
+    def close(self):
+        """Removes every item and stops the background task."""
+        self.entries.clear()
+        self.heap.clear()
+        if self.task is not None:
+            self.task.cancel()
+
+    async def run(self):
+        """Expires the items of the heap as they become due."""
+        while self.entries:
+            while self.heap[0][-1] is None:
+                heapq.heappop(self.heap)
+
+            delay = self.heap[0][0] - time.time()
+            if delay > 0:
+                await asyncio.sleep(min(delay, MAX_HEAP_SLEEP))
+                continue
+
+            now = time.time()
+            expired = []
+            while self.heap and self.heap[0][0] <= now:
+                item = heapq.heappop(self.heap)[-1]
+                if item is not None:
+                    del self.entries[item]
+                    expired.append(item)
+
+            if expired:
+                self.on_expire(expired)
@@ -0,0 +1,224 @@
+"""Utility class to record gateway event traces."""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+
+# Bumped whenever the layout of the trace file changes
+TRACE_FORMAT = 1
+
+# Number of events buffered before they are written to the trace file
+TRACE_BUFFER_SIZE = 500
+
+
+class TraceRecorder:
+    """Records anonymized gateway dispatch events to a gzipped JSON lines file.
+
+    The first line is a header, every other line is an ``[offset, type, data]``
+    event where the offset is the number of seconds since the recording started.
+    Only the events the cogs react to are recorded, stripped of what the bot
+    doesn't use. Ids are replaced with a keyed hash, which is consistent within a
+    trace but can't be reversed once the key is gone, names are dropped and only
+    the content of command messages is kept.
+
+    Parameters
+    ------------
+    path: str
+        Path of the trace file.
+    command_prefix: str
+        Prefix of the bot commands, messages starting with it keep their content.
+    """
+
+    def __init__(self, path, *, command_prefix=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.command_prefix = (
+            command_prefix if isinstance(command_prefix, str) else None
+        )
+        self.key = os.urandom(16)
+        self.started_at = time.monotonic()
+        self.buffer = []
+        self.events = 0
+        self.file = gzip.open(path, "wt", encoding="utf-8")
+
+        self.anonymizers = {
+            "READY": self.anonymize_ready,
+            "GUILD_CREATE": self.anonymize_guild,
+            "MESSAGE_CREATE": self.anonymize_message,
+            "MESSAGE_REACTION_ADD": self.anonymize_reaction,
+            "MESSAGE_REACTION_REMOVE": self.anonymize_reaction,
+        }
+
+        header = {
+            "format": TRACE_FORMAT,
+            "created_at": time.time(),
+            "command_prefix": self.command_prefix,
+        }
+        self.file.write(json.dumps(header) + "\n")
+
+    def record(self, msg, received_at=None):
+        """Records a gateway payload, if it's a dispatch event worth replaying.
+
+        ``received_at`` is the monotonic time the payload was received, now by
+        default.
+        """
+        if msg.get("op") != 0 or self.file is None:
+            return
+
+        anonymize = self.anonymizers.get(msg.get("t"))
+        if anonymize is None:
+            return
+
+        if received_at is None:
+            received_at = time.monotonic()
+
+        offset = round(received_at - self.started_at, 3)
+        event = [offset, msg["t"], anonymize(msg["d"])]
+        self.buffer.append(json.dumps(event, separators=(",", ":")))
+        self.events += 1
+
+        if len(self.buffer) >= TRACE_BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered events to the trace file."""
+        if self.buffer and self.file is not None:
+            self.file.write("\n".join(self.buffer) + "\n")
+            self.buffer = []
+
+    def close(self):
+        """Writes the buffered events and closes the trace file."""
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def anonymize_id(self, snowflake):
+        """Replaces an id with its keyed hash."""
+        if snowflake is None:
+            return None
+
+        digest = hashlib.blake2b(str(snowflake).encode(), key=self.key, digest_size=7)
+        return str(int.from_bytes(digest.digest(), "big"))
+
+    def anonymize_user(self, user):
+        """Keeps the id of a user and whether it's a bot."""
+        return {
+            "id": self.anonymize_id(user["id"]),
+            "username": "user",
+            "discriminator": "0000",
+            "avatar": None,
+            "bot": user.get("bot", False),
+        }
+
+    def anonymize_member(self, member):
+        """Keeps the role ids of a member."""
+        anonymized = {
+            "roles": [self.anonymize_id(role) for role in member.get("roles", [])],
+            "joined_at": member.get("joined_at"),
+            "deaf": False,
+            "mute": False,
+        }
+        user = member.get("user")
+        if user is not None:
+            anonymized["user"] = self.anonymize_user(user)
+        return anonymized
+
+    def anonymize_ready(self, data):
+        """Keeps the id of the bot user."""
+        return {"user": self.anonymize_user(data["user"])}
+
+    def anonymize_guild(self, data):
+        """Keeps the size and the channel and role layout of a guild."""
+        return {
+            "id": self.anonymize_id(data["id"]),
+            "name": "guild",
+            "owner_id": self.anonymize_id(data.get("owner_id")),
+            "member_count": data.get("member_count", 0),
+            "large": data.get("large", False),
+            "unavailable": False,
+            "roles": [
+                {
+                    "id": self.anonymize_id(role["id"]),
+                    "name": "role",
+                    "permissions": role.get("permissions", "0"),
+                    "position": role.get("position", 0),
+                }
+                for role in data.get("roles", [])
+            ],
+            "channels": [
+                {
+                    "id": self.anonymize_id(channel["id"]),
+                    "type": channel["type"],
+                    "name": "channel",
+                    "position": channel.get("position", 0),
+                    "parent_id": self.anonymize_id(channel.get("parent_id")),
+                }
+                for channel in data.get("channels", [])
+            ],
+            "members": [
+                self.anonymize_member(member) for member in data.get("members", [])
+            ],
+        }
+
+    def anonymize_message(self, data):
+        """Keeps the content of command messages and the length of the others."""
+        content = data.get("content", "")
+        if self.command_prefix is None or not content.startswith(self.command_prefix):
+            content = "." * len(content)
+
+        message = {
+            "id": self.anonymize_id(data["id"]),
+            "channel_id": self.anonymize_id(data["channel_id"]),
+            "author": self.anonymize_user(data["author"]),
+            "content": content,
+            "timestamp": data.get("timestamp"),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+            "type": data.get("type", 0),
+        }
+        if "guild_id" in data:
+            message["guild_id"] = self.anonymize_id(data["guild_id"])
+        if "member" in data:
+            message["member"] = self.anonymize_member(data["member"])
+        return message
+
+    def anonymize_reaction(self, data):
+        """Keeps the emoji of a reaction, custom emojis only keep their id."""
+        emoji = data["emoji"]
+        reaction = {
+            "user_id": self.anonymize_id(data["user_id"]),
+            "channel_id": self.anonymize_id(data["channel_id"]),
+            "message_id": self.anonymize_id(data["message_id"]),
+            "emoji": {
+                "id": self.anonymize_id(emoji.get("id")),
+                "name": emoji["name"] if emoji.get("id") is None else "emoji",
+            },
+        }
+        if "guild_id" in data:
+            reaction["guild_id"] = self.anonymize_id(data["guild_id"])
+        if "member" in data:
+            reaction["member"] = self.anonymize_member(data["member"])
+        return reaction
+
+
+def load_trace(path):
+    """Reads a trace file, returning its header and its list of events."""
+    with gzip.open(path, "rt", encoding="utf-8") as trace_file:
+        header = json.loads(trace_file.readline())
+        if header.get("format") != TRACE_FORMAT:
+            raise ValueError(f"Unsupported trace format {header.get('format')}")
+
+        events = [json.loads(line) for line in trace_file if line.strip()]
+
+    return header, events